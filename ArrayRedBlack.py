@@ -0,0 +1,948 @@
+import copy
+from array import array
+
+from RedBlack import RED, BLACK
+
+NIL = 0
+
+TYPECODES = {int: 'q', float: 'd'}
+
+
+class ArrayRedBlackTree:
+    # What the node links hold where there is no node.
+    _nil = NIL
+
+    def __init__(self, typecode='q'):
+        """
+        Initializes a new array-backed red-black tree for numeric values.
+        Values, colors, subtree sizes and the left/right/parent links are kept in parallel
+        array.array buffers addressed by integer index instead of one Python object per node.
+        Slot 0 is a black sentinel of size 0 that stands for every missing child and for the
+        parent of the root. Slots freed by removals are chained through the right links
+        into a free list and reused by later insertions.
+        mod_count counts the nodes inserted and removed, so that cursors can tell the tree has changed.
+        """
+        self.typecode = typecode
+        self._values = array(typecode, [0])
+        self._colors = array('b', [BLACK])
+        self._left = array('i', [NIL])
+        self._right = array('i', [NIL])
+        self._parent = array('i', [NIL])
+        self._sizes = array('i', [0])
+        self._free = NIL
+        self.root = NIL
+        self.size = 0
+        self.mod_count = 0
+
+    @classmethod
+    def fromSorted(cls, values, typecode='q'):
+        """
+        Builds a tree from a list of values that is sorted in ascending order and free of duplicates.
+        The value buffer is filled directly from the list, so the value at position i lives in slot
+        i + 1. The links are then laid out bottom-up in linear time by taking the middle of each
+        range as its root, with the deepest level colored red and every other node black.
+        """
+        tree = cls(typecode)
+        n = len(values)
+        if n == 0:
+            return tree
+        tree._values.extend(values)
+        tree._colors = array('b', [BLACK]) * (n + 1)
+        tree._left = array('i', [NIL]) * (n + 1)
+        tree._right = array('i', [NIL]) * (n + 1)
+        tree._parent = array('i', [NIL]) * (n + 1)
+        tree._sizes = array('i', [0]) * (n + 1)
+        red_depth = n.bit_length() - 1
+        if red_depth == 0:
+            red_depth = -1
+        tree.root = tree._build_balanced(0, n, 0, red_depth, NIL)
+        tree.size = n
+        return tree
+
+    def _build_balanced(self, lo, hi, depth, red_depth, parent):
+        """
+        Recursive helper that links the balanced subtree for the sorted positions lo to hi - 1
+        and returns the index of its root.
+        """
+        if lo >= hi:
+            return NIL
+        mid = (lo + hi) // 2
+        node = mid + 1
+        if depth == red_depth:
+            self._colors[node] = RED
+        self._parent[node] = parent
+        self._sizes[node] = hi - lo
+        self._left[node] = self._build_balanced(lo, mid, depth + 1, red_depth, node)
+        self._right[node] = self._build_balanced(mid + 1, hi, depth + 1, red_depth, node)
+        return node
+
+    def _new_node(self, value):
+        """
+        Allocates a red node for the given value, reusing a freed slot when one is available.
+        The value is stored first, so an OverflowError for an out-of-range value leaves the
+        tree untouched.
+        """
+        node = self._free
+        if node != NIL:
+            self._values[node] = value
+            self._free = self._right[node]
+            self._colors[node] = RED
+            self._left[node] = NIL
+            self._right[node] = NIL
+            self._parent[node] = NIL
+            self._sizes[node] = 1
+        else:
+            self._values.append(value)
+            node = len(self._colors)
+            self._colors.append(RED)
+            self._left.append(NIL)
+            self._right.append(NIL)
+            self._parent.append(NIL)
+            self._sizes.append(1)
+        return node
+
+    def _free_node(self, node):
+        """
+        Returns the slot of a removed node to the free list.
+        """
+        self._right[node] = self._free
+        self._free = node
+
+    def add(self, value):
+        """
+        Adds a value to the tree in a single descent.
+        Returns True if the value was inserted and False if it was already present.
+        """
+        values = self._values
+        left = self._left
+        right = self._right
+        parent = NIL
+        current = self.root
+        while current != NIL:
+            parent = current
+            current_value = values[current]
+            if value < current_value:
+                current = left[current]
+            elif value > current_value:
+                current = right[current]
+            else:
+                return False
+        node = self._new_node(value)
+        self._parent[node] = parent
+        if parent == NIL:
+            self.root = node
+        elif value < values[parent]:
+            left[parent] = node
+        else:
+            right[parent] = node
+        sizes = self._sizes
+        parents = self._parent
+        while parent != NIL:
+            sizes[parent] += 1
+            parent = parents[parent]
+        self.fix_red_red_violation(node)
+        self.size += 1
+        self.mod_count += 1
+        return True
+
+    def fix_red_red_violation(self, node):
+        """
+        Fixes violations of the red-black properties caused after insertion.
+        Colors are adjusted and necessary rotations are performed to maintain the tree's balance.
+        """
+        colors = self._colors
+        parents = self._parent
+        left = self._left
+        right = self._right
+        while colors[parents[node]] == RED:
+            parent = parents[node]
+            grandparent = parents[parent]
+            if parent == left[grandparent]:
+                uncle = right[grandparent]
+                if colors[uncle] == RED:
+                    colors[parent] = BLACK
+                    colors[uncle] = BLACK
+                    colors[grandparent] = RED
+                    node = grandparent
+                else:
+                    if node == right[parent]:
+                        node = parent
+                        self.left_rotate(node)
+                        parent = parents[node]
+                    colors[parent] = BLACK
+                    colors[grandparent] = RED
+                    self.right_rotate(grandparent)
+            else:
+                uncle = left[grandparent]
+                if colors[uncle] == RED:
+                    colors[parent] = BLACK
+                    colors[uncle] = BLACK
+                    colors[grandparent] = RED
+                    node = grandparent
+                else:
+                    if node == left[parent]:
+                        node = parent
+                        self.right_rotate(node)
+                        parent = parents[node]
+                    colors[parent] = BLACK
+                    colors[grandparent] = RED
+                    self.left_rotate(grandparent)
+        colors[self.root] = BLACK
+
+    def left_rotate(self, node):
+        """
+        Performs a left rotation on a given node and updates the subtree sizes of the two rotated nodes.
+        """
+        left = self._left
+        right = self._right
+        parents = self._parent
+        sizes = self._sizes
+        right_child = right[node]
+        inner = left[right_child]
+        right[node] = inner
+        if inner != NIL:
+            parents[inner] = node
+        parent = parents[node]
+        parents[right_child] = parent
+        if parent == NIL:
+            self.root = right_child
+        elif node == left[parent]:
+            left[parent] = right_child
+        else:
+            right[parent] = right_child
+        left[right_child] = node
+        parents[node] = right_child
+        sizes[right_child] = sizes[node]
+        sizes[node] = sizes[left[node]] + sizes[inner] + 1
+
+    def right_rotate(self, node):
+        """
+        Performs a right rotation on a given node and updates the subtree sizes of the two rotated nodes.
+        """
+        left = self._left
+        right = self._right
+        parents = self._parent
+        sizes = self._sizes
+        left_child = left[node]
+        inner = right[left_child]
+        left[node] = inner
+        if inner != NIL:
+            parents[inner] = node
+        parent = parents[node]
+        parents[left_child] = parent
+        if parent == NIL:
+            self.root = left_child
+        elif node == right[parent]:
+            right[parent] = left_child
+        else:
+            left[parent] = left_child
+        right[left_child] = node
+        parents[node] = left_child
+        sizes[left_child] = sizes[node]
+        sizes[node] = sizes[inner] + sizes[right[node]] + 1
+
+    def _find_node(self, value):
+        """
+        Returns the index of the node holding the given value, or NIL if it is not in the tree.
+        """
+        values = self._values
+        left = self._left
+        right = self._right
+        current = self.root
+        while current != NIL:
+            current_value = values[current]
+            if value < current_value:
+                current = left[current]
+            elif value > current_value:
+                current = right[current]
+            else:
+                return current
+        return NIL
+
+    def contains(self, value):
+        """
+        Checks if a specific value exists in the tree.
+        """
+        return self._find_node(value) != NIL
+
+    def remove(self, value):
+        """
+        Removes a value from the tree in a single descent.
+        Returns True if the value was removed and False if it was not present.
+        """
+        node = self._find_node(value)
+        if node == NIL:
+            return False
+        self._remove_node(node)
+        return True
+
+    def _transplant(self, node, replacement):
+        """
+        Replaces the subtree rooted at node with the subtree rooted at replacement.
+        The parent link of replacement is set even when it is the sentinel, as the removal fix-up relies on it.
+        """
+        parents = self._parent
+        parent = parents[node]
+        if parent == NIL:
+            self.root = replacement
+        elif node == self._left[parent]:
+            self._left[parent] = replacement
+        else:
+            self._right[parent] = replacement
+        parents[replacement] = parent
+
+    def _remove_node(self, node):
+        """
+        Unlinks a node from the tree, splicing in its successor when it has two children,
+        restores the subtree sizes on the affected path and fixes any double black violation.
+        The node's slot is then returned to the free list.
+        """
+        self.mod_count += 1
+        left = self._left
+        right = self._right
+        parents = self._parent
+        colors = self._colors
+        sizes = self._sizes
+        removed_color = colors[node]
+        if left[node] == NIL:
+            child = right[node]
+            self._transplant(node, child)
+        elif right[node] == NIL:
+            child = left[node]
+            self._transplant(node, child)
+        else:
+            successor = self._min_value_node(right[node])
+            removed_color = colors[successor]
+            child = right[successor]
+            if parents[successor] == node:
+                parents[child] = successor
+            else:
+                self._transplant(successor, child)
+                right[successor] = right[node]
+                parents[right[successor]] = successor
+            self._transplant(node, successor)
+            left[successor] = left[node]
+            parents[left[successor]] = successor
+            colors[successor] = colors[node]
+        current = parents[child]
+        while current != NIL:
+            sizes[current] = sizes[left[current]] + sizes[right[current]] + 1
+            current = parents[current]
+        if removed_color == BLACK:
+            self.fix_double_black(child)
+        self._free_node(node)
+        self.size -= 1
+
+    def fix_double_black(self, node):
+        """
+        Fixes double black violations that may occur after the removal of a black node.
+        The node may be the sentinel, whose parent link was set by the removal.
+        """
+        left = self._left
+        right = self._right
+        parents = self._parent
+        colors = self._colors
+        while node != self.root and colors[node] == BLACK:
+            parent = parents[node]
+            if node == left[parent]:
+                sibling = right[parent]
+                if colors[sibling] == RED:
+                    colors[sibling] = BLACK
+                    colors[parent] = RED
+                    self.left_rotate(parent)
+                    sibling = right[parent]
+                if colors[left[sibling]] == BLACK and colors[right[sibling]] == BLACK:
+                    colors[sibling] = RED
+                    node = parent
+                else:
+                    if colors[right[sibling]] == BLACK:
+                        colors[left[sibling]] = BLACK
+                        colors[sibling] = RED
+                        self.right_rotate(sibling)
+                        sibling = right[parent]
+                    colors[sibling] = colors[parent]
+                    colors[parent] = BLACK
+                    colors[right[sibling]] = BLACK
+                    self.left_rotate(parent)
+                    node = self.root
+            else:
+                sibling = left[parent]
+                if colors[sibling] == RED:
+                    colors[sibling] = BLACK
+                    colors[parent] = RED
+                    self.right_rotate(parent)
+                    sibling = left[parent]
+                if colors[left[sibling]] == BLACK and colors[right[sibling]] == BLACK:
+                    colors[sibling] = RED
+                    node = parent
+                else:
+                    if colors[left[sibling]] == BLACK:
+                        colors[right[sibling]] = BLACK
+                        colors[sibling] = RED
+                        self.left_rotate(sibling)
+                        sibling = left[parent]
+                    colors[sibling] = colors[parent]
+                    colors[parent] = BLACK
+                    colors[left[sibling]] = BLACK
+                    self.right_rotate(parent)
+                    node = self.root
+        colors[node] = BLACK
+
+    def _min_value_node(self, node):
+        """
+        Returns the index of the leftmost node in the subtree rooted at node.
+        """
+        left = self._left
+        while left[node] != NIL:
+            node = left[node]
+        return node
+
+    def _max_value_node(self, node):
+        """
+        Returns the index of the rightmost node in the subtree rooted at node.
+        """
+        right = self._right
+        while right[node] != NIL:
+            node = right[node]
+        return node
+
+    def _successor(self, node):
+        """
+        Returns the index of the in-order successor of a node, or NIL if it is the last node.
+        """
+        right = self._right
+        if right[node] != NIL:
+            return self._min_value_node(right[node])
+        parents = self._parent
+        parent = parents[node]
+        while parent != NIL and node == right[parent]:
+            node = parent
+            parent = parents[parent]
+        return parent
+
+    def _predecessor(self, node):
+        """
+        Returns the index of the in-order predecessor of a node, or NIL if it is the first node.
+        """
+        left = self._left
+        if left[node] != NIL:
+            return self._max_value_node(left[node])
+        parents = self._parent
+        parent = parents[node]
+        while parent != NIL and node == left[parent]:
+            node = parent
+            parent = parents[parent]
+        return parent
+
+    def atIndex(self, index):
+        """
+        Returns the value at the given in-order index, or None if the index is out of range.
+        """
+        left = self._left
+        right = self._right
+        sizes = self._sizes
+        current = self.root
+        while current != NIL:
+            left_size = sizes[left[current]]
+            if index == left_size:
+                return self._values[current]
+            elif index < left_size:
+                current = left[current]
+            else:
+                index -= left_size + 1
+                current = right[current]
+        return None
+
+    def rank(self, value, inclusive=False):
+        """
+        Returns the number of values in the tree that are strictly less than the given value,
+        or less than or equal to it if inclusive is True.
+        """
+        values = self._values
+        left = self._left
+        right = self._right
+        sizes = self._sizes
+        current = self.root
+        rank = 0
+        while current != NIL:
+            current_value = values[current]
+            if value < current_value:
+                current = left[current]
+            elif value > current_value:
+                rank += sizes[left[current]] + 1
+                current = right[current]
+            elif inclusive:
+                return rank + sizes[left[current]] + 1
+            else:
+                return rank + sizes[left[current]]
+        return rank
+
+    def indexOf(self, value):
+        """
+        Returns the in-order index of the given value, or -1 if the value is not in the tree.
+        """
+        values = self._values
+        left = self._left
+        right = self._right
+        sizes = self._sizes
+        current = self.root
+        rank = 0
+        while current != NIL:
+            current_value = values[current]
+            if value < current_value:
+                current = left[current]
+            elif value > current_value:
+                rank += sizes[left[current]] + 1
+                current = right[current]
+            else:
+                return rank + sizes[left[current]]
+        return -1
+
+    def validate(self):
+        """
+        Checks every invariant of the tree in O(n) and returns True, or raises an AssertionError naming the
+        first violation. The checks are those of RedBlackTree.validate, with links read from the buffers:
+        the root is black and its parent is the sentinel, no red node has a red child, every path crosses
+        the same number of black nodes, the values are strictly increasing in order, every child links back
+        to its parent, every subtree size adds up, and self.size nodes are reachable, the walk stopping as
+        soon as it reaches more, so a cycle is reported instead of looping. The sentinel must
+        still be black with size 0, and the reachable nodes and the free list must account for every slot.
+        """
+        values = self._values
+        colors = self._colors
+        left = self._left
+        right = self._right
+        parent = self._parent
+        sizes = self._sizes
+        slots = len(colors) - 1
+        if colors[NIL] != BLACK or sizes[NIL] != 0:
+            raise AssertionError("The sentinel has been modified.")
+        free = 0
+        node = self._free
+        while node != NIL:
+            free += 1
+            if free > slots:
+                raise AssertionError("The free list has a cycle.")
+            node = right[node]
+        root = self.root
+        if root != NIL and parent[root] != NIL:
+            raise AssertionError("The root {!r} has a parent.".format(values[root]))
+        if colors[root] != BLACK:
+            raise AssertionError("The root {!r} is red.".format(values[root]))
+        count = 0
+        pushed = 0
+        black_height = None
+        previous = NIL
+        stack = []
+        node = root
+        blacks = 0
+        while stack or node != NIL:
+            while node != NIL:
+                pushed += 1
+                if pushed > self.size:
+                    raise AssertionError("The tree holds more than its size of {} nodes.".format(self.size))
+                blacks += colors[node] == BLACK
+                stack.append((node, blacks))
+                node = left[node]
+            node, blacks = stack.pop()
+            count += 1
+            for child in (left[node], right[node]):
+                if child == NIL:
+                    if black_height is None:
+                        black_height = blacks
+                    elif blacks != black_height:
+                        raise AssertionError("A path through {!r} has {} black nodes instead of {}.".format(
+                            values[node], blacks, black_height))
+                elif parent[child] != node:
+                    raise AssertionError("The child {!r} of {!r} does not link back to it.".format(
+                        values[child], values[node]))
+                elif colors[node] == RED and colors[child] == RED:
+                    raise AssertionError("The red node {!r} has the red child {!r}.".format(values[node], values[child]))
+            if previous != NIL and not values[previous] < values[node]:
+                raise AssertionError("The node {!r} follows {!r} in order but is not greater.".format(
+                    values[node], values[previous]))
+            expected = 1 + sizes[left[node]] + sizes[right[node]]
+            if sizes[node] != expected:
+                raise AssertionError("The subtree of {!r} has size {} instead of {}.".format(
+                    values[node], sizes[node], expected))
+            previous = node
+            node = right[node]
+        if count != self.size:
+            raise AssertionError("The tree holds {} nodes but its size is {}.".format(count, self.size))
+        if count + free != slots:
+            raise AssertionError("{} slots are neither in the tree nor in the free list.".format(slots - count - free))
+        return True
+
+    def length(self):
+        """
+        Returns the size of the tree, i.e., the total number of nodes.
+        """
+        return self.size
+
+    def clone(self):
+        """
+        Returns a structural copy of the tree in O(n). The buffers are copied as contiguous blocks,
+        so the shape, the colors and the free list are preserved exactly.
+        """
+        tree = copy.copy(self)
+        tree._values = self._values[:]
+        tree._colors = self._colors[:]
+        tree._left = self._left[:]
+        tree._right = self._right[:]
+        tree._parent = self._parent[:]
+        tree._sizes = self._sizes[:]
+        return tree
+
+    def clear(self):
+        """
+        Clears the tree and releases its buffers.
+        """
+        mod_count = self.mod_count
+        self.__init__(self.typecode)
+        self.mod_count = mod_count + 1
+
+    def ceiling(self, value):
+        """
+        Finds the smallest value in the tree that is greater than or equal to the given value.
+        """
+        values = self._values
+        left = self._left
+        right = self._right
+        current = self.root
+        result = None
+        while current != NIL:
+            current_value = values[current]
+            if current_value >= value:
+                result = current_value
+                current = left[current]
+            else:
+                current = right[current]
+        return result
+
+    def floor(self, value):
+        """
+        Finds the largest value in the tree that is less than or equal to the given value.
+        """
+        values = self._values
+        left = self._left
+        right = self._right
+        current = self.root
+        result = None
+        while current != NIL:
+            current_value = values[current]
+            if current_value <= value:
+                result = current_value
+                current = right[current]
+            else:
+                current = left[current]
+        return result
+
+    def higher(self, value):
+        """
+        Finds the smallest value in the tree that is strictly greater than the given value.
+        """
+        values = self._values
+        left = self._left
+        right = self._right
+        current = self.root
+        result = None
+        while current != NIL:
+            current_value = values[current]
+            if current_value > value:
+                result = current_value
+                current = left[current]
+            else:
+                current = right[current]
+        return result
+
+    def lower(self, value):
+        """
+        Finds the largest value in the tree that is strictly less than the given value.
+        """
+        values = self._values
+        left = self._left
+        right = self._right
+        current = self.root
+        result = None
+        while current != NIL:
+            current_value = values[current]
+            if current_value < value:
+                result = current_value
+                current = right[current]
+            else:
+                current = left[current]
+        return result
+
+    def first(self):
+        """
+        Returns the smallest value in the tree, or None if the tree is empty.
+        """
+        if self.root == NIL:
+            return None
+        return self._values[self._min_value_node(self.root)]
+
+    def last(self):
+        """
+        Returns the largest value in the tree, or None if the tree is empty.
+        """
+        if self.root == NIL:
+            return None
+        return self._values[self._max_value_node(self.root)]
+
+    def pollFirst(self):
+        """
+        Removes and returns the smallest value in the tree, or None if the tree is empty.
+        """
+        if self.root == NIL:
+            return None
+        node = self._min_value_node(self.root)
+        value = self._values[node]
+        self._remove_node(node)
+        return value
+
+    def pollLast(self):
+        """
+        Removes and returns the largest value in the tree, or None if the tree is empty.
+        """
+        if self.root == NIL:
+            return None
+        node = self._max_value_node(self.root)
+        value = self._values[node]
+        self._remove_node(node)
+        return value
+
+    def _first_node(self):
+        """
+        Returns the index of the node with the smallest value, or NIL if the tree is empty.
+        """
+        return NIL if self.root == NIL else self._min_value_node(self.root)
+
+    def _last_node(self):
+        """
+        Returns the index of the node with the largest value, or NIL if the tree is empty.
+        """
+        return NIL if self.root == NIL else self._max_value_node(self.root)
+
+    def _value_of(self, node):
+        """
+        Returns the value held by a node.
+        """
+        return self._values[node]
+
+    def _remove_and_advance(self, node):
+        """
+        Removes a node and returns the node that holds the next value afterwards, or NIL if it was the last.
+        A successor spliced into the node's place keeps its index, so it is found before the removal.
+        """
+        following = self._successor(node)
+        self._remove_node(node)
+        return following
+
+    def _lower_bound_node(self, value, inclusive=True):
+        """
+        Returns the index of the node with the smallest value greater than or equal to the given value
+        (strictly greater if inclusive is False), or NIL if there is no such node.
+        """
+        values = self._values
+        left = self._left
+        right = self._right
+        current = self.root
+        result = NIL
+        while current != NIL:
+            current_value = values[current]
+            if value < current_value or (inclusive and not value > current_value):
+                result = current
+                current = left[current]
+            else:
+                current = right[current]
+        return result
+
+    def _upper_bound_node(self, value, inclusive=True):
+        """
+        Returns the index of the node with the largest value less than or equal to the given value
+        (strictly less if inclusive is False), or NIL if there is no such node.
+        """
+        values = self._values
+        left = self._left
+        right = self._right
+        current = self.root
+        result = NIL
+        while current != NIL:
+            current_value = values[current]
+            if value > current_value or (inclusive and not value < current_value):
+                result = current
+                current = right[current]
+            else:
+                current = left[current]
+        return result
+
+    def searchMany(self, probes):
+        """
+        Finds the floor and the ceiling of every value of an ascending sequence of probes in one coordinated walk.
+        The path of the previous search is kept as a finger, and the next probe climbs it only until it
+        reaches a subtree whose range can still hold the answer. Returns a list with a (floor, ceiling)
+        pair per probe, where a missing side is None.
+        """
+        values = self._values
+        left = self._left
+        right = self._right
+        results = []
+        finger = []
+        for probe in probes:
+            while finger:
+                upper = finger[-1][2]
+                if upper == NIL or probe < values[upper]:
+                    break
+                finger.pop()
+            if finger:
+                node, lower, upper = finger.pop()
+            else:
+                node, lower, upper = self.root, NIL, NIL
+            while node != NIL:
+                finger.append((node, lower, upper))
+                node_value = values[node]
+                if probe < node_value:
+                    upper = node
+                    node = left[node]
+                elif probe > node_value:
+                    lower = node
+                    node = right[node]
+                else:
+                    lower = upper = node
+                    break
+            results.append((None if lower == NIL else values[lower], None if upper == NIL else values[upper]))
+        return results
+
+    def irange(self, lo=None, hi=None, lo_inclusive=True, hi_inclusive=False, reverse=False):
+        """
+        Returns a lazy iterator over the values between lo and hi, in ascending order or in descending
+        order if reverse is True. A bound of None leaves that side of the range open. The start of the
+        range is found in a single descent and the iterator then steps along successor links.
+        """
+        if reverse:
+            return self._reverse_range_iterator(lo, hi, lo_inclusive, hi_inclusive)
+        return self._range_iterator(lo, hi, lo_inclusive, hi_inclusive)
+
+    def _range_iterator(self, lo, hi, lo_inclusive, hi_inclusive):
+        """
+        Generator behind irange for ascending order.
+        """
+        values = self._values
+        left = self._left
+        right = self._right
+        parents = self._parent
+        if lo is None:
+            node = self._min_value_node(self.root) if self.root != NIL else NIL
+        else:
+            node = self._lower_bound_node(lo, lo_inclusive)
+        while node != NIL:
+            value = values[node]
+            if hi is not None and (value > hi or (not hi_inclusive and not value < hi)):
+                return
+            yield value
+            child = right[node]
+            if child != NIL:
+                node = child
+                while left[node] != NIL:
+                    node = left[node]
+            else:
+                parent = parents[node]
+                while parent != NIL and node == right[parent]:
+                    node = parent
+                    parent = parents[parent]
+                node = parent
+
+    def _reverse_range_iterator(self, lo, hi, lo_inclusive, hi_inclusive):
+        """
+        Generator behind irange for descending order.
+        """
+        values = self._values
+        left = self._left
+        right = self._right
+        parents = self._parent
+        if hi is None:
+            node = self._max_value_node(self.root) if self.root != NIL else NIL
+        else:
+            node = self._upper_bound_node(hi, hi_inclusive)
+        while node != NIL:
+            value = values[node]
+            if lo is not None and (value < lo or (not lo_inclusive and not value > lo)):
+                return
+            yield value
+            child = left[node]
+            if child != NIL:
+                node = child
+                while right[node] != NIL:
+                    node = right[node]
+            else:
+                parent = parents[node]
+                while parent != NIL and node == left[parent]:
+                    node = parent
+                    parent = parents[parent]
+                node = parent
+
+    def __iter__(self):
+        """
+        Returns an iterator that traverses the tree in ascending order by following successor links.
+        """
+        return self._inorder_iterator()
+
+    def _inorder_iterator(self):
+        """
+        Generator that walks the nodes in order without recursion, stepping to each successor inline.
+        """
+        values = self._values
+        left = self._left
+        right = self._right
+        parents = self._parent
+        node = self.root
+        if node == NIL:
+            return
+        while left[node] != NIL:
+            node = left[node]
+        while node != NIL:
+            yield values[node]
+            child = right[node]
+            if child != NIL:
+                node = child
+                while left[node] != NIL:
+                    node = left[node]
+            else:
+                parent = parents[node]
+                while parent != NIL and node == right[parent]:
+                    node = parent
+                    parent = parents[parent]
+                node = parent
+
+    def __reversed__(self):
+        """
+        Returns an iterator that traverses the tree in descending order.
+        """
+        return self._reverse_inorder_iterator()
+
+    def _reverse_inorder_iterator(self):
+        """
+        Generator that walks the nodes in reverse order without recursion, stepping to each predecessor inline.
+        """
+        values = self._values
+        left = self._left
+        right = self._right
+        parents = self._parent
+        node = self.root
+        if node == NIL:
+            return
+        while right[node] != NIL:
+            node = right[node]
+        while node != NIL:
+            yield values[node]
+            child = left[node]
+            if child != NIL:
+                node = child
+                while right[node] != NIL:
+                    node = right[node]
+            else:
+                parent = parents[node]
+                while parent != NIL and node == left[parent]:
+                    node = parent
+                    parent = parents[parent]
+                node = parent
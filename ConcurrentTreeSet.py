@@ -0,0 +1,322 @@
+import threading
+from contextlib import contextmanager
+
+from TreeSet import TreeSet
+
+
+class ReadWriteLock:
+    def __init__(self):
+        """
+        Constructor of the ReadWriteLock class.
+
+        Any number of readers may hold the lock together, while a writer holds it alone. Waiting
+        writers take precedence over new readers so a steady stream of reads cannot starve them.
+        The lock is not reentrant.
+        """
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    def acquire_read(self):
+        """
+        Blocks until no writer holds or waits for the lock, then registers a reader.
+        """
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+
+    def release_read(self):
+        """
+        Unregisters a reader, waking the waiting writers when it was the last one.
+        """
+        with self._condition:
+            self._readers -= 1
+            if self._readers == 0:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        """
+        Blocks until the lock is free of readers and writers, then takes it exclusively.
+        """
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+
+    def release_write(self):
+        """
+        Releases the exclusive hold and wakes every waiting thread.
+        """
+        with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+
+    @contextmanager
+    def read_locked(self):
+        """
+        Context manager holding the lock in shared mode.
+        """
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self):
+        """
+        Context manager holding the lock in exclusive mode.
+        """
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class _Mutation:
+    __slots__ = ('method', 'args', 'result', 'error', 'done')
+
+    def __init__(self, method, args):
+        """
+        Initializes a pending mutation: the TreeSet method to call, its arguments, and the slots
+        where the thread that applies it leaves the outcome.
+        """
+        self.method = method
+        self.args = args
+        self.result = None
+        self.error = None
+        self.done = False
+
+
+class ConcurrentTreeSet:
+    def __init__(self):
+        """
+        Constructor of the ConcurrentTreeSet class.
+
+        A thread-safe wrapper around a TreeSet. Lookups and iteration take a reader-writer lock in
+        shared mode and run alongside each other. Mutations are serialized and batched: each writer
+        queues its change, and whichever writer gets to apply the queue applies every change waiting
+        in it under a single hold of the exclusive lock, so a burst of writes from many threads pays
+        for one lock handoff instead of one per write.
+        """
+        self._set = TreeSet()
+        self._lock = ReadWriteLock()
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._combine_lock = threading.Lock()
+
+    def _mutate(self, method, *args):
+        """
+        Queues a mutation and waits until it has been applied, applying the queue itself if no other
+        writer has done so.
+
+        Args:
+            method: The name of the TreeSet method to call.
+            args: The arguments of the call.
+
+        Returns:
+            The result of the TreeSet method. Its exceptions are raised in the calling thread.
+        """
+        mutation = _Mutation(method, args)
+        with self._pending_lock:
+            self._pending.append(mutation)
+        with self._combine_lock:
+            if not mutation.done:
+                self._apply_pending()
+        if mutation.error is not None:
+            raise mutation.error
+        return mutation.result
+
+    def _apply_pending(self):
+        """
+        Applies every queued mutation, in queue order, under one exclusive hold of the lock.
+        The caller must hold the combine lock.
+        """
+        with self._pending_lock:
+            batch, self._pending = self._pending, []
+        with self._lock.write_locked():
+            for mutation in batch:
+                try:
+                    mutation.result = getattr(self._set, mutation.method)(*mutation.args)
+                except Exception as error:
+                    mutation.error = error
+                mutation.done = True
+
+    def add(self, obj):
+        """
+        Adds an element to the set.
+
+        Returns:
+            True if the object was added, False if it was already present.
+
+        Raises:
+            TypeError: If the object's type differs from the set's type.
+        """
+        return self._mutate('add', obj)
+
+    def addAll(self, objList):
+        """
+        Adds a list of elements to the set as a single mutation.
+
+        Returns:
+            True after adding all elements.
+        """
+        return self._mutate('addAll', list(objList))
+
+    def ceiling(self, e):
+        """
+        Finds the smallest element that is greater than or equal to the given element, or None if none.
+        """
+        with self._lock.read_locked():
+            return self._set.ceiling(e)
+
+    def clear(self):
+        """
+        Removes all elements from the set.
+        """
+        return self._mutate('clear')
+
+    def contains(self, obj):
+        """
+        Checks if the set contains a given object.
+        """
+        with self._lock.read_locked():
+            return self._set.contains(obj)
+
+    def containsMany(self, values):
+        """
+        Checks membership of several values against one consistent state of the set.
+
+        Returns:
+            A list of booleans, one per value in the input order.
+        """
+        with self._lock.read_locked():
+            return self._set.containsMany(values)
+
+    def descendingIterator(self):
+        """
+        Returns an iterator over the elements in descending order. The elements are copied under the
+        read lock, so the iterator is unaffected by later changes.
+        """
+        with self._lock.read_locked():
+            return iter(list(self._set.descendingIterator()))
+
+    def first(self):
+        """
+        Returns the first element of the set, or None if the set is empty.
+        """
+        with self._lock.read_locked():
+            return self._set.first()
+
+    def floor(self, e):
+        """
+        Finds the largest element that is less than or equal to the given element, or None if none.
+        """
+        with self._lock.read_locked():
+            return self._set.floor(e)
+
+    def get(self, index):
+        """
+        Returns the element at the given position in ascending order, or None if the index is out of range.
+        """
+        with self._lock.read_locked():
+            return self._set.get(index)
+
+    def higher(self, e):
+        """
+        Finds the smallest element that is strictly greater than the given element, or None if none.
+        """
+        with self._lock.read_locked():
+            return self._set.higher(e)
+
+    def isEmpty(self):
+        """
+        Checks if the set is empty.
+        """
+        with self._lock.read_locked():
+            return self._set.isEmpty()
+
+    def iterator(self):
+        """
+        Returns an iterator over the elements in ascending order. The elements are copied under the
+        read lock, so the iterator is unaffected by later changes.
+        """
+        with self._lock.read_locked():
+            return iter(list(self._set.iterator()))
+
+    def last(self):
+        """
+        Returns the last element of the set, or None if the set is empty.
+        """
+        with self._lock.read_locked():
+            return self._set.last()
+
+    def lower(self, e):
+        """
+        Finds the largest element that is strictly less than the given element, or None if none.
+        """
+        with self._lock.read_locked():
+            return self._set.lower(e)
+
+    def pollFirst(self):
+        """
+        Removes and returns the first element of the set, or None if the set is empty.
+        """
+        return self._mutate('pollFirst')
+
+    def pollLast(self):
+        """
+        Removes and returns the last element of the set, or None if the set is empty.
+        """
+        return self._mutate('pollLast')
+
+    def rank(self, e):
+        """
+        Counts the elements of the set that are strictly less than the given element.
+        """
+        with self._lock.read_locked():
+            return self._set.rank(e)
+
+    def remove(self, obj):
+        """
+        Removes an element from the set if it is present.
+
+        Returns:
+            True if the object was removed, False if it was not present.
+        """
+        return self._mutate('remove', obj)
+
+    def removeAll(self, objList):
+        """
+        Removes a list of elements from the set as a single mutation.
+
+        Returns:
+            True if the set changed.
+        """
+        return self._mutate('removeAll', list(objList))
+
+    def size(self):
+        """
+        Returns the number of elements in the set.
+        """
+        with self._lock.read_locked():
+            return self._set.size()
+
+    def snapshot(self):
+        """
+        Returns a copy-on-write clone of the set, a plain TreeSet for the calling thread's own use.
+        Cloning updates the set's sharing count, so it briefly takes the lock in exclusive mode.
+
+        The snapshot is not thread-safe itself: it may be read and modified by the thread that took it,
+        or by any single thread at a time, without holding the lock of this set. Its changes never show
+        in this set, nor this set's changes in the snapshot: the sharing count has its own lock, and
+        whichever of the two is modified first while the tree is shared copies it before leaving.
+        Dropping the snapshot once done with it lets the set change its tree in place again.
+        """
+        with self._lock.write_locked():
+            return self._set.clone(copyOnWrite=True)
@@ -0,0 +1,493 @@
+import os
+import pickle
+import re
+import struct
+import threading
+import time
+import zlib
+
+from TreeSet import TreeSet
+
+# Log record header: operation code, payload length, CRC-32 of the operation code and payload.
+RECORD = struct.Struct('<cII')
+ADD = b'a'
+REMOVE = b'r'
+CLEAR = b'c'
+
+# Snapshots of sets whose data type TreeSet.dump cannot write start with this marker, followed by
+# the pickled list of the elements in ascending order.
+PICKLED_SNAPSHOT = b'TPKL'
+
+SEGMENT_NAME = re.compile(r'^wal\.(\d+)\.log$')
+SNAPSHOT_NAME = re.compile(r'^snapshot\.(\d+)\.bin$')
+
+
+def _segment_path(directory, generation):
+    return os.path.join(directory, 'wal.{:08d}.log'.format(generation))
+
+
+def _snapshot_path(directory, generation):
+    return os.path.join(directory, 'snapshot.{:08d}.bin'.format(generation))
+
+
+def _encode_record(operation, value=None):
+    """
+    Encodes one log record. The payload is the pickled value, empty for CLEAR.
+    """
+    payload = b'' if operation == CLEAR else pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    return RECORD.pack(operation, len(payload), zlib.crc32(operation + payload)) + payload
+
+
+def _read_records(path):
+    """
+    Reads the records of a log segment up to the first incomplete or corrupt one, which is where a
+    crash interrupted the last write.
+
+    Returns:
+        The list of (operation, value) records and the length of the valid prefix of the file.
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    records = []
+    position = 0
+    while position + RECORD.size <= len(data):
+        operation, length, checksum = RECORD.unpack_from(data, position)
+        payload = data[position + RECORD.size:position + RECORD.size + length]
+        if len(payload) != length or zlib.crc32(operation + payload) != checksum:
+            break
+        records.append((operation, pickle.loads(payload) if length else None))
+        position += RECORD.size + length
+    return records, position
+
+
+def _write_snapshot(path, tree_set):
+    """
+    Writes a snapshot of a set and fsyncs it. Sets of int, float or str are written with TreeSet.dump;
+    other data types, such as tuples, are written as a pickled list, as the log already pickles them.
+    """
+    try:
+        tree_set.dump(path)
+    except TypeError:
+        with open(path, 'wb') as file:
+            file.write(PICKLED_SNAPSHOT)
+            pickle.dump(list(tree_set.iterator()), file, pickle.HIGHEST_PROTOCOL)
+    with open(path, 'rb') as file:
+        os.fsync(file.fileno())
+
+
+def _read_snapshot(path):
+    """
+    Reads a snapshot written by _write_snapshot back into a TreeSet.
+    """
+    with open(path, 'rb') as file:
+        if file.read(len(PICKLED_SNAPSHOT)) == PICKLED_SNAPSHOT:
+            return TreeSet.fromSorted(pickle.load(file))
+    return TreeSet.load(path)
+
+
+def _fsync_directory(directory):
+    """
+    Makes the creation, renaming and deletion of files in a directory durable, where supported.
+    """
+    if hasattr(os, 'O_DIRECTORY'):
+        descriptor = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+
+class DurableTreeSet:
+    def __init__(self, directory, fsync_batching=True, commit_interval=0.01,
+                 checkpoint_interval=60.0, checkpoint_bytes=64 * 1024 * 1024):
+        """
+        Constructor of the DurableTreeSet class.
+
+        A TreeSet whose changes survive a restart. Every change is applied to an in-memory TreeSet
+        and appended to a write-ahead log. A background thread periodically writes a sorted
+        snapshot of the set with dump and deletes the log segments the snapshot covers. Opening
+        the directory again loads the latest snapshot and replays the log written after it.
+
+        With fsync batching, changes are queued and a background thread writes and fsyncs the
+        whole queue at most every commit_interval seconds (group commit), so a crash loses at most
+        the changes of that window; flush() waits until everything queued is on disk. Without it,
+        each change is written and fsynced before the method returns.
+
+        Args:
+            directory: The directory holding the snapshots and log segments. It is created if needed.
+            fsync_batching: Whether to group the fsyncs of the log in the background.
+            commit_interval: The maximum delay, in seconds, before a queued change is fsynced.
+            checkpoint_interval: The number of seconds between background checkpoints.
+            checkpoint_bytes: The log size that triggers a checkpoint before the interval is up.
+        """
+        self._directory = directory
+        self._fsync_batching = fsync_batching
+        self._commit_interval = commit_interval
+        self._checkpoint_interval = checkpoint_interval
+        self._checkpoint_bytes = checkpoint_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._committed = threading.Condition(self._lock)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._pending = []
+        self._appended = 0
+        self._durable = 0
+        self._log_bytes = 0
+        self._checkpoint_lock = threading.Lock()
+        self._checkpoint_error = None
+
+        self._set, self._generation = self._recover()
+        self._log = open(_segment_path(directory, self._generation), 'ab')
+        _fsync_directory(directory)
+
+        self._threads = [threading.Thread(target=self._checkpoint_loop, daemon=True)]
+        if fsync_batching:
+            self._threads.append(threading.Thread(target=self._commit_loop, daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _recover(self):
+        """
+        Rebuilds the set from the latest snapshot and the log segments written after it. A torn
+        record at the end of the last segment is cut off.
+
+        Returns:
+            The recovered TreeSet and the generation of the new log segment to write to.
+        """
+        snapshots = []
+        segments = []
+        for name in os.listdir(self._directory):
+            match = SNAPSHOT_NAME.match(name)
+            if match:
+                snapshots.append(int(match.group(1)))
+            match = SEGMENT_NAME.match(name)
+            if match:
+                segments.append(int(match.group(1)))
+        start = max(snapshots, default=0)
+        recovered = _read_snapshot(_snapshot_path(self._directory, start)) if snapshots else TreeSet()
+        segments = sorted(generation for generation in segments if generation >= start)
+        for generation in segments:
+            path = _segment_path(self._directory, generation)
+            records, valid = _read_records(path)
+            for operation, value in records:
+                if operation == ADD:
+                    recovered.add(value)
+                elif operation == REMOVE:
+                    recovered.remove(value)
+                else:
+                    recovered.clear()
+            if valid != os.path.getsize(path):
+                with open(path, 'r+b') as file:
+                    file.truncate(valid)
+                    os.fsync(file.fileno())
+        return recovered, max(segments + [start]) + 1
+
+    def _log_change(self, operation, value=None):
+        """
+        Appends a change to the log, queuing it for the next group commit or, without fsync
+        batching, writing and fsyncing it at once. The caller holds the lock and has already
+        applied the change.
+        """
+        record = _encode_record(operation, value)
+        self._appended += 1
+        self._log_bytes += len(record)
+        if self._fsync_batching:
+            self._pending.append(record)
+            self._wake.set()
+        else:
+            self._log.write(record)
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._durable = self._appended
+
+    def _write_pending(self):
+        """
+        Writes and fsyncs every queued record as one group. The caller holds the lock.
+        """
+        if self._pending:
+            self._log.write(b''.join(self._pending))
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._pending = []
+        self._durable = self._appended
+        self._committed.notify_all()
+
+    def _commit_loop(self):
+        """
+        Background group commit: waits for queued records, lets more arrive for up to
+        commit_interval seconds, then writes and fsyncs them together.
+        """
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            time.sleep(self._commit_interval)
+            with self._lock:
+                self._write_pending()
+
+    def _checkpoint_loop(self):
+        """
+        Background checkpointing: checkpoints every checkpoint_interval seconds, or sooner when
+        the log has grown past checkpoint_bytes. A failed checkpoint leaves the log as it was; the
+        error is kept, the next interval tries again, and close raises it if no attempt succeeded since.
+        """
+        last = time.monotonic()
+        while not self._stop.wait(min(self._checkpoint_interval, 0.1)):
+            if self._log_bytes >= self._checkpoint_bytes or time.monotonic() - last >= self._checkpoint_interval:
+                if self._log_bytes:
+                    try:
+                        self.checkpoint()
+                        self._checkpoint_error = None
+                    except Exception as error:
+                        self._checkpoint_error = error
+                last = time.monotonic()
+
+    def checkpoint(self):
+        """
+        Writes a snapshot of the set and deletes the log segments it makes redundant.
+
+        Under the lock, the queued records are written, the set is cloned copy-on-write and a new log
+        segment is started; the snapshot is then written from the clone while changes continue. The
+        snapshot is named after the new segment, so recovery knows which segments to replay. The clone
+        then gives up its share of the tree, so the next change to the set does not copy the tree.
+
+        If the snapshot cannot be written, the records logged to the new segment meanwhile are appended
+        back to the previous one and the new segment is deleted, so a failed checkpoint leaves no extra
+        segment behind. Should a crash interrupt this, both segments hold those records, and replaying
+        them twice in a row gives the same set as replaying them once.
+
+        Raises:
+            OSError: If the snapshot cannot be written.
+        """
+        with self._checkpoint_lock:
+            with self._lock:
+                self._write_pending()
+                snapshot = self._set.clone(copyOnWrite=True)
+                self._log.close()
+                self._generation += 1
+                generation = self._generation
+                self._log = open(_segment_path(self._directory, generation), 'ab')
+                previous_bytes = self._log_bytes
+                self._log_bytes = 0
+            temporary = os.path.join(self._directory, 'snapshot.tmp')
+            try:
+                _write_snapshot(temporary, snapshot)
+            except BaseException:
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+                self._undo_rotation(generation, previous_bytes)
+                raise
+            finally:
+                snapshot._release_tree()
+            os.replace(temporary, _snapshot_path(self._directory, generation))
+            _fsync_directory(self._directory)
+            for name in os.listdir(self._directory):
+                match = SNAPSHOT_NAME.match(name) or SEGMENT_NAME.match(name)
+                if match and int(match.group(1)) < generation:
+                    os.remove(os.path.join(self._directory, name))
+
+    def _undo_rotation(self, generation, previous_bytes):
+        """
+        Moves the records of the segment started by a failed checkpoint back to the end of the previous
+        segment, which becomes the log again, and deletes the new segment.
+        """
+        with self._lock:
+            self._write_pending()
+            self._log.close()
+            path = _segment_path(self._directory, generation)
+            with open(path, 'rb') as file:
+                records = file.read()
+            self._log = open(_segment_path(self._directory, generation - 1), 'ab')
+            if records:
+                self._log.write(records)
+                self._log.flush()
+                os.fsync(self._log.fileno())
+            os.remove(path)
+            _fsync_directory(self._directory)
+            self._generation = generation - 1
+            self._log_bytes += previous_bytes
+
+    def close(self):
+        """
+        Writes every queued change to disk and stops the background threads. The set cannot be
+        changed afterwards.
+
+        Raises:
+            RuntimeError: If the last background checkpoint failed, chained to its error. The changes
+                themselves are in the log and are recovered by the next open.
+        """
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join()
+        with self._lock:
+            self._write_pending()
+            self._log.close()
+        if self._checkpoint_error is not None:
+            raise RuntimeError("The last background checkpoint failed.") from self._checkpoint_error
+
+    def flush(self):
+        """
+        Waits until every change made so far has been fsynced to the log.
+        """
+        with self._lock:
+            target = self._appended
+            while self._durable < target:
+                self._committed.wait()
+
+    def add(self, obj):
+        """
+        Adds an element to the set and logs the change.
+
+        Returns:
+            True if the object was added, False if it was already present.
+
+        Raises:
+            TypeError: If the object's type differs from the set's type.
+        """
+        with self._lock:
+            added = self._set.add(obj)
+            if added:
+                self._log_change(ADD, obj)
+            return added
+
+    def addAll(self, objList):
+        """
+        Adds a list of elements to the set, logging one record per element added.
+
+        Returns:
+            True after adding all elements.
+        """
+        for obj in objList:
+            self.add(obj)
+        return True
+
+    def ceiling(self, e):
+        """
+        Finds the smallest element that is greater than or equal to the given element, or None if none.
+        """
+        return self._set.ceiling(e)
+
+    def clear(self):
+        """
+        Removes all elements from the set and logs the change.
+        """
+        with self._lock:
+            self._set.clear()
+            self._log_change(CLEAR)
+
+    def contains(self, obj):
+        """
+        Checks if the set contains a given object.
+        """
+        return self._set.contains(obj)
+
+    def descendingIterator(self):
+        """
+        Returns an iterator over the elements in descending order.
+        """
+        return self._set.descendingIterator()
+
+    def first(self):
+        """
+        Returns the first element of the set, or None if the set is empty.
+        """
+        return self._set.first()
+
+    def floor(self, e):
+        """
+        Finds the largest element that is less than or equal to the given element, or None if none.
+        """
+        return self._set.floor(e)
+
+    def get(self, index):
+        """
+        Returns the element at the given position in ascending order, or None if the index is out of range.
+        """
+        return self._set.get(index)
+
+    def higher(self, e):
+        """
+        Finds the smallest element that is strictly greater than the given element, or None if none.
+        """
+        return self._set.higher(e)
+
+    def isEmpty(self):
+        """
+        Checks if the set is empty.
+        """
+        return self._set.isEmpty()
+
+    def iterator(self):
+        """
+        Returns an iterator over the elements in ascending order.
+        """
+        return self._set.iterator()
+
+    def last(self):
+        """
+        Returns the last element of the set, or None if the set is empty.
+        """
+        return self._set.last()
+
+    def lower(self, e):
+        """
+        Finds the largest element that is strictly less than the given element, or None if none.
+        """
+        return self._set.lower(e)
+
+    def pollFirst(self):
+        """
+        Removes and returns the first element of the set, or None if the set is empty. The change is
+        logged as the removal of that element.
+        """
+        with self._lock:
+            value = self._set.pollFirst()
+            if value is not None:
+                self._log_change(REMOVE, value)
+            return value
+
+    def pollLast(self):
+        """
+        Removes and returns the last element of the set, or None if the set is empty. The change is
+        logged as the removal of that element.
+        """
+        with self._lock:
+            value = self._set.pollLast()
+            if value is not None:
+                self._log_change(REMOVE, value)
+            return value
+
+    def rank(self, e):
+        """
+        Counts the elements of the set that are strictly less than the given element.
+        """
+        return self._set.rank(e)
+
+    def remove(self, obj):
+        """
+        Removes an element from the set if it is present, and logs the change.
+
+        Returns:
+            True if the object was removed, False if it was not present.
+        """
+        with self._lock:
+            removed = self._set.remove(obj)
+            if removed:
+                self._log_change(REMOVE, obj)
+            return removed
+
+    def size(self):
+        """
+        Returns the number of elements in the set.
+        """
+        return self._set.size()
@@ -0,0 +1,527 @@
+import threading
+
+from RedBlack import RED, BLACK
+
+
+class PersistentNode:
+    __slots__ = ('value', 'color', 'left', 'right', 'size')
+
+    def __init__(self, color, left, value, right):
+        """
+        Initializes an immutable node. Nodes are never modified once built, so a tree can be shared
+        by any number of snapshots. There is no parent link: a node may belong to several versions
+        of the tree at the same time.
+        """
+        self.value = value
+        self.color = color
+        self.left = left
+        self.right = right
+        self.size = 1 + (left.size if left is not None else 0) + (right.size if right is not None else 0)
+
+
+def _is_red(node):
+    """
+    Checks if a node is red. Missing children count as black.
+    """
+    return node is not None and node.color == RED
+
+
+def _blacken(node):
+    """
+    Returns the node colored black, copying it only if it is red.
+    """
+    if node is None or node.color == BLACK:
+        return node
+    return PersistentNode(BLACK, node.left, node.value, node.right)
+
+
+def _balance(left, value, right):
+    """
+    Builds a black node from two subtrees, resolving a red child with a red child of its own by
+    turning the three nodes into a red node with two black children.
+    """
+    if _is_red(left) and _is_red(right):
+        return PersistentNode(RED, _blacken(left), value, _blacken(right))
+    if _is_red(left):
+        if _is_red(left.left):
+            return PersistentNode(RED, _blacken(left.left), left.value,
+                                  PersistentNode(BLACK, left.right, value, right))
+        if _is_red(left.right):
+            return PersistentNode(RED, PersistentNode(BLACK, left.left, left.value, left.right.left),
+                                  left.right.value, PersistentNode(BLACK, left.right.right, value, right))
+    if _is_red(right):
+        if _is_red(right.right):
+            return PersistentNode(RED, PersistentNode(BLACK, left, value, right.left), right.value,
+                                  _blacken(right.right))
+        if _is_red(right.left):
+            return PersistentNode(RED, PersistentNode(BLACK, left, value, right.left.left), right.left.value,
+                                  PersistentNode(BLACK, right.left.right, right.value, right.right))
+    return PersistentNode(BLACK, left, value, right)
+
+
+def _insert(node, value):
+    """
+    Returns a new version of the subtree with the value inserted, copying only the nodes on the
+    search path. Returns the same subtree if the value is already present.
+    """
+    if node is None:
+        return PersistentNode(RED, None, value, None)
+    if value < node.value:
+        left = _insert(node.left, value)
+        if left is node.left:
+            return node
+        if node.color == BLACK:
+            return _balance(left, node.value, node.right)
+        return PersistentNode(RED, left, node.value, node.right)
+    elif value > node.value:
+        right = _insert(node.right, value)
+        if right is node.right:
+            return node
+        if node.color == BLACK:
+            return _balance(node.left, node.value, right)
+        return PersistentNode(RED, node.left, node.value, right)
+    return node
+
+
+def _redden(node):
+    """
+    Returns a black node colored red. Only called where the red-black invariants guarantee a black node.
+    """
+    return PersistentNode(RED, node.left, node.value, node.right)
+
+
+def _balance_left(left, value, right):
+    """
+    Rebuilds a node whose left subtree lost one level of black height during a removal.
+    """
+    if _is_red(left):
+        return PersistentNode(RED, _blacken(left), value, right)
+    if right.color == BLACK:
+        return _balance(left, value, _redden(right))
+    return PersistentNode(RED, PersistentNode(BLACK, left, value, right.left.left), right.left.value,
+                          _balance(right.left.right, right.value, _redden(right.right)))
+
+
+def _balance_right(left, value, right):
+    """
+    Rebuilds a node whose right subtree lost one level of black height during a removal.
+    """
+    if _is_red(right):
+        return PersistentNode(RED, left, value, _blacken(right))
+    if left.color == BLACK:
+        return _balance(_redden(left), value, right)
+    return PersistentNode(RED, _balance(_redden(left.left), left.value, left.right.left), left.right.value,
+                          PersistentNode(BLACK, left.right.right, value, right))
+
+
+def _join(left, right):
+    """
+    Joins the two subtrees of a removed node, all of whose values are ordered left before right.
+    """
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if _is_red(left) and _is_red(right):
+        middle = _join(left.right, right.left)
+        if _is_red(middle):
+            return PersistentNode(RED, PersistentNode(RED, left.left, left.value, middle.left), middle.value,
+                                  PersistentNode(RED, middle.right, right.value, right.right))
+        return PersistentNode(RED, left.left, left.value, PersistentNode(RED, middle, right.value, right.right))
+    if not _is_red(left) and not _is_red(right):
+        middle = _join(left.right, right.left)
+        if _is_red(middle):
+            return PersistentNode(RED, PersistentNode(BLACK, left.left, left.value, middle.left), middle.value,
+                                  PersistentNode(BLACK, middle.right, right.value, right.right))
+        return _balance_left(left.left, left.value, PersistentNode(BLACK, middle, right.value, right.right))
+    if _is_red(right):
+        return PersistentNode(RED, _join(left, right.left), right.value, right.right)
+    return PersistentNode(RED, left.left, left.value, _join(left.right, right))
+
+
+def _delete(node, value):
+    """
+    Returns a new version of the subtree without the value, which must be present, copying only
+    the nodes on the search path.
+    """
+    if value < node.value:
+        if node.left is not None and node.left.color == BLACK:
+            return _balance_left(_delete(node.left, value), node.value, node.right)
+        return PersistentNode(RED, _delete(node.left, value), node.value, node.right)
+    elif value > node.value:
+        if node.right is not None and node.right.color == BLACK:
+            return _balance_right(node.left, node.value, _delete(node.right, value))
+        return PersistentNode(RED, node.left, node.value, _delete(node.right, value))
+    return _join(node.left, node.right)
+
+
+class TreeSetSnapshot:
+    def __init__(self, root, datatype):
+        """
+        Constructor of the TreeSetSnapshot class.
+
+        A snapshot is an immutable version of a PersistentTreeSet. Its nodes are never modified, so it
+        can be read and iterated from any thread, for as long as needed, without locks.
+
+        Args:
+            root: The root node of the version.
+            datatype: The data type of the elements.
+        """
+        self._root = root
+        self._datatype = datatype
+
+    def ceiling(self, e):
+        """
+        Finds the smallest element that is greater than or equal to the given element, or None if none.
+        """
+        current = self._root
+        result = None
+        while current is not None:
+            if current.value >= e:
+                result = current.value
+                current = current.left
+            else:
+                current = current.right
+        return result
+
+    def contains(self, obj):
+        """
+        Checks if the snapshot contains a given object.
+        """
+        current = self._root
+        while current is not None:
+            if obj < current.value:
+                current = current.left
+            elif obj > current.value:
+                current = current.right
+            else:
+                return True
+        return False
+
+    def descendingIterator(self):
+        """
+        Returns an iterator over the elements in descending order.
+        """
+        stack = []
+        current = self._root
+        while stack or current is not None:
+            while current is not None:
+                stack.append(current)
+                current = current.right
+            current = stack.pop()
+            yield current.value
+            current = current.left
+
+    def first(self):
+        """
+        Returns the smallest element, or None if the snapshot is empty.
+        """
+        current = self._root
+        if current is None:
+            return None
+        while current.left is not None:
+            current = current.left
+        return current.value
+
+    def floor(self, e):
+        """
+        Finds the largest element that is less than or equal to the given element, or None if none.
+        """
+        current = self._root
+        result = None
+        while current is not None:
+            if current.value <= e:
+                result = current.value
+                current = current.right
+            else:
+                current = current.left
+        return result
+
+    def get(self, index):
+        """
+        Returns the element at the given position in ascending order, or None if the index is out of range.
+        """
+        if index < 0 or index >= self.size():
+            return None
+        current = self._root
+        while current is not None:
+            left_size = current.left.size if current.left is not None else 0
+            if index == left_size:
+                return current.value
+            elif index < left_size:
+                current = current.left
+            else:
+                index -= left_size + 1
+                current = current.right
+        return None
+
+    def higher(self, e):
+        """
+        Finds the smallest element that is strictly greater than the given element, or None if none.
+        """
+        current = self._root
+        result = None
+        while current is not None:
+            if current.value > e:
+                result = current.value
+                current = current.left
+            else:
+                current = current.right
+        return result
+
+    def isEmpty(self):
+        """
+        Checks if the snapshot is empty.
+        """
+        return self._root is None
+
+    def iterator(self):
+        """
+        Returns an iterator over the elements in ascending order.
+        """
+        stack = []
+        current = self._root
+        while stack or current is not None:
+            while current is not None:
+                stack.append(current)
+                current = current.left
+            current = stack.pop()
+            yield current.value
+            current = current.right
+
+    def last(self):
+        """
+        Returns the largest element, or None if the snapshot is empty.
+        """
+        current = self._root
+        if current is None:
+            return None
+        while current.right is not None:
+            current = current.right
+        return current.value
+
+    def lower(self, e):
+        """
+        Finds the largest element that is strictly less than the given element, or None if none.
+        """
+        current = self._root
+        result = None
+        while current is not None:
+            if current.value < e:
+                result = current.value
+                current = current.right
+            else:
+                current = current.left
+        return result
+
+    def rank(self, e):
+        """
+        Counts the elements that are strictly less than the given element.
+        """
+        current = self._root
+        rank = 0
+        while current is not None:
+            left_size = current.left.size if current.left is not None else 0
+            if e < current.value:
+                current = current.left
+            elif e > current.value:
+                rank += left_size + 1
+                current = current.right
+            else:
+                return rank + left_size
+        return rank
+
+    def size(self):
+        """
+        Returns the number of elements in the snapshot.
+        """
+        return self._root.size if self._root is not None else 0
+
+
+class PersistentTreeSet:
+    def __init__(self):
+        """
+        Constructor of the PersistentTreeSet class.
+
+        A persistent set never modifies a node in place. Every change copies the O(log n) nodes on its
+        search path and publishes the new root with a single assignment, so readers can take a
+        consistent snapshot() at any time and iterate it without locks while writers keep going.
+        Writers are serialized by a lock.
+        """
+        self._root = None
+        self._datatype = None
+        self._write_lock = threading.Lock()
+
+    def add(self, obj):
+        """
+        Adds an element to the set.
+
+        If the data type of the set is not defined, it defines it with the type of the first added element.
+
+        Args:
+            obj: The object to add to the set.
+
+        Returns:
+            True if the object was added, False if it was already present.
+        """
+        with self._write_lock:
+            if self._datatype is None:
+                self._datatype = type(obj)
+            elif type(obj) != self._datatype:
+                self.raise_type_error(obj, self._datatype)
+            root = self._root
+            new_root = _insert(root, obj)
+            if new_root is root:
+                return False
+            self._root = _blacken(new_root)
+            return True
+
+    def addAll(self, objList):
+        """
+        Adds a list of elements to the set, publishing each insertion as it is made.
+
+        Returns:
+            True after adding all elements.
+        """
+        for obj in objList:
+            self.add(obj)
+        return True
+
+    def clear(self):
+        """
+        Removes all elements from the set. Snapshots taken before keep their elements.
+        """
+        with self._write_lock:
+            self._root = None
+            self._datatype = None
+
+    def remove(self, obj):
+        """
+        Removes an element from the set if it is present.
+
+        Returns:
+            True if the object was removed, False if it was not present.
+        """
+        with self._write_lock:
+            if self._root is None or type(obj) != self._datatype:
+                return False
+            if not TreeSetSnapshot(self._root, self._datatype).contains(obj):
+                return False
+            self._root = _blacken(_delete(self._root, obj))
+            return True
+
+    def pollFirst(self):
+        """
+        Removes and returns the first element of the set, or None if the set is empty.
+        """
+        with self._write_lock:
+            if self._root is None:
+                return None
+            value = TreeSetSnapshot(self._root, self._datatype).first()
+            self._root = _blacken(_delete(self._root, value))
+            return value
+
+    def pollLast(self):
+        """
+        Removes and returns the last element of the set, or None if the set is empty.
+        """
+        with self._write_lock:
+            if self._root is None:
+                return None
+            value = TreeSetSnapshot(self._root, self._datatype).last()
+            self._root = _blacken(_delete(self._root, value))
+            return value
+
+    def snapshot(self):
+        """
+        Returns an immutable, consistent view of the current elements that can be read without locks.
+
+        Returns:
+            A TreeSetSnapshot of the current version of the set.
+        """
+        return TreeSetSnapshot(self._root, self._datatype)
+
+    def ceiling(self, e):
+        """
+        Finds the smallest element that is greater than or equal to the given element, or None if none.
+        """
+        return self.snapshot().ceiling(e)
+
+    def contains(self, obj):
+        """
+        Checks if the set contains a given object.
+        """
+        return self.snapshot().contains(obj)
+
+    def descendingIterator(self):
+        """
+        Returns an iterator over a snapshot of the set in descending order, unaffected by later changes.
+        """
+        return self.snapshot().descendingIterator()
+
+    def first(self):
+        """
+        Returns the first element of the set, or None if the set is empty.
+        """
+        return self.snapshot().first()
+
+    def floor(self, e):
+        """
+        Finds the largest element that is less than or equal to the given element, or None if none.
+        """
+        return self.snapshot().floor(e)
+
+    def get(self, index):
+        """
+        Returns the element at the given position in ascending order, or None if the index is out of range.
+        """
+        return self.snapshot().get(index)
+
+    def higher(self, e):
+        """
+        Finds the smallest element that is strictly greater than the given element, or None if none.
+        """
+        return self.snapshot().higher(e)
+
+    def isEmpty(self):
+        """
+        Checks if the set is empty.
+        """
+        return self._root is None
+
+    def iterator(self):
+        """
+        Returns an iterator over a snapshot of the set, unaffected by later changes.
+        """
+        return self.snapshot().iterator()
+
+    def last(self):
+        """
+        Returns the last element of the set, or None if the set is empty.
+        """
+        return self.snapshot().last()
+
+    def lower(self, e):
+        """
+        Finds the largest element that is strictly less than the given element, or None if none.
+        """
+        return self.snapshot().lower(e)
+
+    def rank(self, e):
+        """
+        Counts the elements of the set that are strictly less than the given element.
+        """
+        return self.snapshot().rank(e)
+
+    def size(self):
+        """
+        Returns the number of elements in the set.
+        """
+        return self.snapshot().size()
+
+    def raise_type_error(self, obj, supported_datatype):
+        """
+        Raises a TypeError exception indicating that the datatype is not supported.
+        """
+        raise TypeError("The datatype {} is not supported. Only {} are supported.".format(
+            type(obj), supported_datatype))
@@ -1,420 +1,1388 @@
-class Node:
-    def __init__(self, value, color='RED'):
-        """
-        Initializes a new node with a specific value and color, defaulting to RED.
-        Also initializes the left, right, and parent node links as None.
-        """
-        self.value = value
-        self.color = color
-        self.left = None
-        self.right = None
-        self.parent = None
-
-class RedBlackTree:
-    def __init__(self):
-        """
-        Initializes a new red-black tree by setting the root to None and the size to 0.
-        """
-        self.root = None
-        self.size = 0
-
-    def add(self, value):
-        """
-        Adds a value to the red-black tree. If the value already exists, the function exits without making changes.
-        If the tree is empty, inserts a new black node as the root. Otherwise, inserts a red node
-        and then adjusts the tree to correct red-black properties violations.
-        """
-        if self.contains(value):
-            return False
-
-        if self.root is None:
-            self.root = Node(value, 'BLACK')
-            self.size += 1
-            return
-        current = self.root
-        parent = None
-        while current is not None:
-            parent = current
-            if value < current.value:
-                current = current.left
-            elif value > current.value:
-                current = current.right
-            else:
-                return  # Value already exists, no need to add
-        new_node = Node(value)
-        new_node.parent = parent
-        if value < parent.value:
-            parent.left = new_node
-        else:
-            parent.right = new_node
-        self.fix_red_red_violation(new_node)
-        self.size += 1
-
-    def fix_red_red_violation(self, node):
-        """
-        Fixes violations of the red-black properties caused after insertion.
-        Colors are adjusted and necessary rotations are performed to maintain the tree's balance.
-        """
-        while node != self.root and node.parent.color == 'RED':
-            if node.parent == node.parent.parent.left:
-                uncle = node.parent.parent.right
-                if uncle is not None and uncle.color == 'RED':
-                    node.parent.color = 'BLACK'
-                    uncle.color = 'BLACK'
-                    node.parent.parent.color = 'RED'
-                    node = node.parent.parent
-                else:
-                    if node == node.parent.right:
-                        node = node.parent
-                        self.left_rotate(node)
-                    node.parent.color = 'BLACK'
-                    node.parent.parent.color = 'RED'
-                    self.right_rotate(node.parent.parent)
-            else:
-                uncle = node.parent.parent.left
-                if uncle is not None and uncle.color == 'RED':
-                    node.parent.color = 'BLACK'
-                    uncle.color = 'BLACK'
-                    node.parent.parent.color = 'RED'
-                    node = node.parent.parent
-                else:
-                    if node == node.parent.left:
-                        node = node.parent
-                        self.right_rotate(node)
-                    node.parent.color = 'BLACK'
-                    node.parent.parent.color = 'RED'
-                    self.left_rotate(node.parent.parent)
-        self.root.color = 'BLACK'
-
-    def left_rotate(self, node):
-        """
-        Performs a left rotation on a given node, reassigning the node's links, its right child,
-        and the parent to maintain the order of the binary search tree.
-        """
-        right_child = node.right
-        node.right = right_child.left
-        if right_child.left is not None:
-            right_child.left.parent = node
-        right_child.parent = node.parent
-        if node.parent is None:
-            self.root = right_child
-        elif node == node.parent.left:
-            node.parent.left = right_child
-        else:
-            node.parent.right = right_child
-        right_child.left = node
-        node.parent = right_child
-
-    def right_rotate(self, node):
-        """
-        Performs a right rotation on a given node, reassigning the node's links, its left child,
-        and the parent to maintain the order of the binary search tree.
-        """
-        left_child = node.left
-        node.left = left_child.right
-        if left_child.right is not None:
-            left_child.right.parent = node
-        left_child.parent = node.parent
-        if node.parent is None:
-            self.root = left_child
-        elif node == node.parent.right:
-            node.parent.right = left_child
-        else:
-            node.parent.left = left_child
-        left_child.right = node
-        node.parent = left_child
-
-    def contains(self, value):
-        """
-        Checks if a specific value exists in the red-black tree.
-        Utilizes a recursive helper method to search through the sub-trees.
-        """
-        return self._contains_helper(self.root, value)
-
-    def _contains_helper(self, node, value):
-        if node is None:
-            return False
-        if value < node.value:
-            return self._contains_helper(node.left, value)
-        elif value > node.value:
-            return self._contains_helper(node.right, value)
-        else:
-            return True
-
-    def atIndex(self, index):
-        """
-        Returns the value of the node at the given index, using an in-order traversal of the tree.
-        This method considers the size of the left subtree to determine the relative position of the index.
-        """
-        return self._at_index_helper(self.root, index)
-
-    def _at_index_helper(self, node, index):
-        """
-        Recursive helper method to find the value of the node at a specific index.
-        Utilizes the size of the left subtree to navigate through the tree.
-        """
-        if node is None:
-            return None
-        left_size = self._size(node.left)
-        if index == left_size:
-            return node.value
-        elif index < left_size:
-            return self._at_index_helper(node.left, index)
-        else:
-            return self._at_index_helper(node.right, index - left_size - 1)
-
-    def _size(self, node):
-        """
-        Calculates the total number of nodes in a subtree, including the current node.
-        """
-        if node is None:
-            return 0
-        return 1 + self._size(node.left) + self._size(node.right)
-
-    def length(self):
-        """
-        Returns the size of the tree, i.e., the total number of nodes.
-        """
-        return self.size
-
-    def remove(self, value):
-        """
-        Removes a node with a specific value from the tree. If the node has two children,
-        it finds the successor to replace it and then removes the successor node.
-        """
-        node = self._find_node(value)
-        if node is None:
-            return
-        self._remove_node(node)
-        self.size -= 1
-
-    def _find_node(self, value):
-        """
-        Finds and returns the node containing the given value.
-        If the value does not exist in the tree, returns None.
-        """
-        current = self.root
-        while current is not None:
-            if value < current.value:
-                current = current.left
-            elif value > current.value:
-                current = current.right
-            else:
-                return current
-        return None
-
-    def _remove_node(self, node):
-        """
-        Removes the node from the tree. If the node to be removed has two children,
-        this method uses the successor to replace the node's value and then removes the successor.
-        It also handles fixing red-black properties violations after removal.
-        """
-        if node.left is not None and node.right is not None:
-            successor = self._min_value_node(node.right)
-            node.value = successor.value
-            node = successor
-        child = node.left if node.left is not None else node.right
-        if node.color == 'BLACK':
-            if child is None:
-                self.fix_double_black(node)
-            else:
-                node.value = child.value
-                node.left = None
-                node.right = None
-        else:
-            if child is not None:
-                node.value = child.value
-                node.left = None
-                node.right = None
-            else:
-                if node.parent is None:
-                    self.root = None
-                else:
-                    if node == node.parent.left:
-                        node.parent.left = None
-                    else:
-                        node.parent.right = None
-        if node.color == 'BLACK':
-            self.fix_double_black(node)
-
-    def fix_double_black(self, node):
-        """
-        Fixes double black violations that may occur after the removal of a black node.
-        This method uses rotations and recolors nodes to restore red-black properties.
-        """
-        if node == self.root:
-            return
-        sibling = self._get_sibling(node)
-        parent = node.parent
-        if sibling is None:
-            self.fix_double_black(parent)
-        else:
-            if sibling.color == 'RED':
-                parent.color, sibling.color = sibling.color, parent.color
-                if sibling == parent.left:
-                    self.right_rotate(parent)
-                else:
-                    self.left_rotate(parent)
-                self.fix_double_black(node)
-            else:
-                if (sibling.left is None or sibling.left.color == 'BLACK') and \
-                   (sibling.right is None or sibling.right.color == 'BLACK'):
-                    sibling.color = 'RED'
-                    if parent.color == 'BLACK':
-                        self.fix_double_black(parent)
-                    else:
-                        parent.color = 'BLACK'
-                else:
-                    if sibling == parent.left:
-                        if sibling.left is None or sibling.left.color == 'BLACK':
-                            self.left_rotate(sibling)
-                            sibling = sibling.parent
-                        sibling.color = parent.color
-                        parent.color = 'BLACK'
-                        sibling.left.color = 'BLACK'
-                        self.right_rotate(parent)
-                    else:
-                        if sibling.right is None or sibling.right.color == 'BLACK':
-                            self.right_rotate(sibling)
-                            sibling = sibling.parent
-                        sibling.color = parent.color
-                        parent.color = 'BLACK'
-                        sibling.right.color = 'BLACK'
-                        self.left_rotate(parent)
-
-    def _get_sibling(self, node):
-        """
-        Returns the sibling of the given node, i.e., the other child of the node's parent.
-        """
-        if node.parent is None:
-            return None
-        if node == node.parent.left:
-            return node.parent.right
-        else:
-            return node.parent.left
-
-    def _min_value_node(self, node):
-        """
-        Finds and returns the node with the minimum value in the specified subtree.
-        This is always the leftmost node.
-        """
-        current = node
-        while current.left is not None:
-            current = current.left
-        return current
-
-    def clear(self):
-        """
-        Clears the tree by removing all references to the nodes,
-        setting the root to None, and the size to 0.
-        """
-        self.root = None
-        self.size = 0
-
-    def ceiling(self, value):
-        """
-        Finds the smallest value in the tree that is greater than or equal to the given value.
-        """
-        current = self.root
-        ceiling_value = None
-        while current:
-            if current.value >= value:
-                ceiling_value = current.value
-                current = current.left
-            else:
-                current = current.right
-        return ceiling_value
-
-    def first(self):
-        """
-        Returns the value of the first node in the tree, which is the smallest.
-        """
-        current = self.root
-        if current is None:
-            return None
-        while current.left is not None:
-            current = current.left
-        return current.value
-
-    def higher(self, e):
-        """
-        Finds and returns the lowest value in the tree that is greater than the given value.
-        If there is no such value, returns None.
-        """
-        return self._higher_helper(self.root, e)
-
-    def _higher_helper(self, node, e):
-        """
-        Auxiliary method to find the lowest value greater than the given one.
-        Recursively navigates through the tree to find the right value.
-        """
-        if node is None:
-            return None
-        if e < node.value:
-            if node.left is not None and e < node.left.value:
-                return self._higher_helper(node.left, e)
-            return node.value
-        else:
-            return self._higher_helper(node.right, e)
-
-    def pollFirst(self):
-        """
-        Removes and returns the value of the node with the minimum value in the tree.
-        Uses _min_value_node to find this node and then removes it.
-        """
-        if self.root is None:
-            return None
-        min_node = self._min_value_node(self.root)
-        self.remove(min_node.value)
-        return min_node.value
-
-    def pollLast(self):
-        """
-        Removes and returns the value of the node with the maximum value in the tree.
-        Uses the last method to find this node and then removes it.
-        """
-        if self.tree.length == 0:
-            return None
-        last_value = self.last()
-        self.remove(last_value)
-        return last_value
-
-    def _max_value_node(self, node):
-        """
-        Finds and returns the node with the maximum value in the specified subtree.
-        This is always the rightmost node.
-        """
-        current = node
-        while current.right is not None:
-            current = current.right
-        return current
-
-    def __iter__(self):
-        """
-        Returns an iterator that traverses the tree in ascending order.
-        """
-        return self._inorder_iterator(self.root)
-
-    def _inorder_iterator(self, node):
-        """
-        Generator that traverses the nodes of the tree in order (left, root, right).
-        """
-        if node is not None:
-            yield from self._inorder_iterator(node.left)
-            yield node.value
-            yield from self._inorder_iterator(node.right)
-
-    def __reversed__(self):
-        """
-        Returns an iterator that traverses the tree in descending order.
-        """
-        return self._reverse_inorder_iterator(self.root)
-
-    def _reverse_inorder_iterator(self, node):
-        """
-        Generator that traverses the nodes of the tree in reverse order (right, root, left).
-        """
-        if node is not None:
-            yield from self._reverse_inorder_iterator(node.right)
-            yield node.value
-            yield from self._reverse_inorder_iterator(node.left)
+import copy
+import operator
+
+RED = 0
+BLACK = 1
+
+
+class Node:
+    __slots__ = ('key', 'value', 'color', 'left', 'right', 'parent', 'size')
+
+    def __init__(self, value, color=RED, key=None):
+        """
+        Initializes a new node with a specific value and color, defaulting to RED.
+        Also initializes the left, right, and parent node links as None, and the
+        subtree size (the number of nodes rooted at this node) as 1.
+        The key is what the tree orders the node by. It defaults to the value itself; trees with a
+        key function store the key computed at insertion so that searches never recompute it.
+        Nodes use __slots__ and integer colors to keep the per-element footprint small.
+        """
+        self.key = value if key is None else key
+        self.value = value
+        self.color = color
+        self.left = None
+        self.right = None
+        self.parent = None
+        self.size = 1
+
+class RedBlackTree:
+    # The class of the nodes the tree creates, for trees whose nodes carry extra fields.
+    _node_class = Node
+    # What the node links hold where there is no node.
+    _nil = None
+
+    def __init__(self, key=None):
+        """
+        Initializes a new red-black tree by setting the root to None and the size to 0.
+        An optional key function orders the values by key(value) instead of by the values themselves.
+        The key is computed once when a value is inserted and cached in its node, and every argument
+        of a lookup is turned into a key once, so descents only compare cached keys.
+        mod_count counts the nodes inserted and removed, so that cursors can tell the tree has changed.
+        """
+        self.root = None
+        self.size = 0
+        self.key = key
+        self.mod_count = 0
+
+    def _key_of(self, value):
+        """
+        Returns the key that orders a value: the value itself, or its image by the key function.
+        """
+        return value if self.key is None else self.key(value)
+
+    @classmethod
+    def fromSorted(cls, values, key=None, keys=None):
+        """
+        Builds a tree from a list of values that is sorted in ascending order and free of duplicates.
+        The tree is built bottom-up in linear time with no rotations: each subtree takes the middle
+        value of its range as its root, so the tree is perfectly balanced, and the nodes on the
+        deepest level are colored red while all the others are black.
+        With a key function the values must be sorted by key; their keys may be passed in keys
+        when the caller has already computed them.
+        """
+        tree = cls(key)
+        n = len(values)
+        if n == 0:
+            return tree
+        if keys is None:
+            keys = values if key is None else [key(value) for value in values]
+        red_depth = n.bit_length() - 1
+        if red_depth == 0:
+            red_depth = -1
+        tree.root = tree._build_balanced(values, keys, 0, n, 0, red_depth, None)
+        tree.size = n
+        return tree
+
+    def _build_balanced(self, values, keys, lo, hi, depth, red_depth, parent):
+        """
+        Recursive helper that builds the balanced subtree for values[lo:hi] and returns its root.
+        """
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        node = self._node_class(values[mid], RED if depth == red_depth else BLACK, keys[mid])
+        node.parent = parent
+        node.size = hi - lo
+        node.left = self._build_balanced(values, keys, lo, mid, depth + 1, red_depth, node)
+        node.right = self._build_balanced(values, keys, mid + 1, hi, depth + 1, red_depth, node)
+        return node
+
+    def add(self, value):
+        """
+        Adds a value to the red-black tree in a single descent from the root, which both looks for the
+        value and finds the insertion point. If the value already exists, returns False without making changes.
+        If the tree is empty, inserts a new black node as the root. Otherwise, inserts a red node
+        and then adjusts the tree to correct red-black properties violations. Returns True if the value was added.
+        """
+        return self._insert(value if self.key is None else self.key(value), value)[1]
+
+    def _insert(self, key, value):
+        """
+        Single-descent insertion behind add, for a value whose key is already known.
+        Returns the node holding the key and True if it was created, or the existing node
+        and False if the key was already in the tree, which is then left unchanged.
+        """
+        if self.root is None:
+            self.root = self._node_class(value, BLACK, key)
+            self.size += 1
+            self.mod_count += 1
+            return self.root, True
+        current = self.root
+        while True:
+            if key < current.key:
+                if current.left is None:
+                    new_node = self._node_class(value, RED, key)
+                    current.left = new_node
+                    break
+                current = current.left
+            elif key > current.key:
+                if current.right is None:
+                    new_node = self._node_class(value, RED, key)
+                    current.right = new_node
+                    break
+                current = current.right
+            else:
+                return current, False  # Value already exists, no need to add
+        new_node.parent = current
+        parent = current
+        while parent is not None:
+            parent.size += 1
+            parent = parent.parent
+        self.fix_red_red_violation(new_node)
+        self.size += 1
+        self.mod_count += 1
+        return new_node, True
+
+    def fix_red_red_violation(self, node):
+        """
+        Fixes violations of the red-black properties caused after insertion.
+        Colors are adjusted and necessary rotations are performed to maintain the tree's balance.
+        """
+        while node != self.root and node.parent.color == RED:
+            if node.parent == node.parent.parent.left:
+                uncle = node.parent.parent.right
+                if uncle is not None and uncle.color == RED:
+                    node.parent.color = BLACK
+                    uncle.color = BLACK
+                    node.parent.parent.color = RED
+                    node = node.parent.parent
+                else:
+                    if node == node.parent.right:
+                        node = node.parent
+                        self.left_rotate(node)
+                    node.parent.color = BLACK
+                    node.parent.parent.color = RED
+                    self.right_rotate(node.parent.parent)
+            else:
+                uncle = node.parent.parent.left
+                if uncle is not None and uncle.color == RED:
+                    node.parent.color = BLACK
+                    uncle.color = BLACK
+                    node.parent.parent.color = RED
+                    node = node.parent.parent
+                else:
+                    if node == node.parent.left:
+                        node = node.parent
+                        self.right_rotate(node)
+                    node.parent.color = BLACK
+                    node.parent.parent.color = RED
+                    self.left_rotate(node.parent.parent)
+        self.root.color = BLACK
+
+    def left_rotate(self, node):
+        """
+        Performs a left rotation on a given node, reassigning the node's links, its right child,
+        and the parent to maintain the order of the binary search tree.
+        """
+        right_child = node.right
+        node.right = right_child.left
+        if right_child.left is not None:
+            right_child.left.parent = node
+        right_child.parent = node.parent
+        if node.parent is None:
+            self.root = right_child
+        elif node == node.parent.left:
+            node.parent.left = right_child
+        else:
+            node.parent.right = right_child
+        right_child.left = node
+        node.parent = right_child
+        right_child.size = node.size
+        node.size = 1 + self._size(node.left) + self._size(node.right)
+
+    def right_rotate(self, node):
+        """
+        Performs a right rotation on a given node, reassigning the node's links, its left child,
+        and the parent to maintain the order of the binary search tree.
+        """
+        left_child = node.left
+        node.left = left_child.right
+        if left_child.right is not None:
+            left_child.right.parent = node
+        left_child.parent = node.parent
+        if node.parent is None:
+            self.root = left_child
+        elif node == node.parent.right:
+            node.parent.right = left_child
+        else:
+            node.parent.left = left_child
+        left_child.right = node
+        node.parent = left_child
+        left_child.size = node.size
+        node.size = 1 + self._size(node.left) + self._size(node.right)
+
+    def contains(self, value):
+        """
+        Checks if a specific value exists in the red-black tree.
+        Walks down from the root in a loop, without recursion.
+        """
+        return self._find_node(value if self.key is None else self.key(value)) is not None
+
+    def atIndex(self, index):
+        """
+        Returns the value of the node at the given index, using an in-order traversal of the tree.
+        This method considers the size of the left subtree to determine the relative position of the index,
+        which is read from the subtree counts in O(1), so the whole lookup is O(log n).
+        """
+        current = self.root
+        while current is not None:
+            left_size = self._size(current.left)
+            if index == left_size:
+                return current.value
+            elif index < left_size:
+                current = current.left
+            else:
+                index -= left_size + 1
+                current = current.right
+        return None
+
+    def _size(self, node):
+        """
+        Returns the total number of nodes in a subtree, including the current node.
+        The count is kept up to date on every node, so no traversal is needed.
+        """
+        if node is None:
+            return 0
+        return node.size
+
+    def rank(self, value, inclusive=False):
+        """
+        Returns the number of values in the tree that are strictly less than the given value,
+        or less than or equal to it if inclusive is True.
+        The value does not need to be present in the tree.
+        """
+        key = value if self.key is None else self.key(value)
+        current = self.root
+        rank = 0
+        while current is not None:
+            if key < current.key:
+                current = current.left
+            elif key > current.key:
+                rank += self._size(current.left) + 1
+                current = current.right
+            elif inclusive:
+                return rank + self._size(current.left) + 1
+            else:
+                return rank + self._size(current.left)
+        return rank
+
+    def indexOf(self, value):
+        """
+        Returns the in-order index of the given value, or -1 if the value is not in the tree.
+        """
+        key = value if self.key is None else self.key(value)
+        current = self.root
+        rank = 0
+        while current is not None:
+            if key < current.key:
+                current = current.left
+            elif key > current.key:
+                rank += self._size(current.left) + 1
+                current = current.right
+            else:
+                return rank + self._size(current.left)
+        return -1
+
+    def length(self):
+        """
+        Returns the size of the tree, i.e., the total number of nodes.
+        """
+        return self.size
+
+    def _own_size(self, node):
+        """
+        Returns what a node adds to the size of its subtree on its own: 1, one value per node.
+        """
+        return 1
+
+    def validate(self):
+        """
+        Checks every invariant of the tree in a single O(n) in-order walk and returns True, or raises an
+        AssertionError naming the first violation: the root is black and has no parent, no red node has
+        a red child, every path from the root to a missing child crosses the same number of black nodes,
+        the keys are strictly increasing in order, every child links back to its parent, every subtree
+        size is its own size plus those of its children, and the number of nodes is self.size.
+        The walk uses an explicit stack and stops as soon as it has reached more nodes than self.size,
+        counted as they are pushed on the way down, so a tree whose links form a cycle is reported
+        instead of looping or filling the stack.
+        """
+        root = self.root
+        if root is None:
+            if self.size != 0:
+                raise AssertionError("The tree is empty but its size is {}.".format(self.size))
+            return True
+        if root.parent is not None:
+            raise AssertionError("The root {!r} has a parent.".format(root.value))
+        if root.color != BLACK:
+            raise AssertionError("The root {!r} is red.".format(root.value))
+        count = 0
+        pushed = 0
+        black_height = None
+        previous = None
+        stack = []
+        node = root
+        blacks = 0
+        while stack or node is not None:
+            while node is not None:
+                pushed += 1
+                if pushed > self.size:
+                    raise AssertionError("The tree holds more than its size of {} nodes.".format(self.size))
+                blacks += node.color == BLACK
+                stack.append((node, blacks))
+                node = node.left
+            node, blacks = stack.pop()
+            count += 1
+            if node.color != RED and node.color != BLACK:
+                raise AssertionError("The node {!r} has the invalid color {!r}.".format(node.value, node.color))
+            for child in (node.left, node.right):
+                if child is None:
+                    if black_height is None:
+                        black_height = blacks
+                    elif blacks != black_height:
+                        raise AssertionError("A path through {!r} has {} black nodes instead of {}.".format(
+                            node.value, blacks, black_height))
+                elif child.parent is not node:
+                    raise AssertionError("The child {!r} of {!r} does not link back to it.".format(child.value, node.value))
+                elif node.color == RED and child.color == RED:
+                    raise AssertionError("The red node {!r} has the red child {!r}.".format(node.value, child.value))
+            if previous is not None and not previous.key < node.key:
+                raise AssertionError("The node {!r} follows {!r} in order but is not greater.".format(
+                    node.value, previous.value))
+            expected = self._own_size(node) + self._size(node.left) + self._size(node.right)
+            if node.size != expected:
+                raise AssertionError("The subtree of {!r} has size {} instead of {}.".format(node.value, node.size, expected))
+            previous = node
+            node = node.right
+        if count != self.size:
+            raise AssertionError("The tree holds {} nodes but its size is {}.".format(count, self.size))
+        return True
+
+    def remove(self, value):
+        """
+        Removes a node with a specific value from the tree. If the node has two children,
+        it finds the successor to replace it and then removes the successor node.
+        The node is located in a single descent. Returns True if the value was removed,
+        or False if it was not in the tree.
+        """
+        node = self._find_node(value if self.key is None else self.key(value))
+        if node is None:
+            return False
+        self._remove_node(node)
+        self.size -= 1
+        return True
+
+    def _find_node(self, key):
+        """
+        Finds and returns the node with the given key.
+        If the key does not exist in the tree, returns None.
+        """
+        current = self.root
+        while current is not None:
+            if key < current.key:
+                current = current.left
+            elif key > current.key:
+                current = current.right
+            else:
+                return current
+        return None
+
+    def _remove_node(self, node):
+        """
+        Removes the node from the tree. If the node to be removed has two children,
+        this method uses the successor to replace the node's value and then removes the successor.
+        It also handles fixing red-black properties violations after removal, and decrements the
+        subtree counts on the path from the removed node up to the root.
+        """
+        self.mod_count += 1
+        if node.left is not None and node.right is not None:
+            successor = self._min_value_node(node.right)
+            node.key = successor.key
+            node.value = successor.value
+            node = successor
+        self._unlink_node(node)
+        parent = node.parent
+        while parent is not None:
+            parent.size -= 1
+            parent = parent.parent
+
+    def _unlink_node(self, node):
+        """
+        Detaches a node that has at most one child and restores the red-black properties.
+        A removed black leaf is fixed while it is still attached, so its parent link stays valid
+        afterwards for the callers that update the counts of its ancestors.
+        """
+        child = node.left if node.left is not None else node.right
+        if child is not None:
+            # A node with a single child is always black, and its child is a red leaf.
+            child.parent = node.parent
+            if node.parent is None:
+                self.root = child
+            elif node is node.parent.left:
+                node.parent.left = child
+            else:
+                node.parent.right = child
+            child.color = BLACK
+        else:
+            # The double black is fixed while the leaf is still attached, then the leaf is unlinked.
+            if node.color == BLACK:
+                self.fix_double_black(node)
+            if node.parent is None:
+                self.root = None
+            elif node is node.parent.left:
+                node.parent.left = None
+            else:
+                node.parent.right = None
+
+    def fix_double_black(self, node):
+        """
+        Fixes double black violations that may occur after the removal of a black node.
+        This method uses rotations and recolors nodes to restore red-black properties.
+        When the violation moves up to the parent, the loop continues from there instead of recursing.
+        """
+        while node is not self.root:
+            sibling = self._get_sibling(node)
+            parent = node.parent
+            if sibling is None:
+                node = parent
+            elif sibling.color == RED:
+                parent.color, sibling.color = sibling.color, parent.color
+                if sibling is parent.left:
+                    self.right_rotate(parent)
+                else:
+                    self.left_rotate(parent)
+            elif (sibling.left is None or sibling.left.color == BLACK) and \
+                    (sibling.right is None or sibling.right.color == BLACK):
+                sibling.color = RED
+                if parent.color == BLACK:
+                    node = parent
+                else:
+                    parent.color = BLACK
+                    return
+            else:
+                if sibling is parent.left:
+                    if sibling.left is None or sibling.left.color == BLACK:
+                        self.left_rotate(sibling)
+                        sibling = sibling.parent
+                    sibling.color = parent.color
+                    parent.color = BLACK
+                    sibling.left.color = BLACK
+                    self.right_rotate(parent)
+                else:
+                    if sibling.right is None or sibling.right.color == BLACK:
+                        self.right_rotate(sibling)
+                        sibling = sibling.parent
+                    sibling.color = parent.color
+                    parent.color = BLACK
+                    sibling.right.color = BLACK
+                    self.left_rotate(parent)
+                return
+
+    def _get_sibling(self, node):
+        """
+        Returns the sibling of the given node, i.e., the other child of the node's parent.
+        """
+        if node.parent is None:
+            return None
+        if node == node.parent.left:
+            return node.parent.right
+        else:
+            return node.parent.left
+
+    def _min_value_node(self, node):
+        """
+        Finds and returns the node with the minimum value in the specified subtree.
+        This is always the leftmost node.
+        """
+        current = node
+        while current.left is not None:
+            current = current.left
+        return current
+
+    def clone(self):
+        """
+        Returns a structural copy of the tree in O(n). Every node is copied with its color, cached key and
+        subtree size and linked in the same shape, so nothing is compared, inserted or rebalanced.
+        The values themselves are shared with the original tree.
+        """
+        tree = copy.copy(self)
+        if self.root is None:
+            return tree
+        tree.root = self._node_class(self.root.value, self.root.color, self.root.key)
+        tree.root.size = self.root.size
+        stack = [self.root, tree.root]
+        while stack:
+            target = stack.pop()
+            source = stack.pop()
+            child = source.left
+            if child is not None:
+                child_copy = target.left = self._node_class(child.value, child.color, child.key)
+                child_copy.size = child.size
+                child_copy.parent = target
+                stack.append(child)
+                stack.append(child_copy)
+            child = source.right
+            if child is not None:
+                child_copy = target.right = self._node_class(child.value, child.color, child.key)
+                child_copy.size = child.size
+                child_copy.parent = target
+                stack.append(child)
+                stack.append(child_copy)
+        return tree
+
+    def clear(self):
+        """
+        Clears the tree by removing all references to the nodes,
+        setting the root to None, and the size to 0.
+        """
+        self.root = None
+        self.size = 0
+        self.mod_count += 1
+
+    def ceiling(self, value):
+        """
+        Finds the smallest value in the tree that is greater than or equal to the given value.
+        """
+        key = value if self.key is None else self.key(value)
+        current = self.root
+        ceiling_value = None
+        while current:
+            if current.key >= key:
+                ceiling_value = current.value
+                current = current.left
+            else:
+                current = current.right
+        return ceiling_value
+
+    def floor(self, value):
+        """
+        Finds the largest value in the tree that is less than or equal to the given value.
+        """
+        key = value if self.key is None else self.key(value)
+        current = self.root
+        floor_value = None
+        while current:
+            if current.key <= key:
+                floor_value = current.value
+                current = current.right
+            else:
+                current = current.left
+        return floor_value
+
+    def lower(self, value):
+        """
+        Finds the largest value in the tree that is strictly less than the given value.
+        """
+        key = value if self.key is None else self.key(value)
+        current = self.root
+        lower_value = None
+        while current:
+            if current.key < key:
+                lower_value = current.value
+                current = current.right
+            else:
+                current = current.left
+        return lower_value
+
+    def first(self):
+        """
+        Returns the value of the first node in the tree, which is the smallest.
+        """
+        current = self.root
+        if current is None:
+            return None
+        while current.left is not None:
+            current = current.left
+        return current.value
+
+    def last(self):
+        """
+        Returns the value of the last node in the tree, which is the largest.
+        """
+        if self.root is None:
+            return None
+        return self._max_value_node(self.root).value
+
+    def higher(self, e):
+        """
+        Finds and returns the lowest value in the tree that is greater than the given value.
+        If there is no such value, returns None.
+        """
+        key = e if self.key is None else self.key(e)
+        current = self.root
+        higher_value = None
+        while current:
+            if key < current.key:
+                higher_value = current.value
+                current = current.left
+            else:
+                current = current.right
+        return higher_value
+
+    def pollFirst(self):
+        """
+        Removes and returns the value of the node with the minimum value in the tree.
+        Uses _min_value_node to find this node and then removes it without searching for it again.
+        """
+        if self.root is None:
+            return None
+        min_node = self._min_value_node(self.root)
+        value = min_node.value
+        self._remove_node(min_node)
+        self.size -= 1
+        return value
+
+    def pollLast(self):
+        """
+        Removes and returns the value of the node with the maximum value in the tree.
+        Uses _max_value_node to find this node and then removes it without searching for it again.
+        """
+        if self.root is None:
+            return None
+        max_node = self._max_value_node(self.root)
+        value = max_node.value
+        self._remove_node(max_node)
+        self.size -= 1
+        return value
+
+    def _max_value_node(self, node):
+        """
+        Finds and returns the node with the maximum value in the specified subtree.
+        This is always the rightmost node.
+        """
+        current = node
+        while current.right is not None:
+            current = current.right
+        return current
+
+    def _successor(self, node):
+        """
+        Returns the in-order successor of a node by following the parent links, or None if it is the last node.
+        """
+        if node.right is not None:
+            return self._min_value_node(node.right)
+        parent = node.parent
+        while parent is not None and node is parent.right:
+            node = parent
+            parent = parent.parent
+        return parent
+
+    def _predecessor(self, node):
+        """
+        Returns the in-order predecessor of a node by following the parent links, or None if it is the first node.
+        """
+        if node.left is not None:
+            return self._max_value_node(node.left)
+        parent = node.parent
+        while parent is not None and node is parent.left:
+            node = parent
+            parent = parent.parent
+        return parent
+
+    def _first_node(self):
+        """
+        Returns the node with the smallest key, or None if the tree is empty.
+        """
+        return None if self.root is None else self._min_value_node(self.root)
+
+    def _last_node(self):
+        """
+        Returns the node with the largest key, or None if the tree is empty.
+        """
+        return None if self.root is None else self._max_value_node(self.root)
+
+    def _value_of(self, node):
+        """
+        Returns the value held by a node.
+        """
+        return node.value
+
+    def _remove_and_advance(self, node):
+        """
+        Removes a node and returns the node that holds the next value afterwards, or None if it was the last.
+        A node with two children receives the value of its successor, so it is itself the answer.
+        """
+        if node.left is not None and node.right is not None:
+            following = node
+        else:
+            following = self._successor(node)
+        self._remove_node(node)
+        self.size -= 1
+        return following
+
+    def _lower_bound_node(self, key, inclusive=True):
+        """
+        Returns the node with the smallest key greater than or equal to the given key
+        (strictly greater if inclusive is False), or None if there is no such node.
+        """
+        current = self.root
+        result = None
+        while current is not None:
+            if key < current.key or (inclusive and not key > current.key):
+                result = current
+                current = current.left
+            else:
+                current = current.right
+        return result
+
+    def _upper_bound_node(self, key, inclusive=True):
+        """
+        Returns the node with the largest key less than or equal to the given key
+        (strictly less if inclusive is False), or None if there is no such node.
+        """
+        current = self.root
+        result = None
+        while current is not None:
+            if key > current.key or (inclusive and not key < current.key):
+                result = current
+                current = current.right
+            else:
+                current = current.left
+        return result
+
+    def _range_nodes(self, lo=None, hi=None, lo_inclusive=True, hi_inclusive=False, reverse=False):
+        """
+        Generator over the nodes whose keys lie between the keys lo and hi, in ascending order or in
+        descending order if reverse is True. A bound of None leaves that side of the range open.
+        Used by callers that need the nodes themselves, such as maps reading both key and value.
+        """
+        if reverse:
+            if hi is None:
+                node = self._max_value_node(self.root) if self.root is not None else None
+            else:
+                node = self._upper_bound_node(hi, hi_inclusive)
+            while node is not None:
+                if lo is not None and (node.key < lo or (not lo_inclusive and not node.key > lo)):
+                    return
+                yield node
+                node = self._predecessor(node)
+        else:
+            if lo is None:
+                node = self._min_value_node(self.root) if self.root is not None else None
+            else:
+                node = self._lower_bound_node(lo, lo_inclusive)
+            while node is not None:
+                if hi is not None and (node.key > hi or (not hi_inclusive and not node.key < hi)):
+                    return
+                yield node
+                node = self._successor(node)
+
+    def searchMany(self, probes, keys=None):
+        """
+        Finds the floor and the ceiling of every value of an ascending sequence of probes in one coordinated walk.
+        The path of the previous search is kept as a finger, with the nearest smaller and larger ancestor
+        of each node on it. The next probe climbs the finger only until it reaches a subtree whose
+        range can still hold the answer and descends from there, so nearby probes cost O(1) instead of
+        a full descent from the root. Returns a list with a (floor, ceiling) pair per probe, where a
+        missing side is None. The keys of the probes may be passed in keys if the caller has them.
+        """
+        if keys is None:
+            keys = probes if self.key is None else [self.key(probe) for probe in probes]
+        results = []
+        finger = []
+        for probe in keys:
+            while finger:
+                upper = finger[-1][2]
+                if upper is None or probe < upper.key:
+                    break
+                finger.pop()
+            if finger:
+                node, lower, upper = finger.pop()
+            else:
+                node, lower, upper = self.root, None, None
+            while node is not None:
+                finger.append((node, lower, upper))
+                if probe < node.key:
+                    upper = node
+                    node = node.left
+                elif probe > node.key:
+                    lower = node
+                    node = node.right
+                else:
+                    lower = upper = node
+                    break
+            results.append((None if lower is None else lower.value, None if upper is None else upper.value))
+        return results
+
+    def irange(self, lo=None, hi=None, lo_inclusive=True, hi_inclusive=False, reverse=False):
+        """
+        Returns a lazy iterator over the values between lo and hi, in ascending order or in descending
+        order if reverse is True. A bound of None leaves that side of the range open. The start of the
+        range is found in a single descent and the iterator then follows successor links until it
+        passes the other bound, so no values outside the range are visited.
+        """
+        if self.key is not None:
+            lo = None if lo is None else self.key(lo)
+            hi = None if hi is None else self.key(hi)
+        if reverse:
+            return self._reverse_range_iterator(lo, hi, lo_inclusive, hi_inclusive)
+        return self._range_iterator(lo, hi, lo_inclusive, hi_inclusive)
+
+    def _range_iterator(self, lo, hi, lo_inclusive, hi_inclusive):
+        """
+        Generator behind irange for ascending order. The bounds are keys.
+        """
+        if lo is None:
+            node = self._min_value_node(self.root) if self.root is not None else None
+        else:
+            node = self._lower_bound_node(lo, lo_inclusive)
+        while node is not None:
+            key = node.key
+            if hi is not None and (key > hi or (not hi_inclusive and not key < hi)):
+                return
+            yield node.value
+            if node.right is not None:
+                node = node.right
+                while node.left is not None:
+                    node = node.left
+            else:
+                parent = node.parent
+                while parent is not None and node is parent.right:
+                    node = parent
+                    parent = parent.parent
+                node = parent
+
+    def _reverse_range_iterator(self, lo, hi, lo_inclusive, hi_inclusive):
+        """
+        Generator behind irange for descending order. The bounds are keys.
+        """
+        if hi is None:
+            node = self._max_value_node(self.root) if self.root is not None else None
+        else:
+            node = self._upper_bound_node(hi, hi_inclusive)
+        while node is not None:
+            key = node.key
+            if lo is not None and (key < lo or (not lo_inclusive and not key > lo)):
+                return
+            yield node.value
+            if node.left is not None:
+                node = node.left
+                while node.right is not None:
+                    node = node.right
+            else:
+                parent = node.parent
+                while parent is not None and node is parent.left:
+                    node = parent
+                    parent = parent.parent
+                node = parent
+
+    def items(self):
+        """
+        Generator over the (key, value) pairs of the nodes in ascending order, which hands out the
+        cached keys along with the values.
+        """
+        node = self.root
+        if node is None:
+            return
+        while node.left is not None:
+            node = node.left
+        while node is not None:
+            yield node.key, node.value
+            if node.right is not None:
+                node = node.right
+                while node.left is not None:
+                    node = node.left
+            else:
+                parent = node.parent
+                while parent is not None and node is parent.right:
+                    node = parent
+                    parent = parent.parent
+                node = parent
+
+    def __iter__(self):
+        """
+        Returns an iterator that traverses the tree in ascending order.
+        """
+        return self._inorder_iterator()
+
+    def _inorder_iterator(self):
+        """
+        Generator that traverses the nodes of the tree in order (left, root, right).
+        It walks from each node to its successor along the child and parent links, so every value
+        is produced by a single generator frame instead of one frame per tree level.
+        """
+        node = self.root
+        if node is None:
+            return
+        while node.left is not None:
+            node = node.left
+        while node is not None:
+            yield node.value
+            if node.right is not None:
+                node = node.right
+                while node.left is not None:
+                    node = node.left
+            else:
+                parent = node.parent
+                while parent is not None and node is parent.right:
+                    node = parent
+                    parent = parent.parent
+                node = parent
+
+    def __reversed__(self):
+        """
+        Returns an iterator that traverses the tree in descending order.
+        """
+        return self._reverse_inorder_iterator()
+
+    def _reverse_inorder_iterator(self):
+        """
+        Generator that traverses the nodes of the tree in reverse order (right, root, left),
+        walking from each node to its predecessor along the child and parent links.
+        """
+        node = self.root
+        if node is None:
+            return
+        while node.right is not None:
+            node = node.right
+        while node is not None:
+            yield node.value
+            if node.left is not None:
+                node = node.left
+                while node.right is not None:
+                    node = node.right
+            else:
+                parent = node.parent
+                while parent is not None and node is parent.left:
+                    node = parent
+                    parent = parent.parent
+                node = parent
+
+
+class Monoid:
+    __slots__ = ('identity', 'measure', 'combine')
+
+    def __init__(self, identity, measure, combine):
+        """
+        Describes a summary that an augmented tree keeps for every subtree: measure maps a value to its
+        summary, combine merges the summaries of two adjacent runs of values, in order, and identity is
+        the summary of no value at all. combine must be associative, with identity as its neutral element.
+        """
+        self.identity = identity
+        self.measure = measure
+        self.combine = combine
+
+
+def _min_of(a, b):
+    return b if a is None else a if b is None or a <= b else b
+
+
+def _max_of(a, b):
+    return b if a is None else a if b is None or a >= b else b
+
+
+COUNT = Monoid(0, lambda value: 1, operator.add)
+SUM = Monoid(0, lambda value: value, operator.add)
+MIN = Monoid(None, lambda value: value, _min_of)
+MAX = Monoid(None, lambda value: value, _max_of)
+
+
+class AugmentedNode(Node):
+    __slots__ = ('aggregate',)
+
+
+class AugmentedRedBlackTree(RedBlackTree):
+    _node_class = AugmentedNode
+
+    def __init__(self, key=None, monoid=SUM):
+        """
+        Initializes an empty red-black tree whose nodes also hold the monoid summary of the values of
+        their subtree, such as their sum, minimum or maximum. The summaries are kept up to date by the
+        insertion and removal paths and by every rotation, so rangeAggregate can fold any range of
+        values from O(log n) precomputed summaries instead of visiting each value.
+        """
+        RedBlackTree.__init__(self, key)
+        self.monoid = monoid
+
+    @classmethod
+    def fromSorted(cls, values, key=None, keys=None, monoid=SUM):
+        """
+        Builds a balanced tree from sorted, duplicate-free values in linear time, as RedBlackTree.fromSorted
+        does, then computes the summaries bottom-up.
+        """
+        tree = super().fromSorted(values, key, keys)
+        tree.monoid = monoid
+        if tree.root is not None:
+            tree._summarize(tree.root)
+        return tree
+
+    def _summarize(self, node):
+        """
+        Recursive helper that computes the summaries of a whole subtree and returns the one of its root.
+        """
+        monoid = self.monoid
+        summary = monoid.measure(node.value)
+        if node.left is not None:
+            summary = monoid.combine(self._summarize(node.left), summary)
+        if node.right is not None:
+            summary = monoid.combine(summary, self._summarize(node.right))
+        node.aggregate = summary
+        return summary
+
+    def _update(self, node):
+        """
+        Recomputes the summary of a node from its value and the summaries of its children.
+        """
+        monoid = self.monoid
+        summary = monoid.measure(node.value)
+        if node.left is not None:
+            summary = monoid.combine(node.left.aggregate, summary)
+        if node.right is not None:
+            summary = monoid.combine(summary, node.right.aggregate)
+        node.aggregate = summary
+
+    def _update_path(self, node):
+        """
+        Recomputes the summaries of a node and of every ancestor up to the root.
+        """
+        while node is not None:
+            self._update(node)
+            node = node.parent
+
+    def _insert(self, key, value):
+        """
+        Inserts as RedBlackTree._insert does. A new root gets its summary here; any other new node gets
+        it, with its ancestors, in fix_red_red_violation before the first rotation.
+        """
+        node, added = RedBlackTree._insert(self, key, value)
+        if added and self.size == 1:
+            node.aggregate = self.monoid.measure(value)
+        return node, added
+
+    def fix_red_red_violation(self, node):
+        """
+        Gives a freshly linked node its summary and updates its ancestors, then rebalances.
+        """
+        node.aggregate = self.monoid.measure(node.value)
+        self._update_path(node.parent)
+        RedBlackTree.fix_red_red_violation(self, node)
+
+    def left_rotate(self, node):
+        """
+        Rotates left. The node that moves up now roots the node's old subtree and takes over its summary;
+        the node that moves down is recomputed from its new children.
+        """
+        summary = node.aggregate
+        RedBlackTree.left_rotate(self, node)
+        self._update(node)
+        node.parent.aggregate = summary
+
+    def right_rotate(self, node):
+        """
+        Rotates right, maintaining the summaries as left_rotate does.
+        """
+        summary = node.aggregate
+        RedBlackTree.right_rotate(self, node)
+        self._update(node)
+        node.parent.aggregate = summary
+
+    def _unlink_node(self, node):
+        """
+        Unlinks a node as RedBlackTree._unlink_node does. Its value first leaves its own summary and those
+        of its ancestors, including the node that received the value of a removed successor, so the
+        summaries are exact while fix_double_black rotates around the node.
+        """
+        child = node.left if node.left is not None else node.right
+        node.aggregate = self.monoid.identity if child is None else child.aggregate
+        self._update_path(node.parent)
+        RedBlackTree._unlink_node(self, node)
+
+    def clone(self):
+        """
+        Returns a structural copy of the tree in O(n), summaries included.
+        """
+        tree = RedBlackTree.clone(self)
+        if self.root is not None:
+            stack = [(self.root, tree.root)]
+            while stack:
+                source, target = stack.pop()
+                target.aggregate = source.aggregate
+                if source.left is not None:
+                    stack.append((source.left, target.left))
+                if source.right is not None:
+                    stack.append((source.right, target.right))
+        return tree
+
+    def validate(self):
+        """
+        Checks the invariants of RedBlackTree.validate, then that every summary is the one _update would
+        compute from the node's value and the summaries of its children.
+        """
+        RedBlackTree.validate(self)
+        monoid = self.monoid
+        for node in self._range_nodes():
+            expected = monoid.measure(node.value)
+            if node.left is not None:
+                expected = monoid.combine(node.left.aggregate, expected)
+            if node.right is not None:
+                expected = monoid.combine(expected, node.right.aggregate)
+            if node.aggregate != expected:
+                raise AssertionError("The summary of {!r} is {!r} instead of {!r}.".format(
+                    node.value, node.aggregate, expected))
+        return True
+
+    def aggregate(self):
+        """
+        Returns the summary of all the values of the tree in O(1).
+        """
+        return self.monoid.identity if self.root is None else self.root.aggregate
+
+    def rangeAggregate(self, lo=None, hi=None, lo_inclusive=True, hi_inclusive=False):
+        """
+        Returns the summary of the values between lo and hi, folded in ascending order, in O(log n).
+        A bound of None leaves that side of the range open.
+        The search descends to the highest node inside the range, then walks each bound down from it:
+        every node on the lower walk that is inside the range contributes itself and its whole right
+        subtree, and every node on the upper walk contributes itself and its whole left subtree.
+        """
+        lo = None if lo is None else self._key_of(lo)
+        hi = None if hi is None else self._key_of(hi)
+
+        def above(key):
+            return lo is None or key > lo or (lo_inclusive and not key < lo)
+
+        def below(key):
+            return hi is None or key < hi or (hi_inclusive and not key > hi)
+
+        monoid = self.monoid
+        combine = monoid.combine
+        split = self.root
+        while split is not None:
+            if not above(split.key):
+                split = split.right
+            elif not below(split.key):
+                split = split.left
+            else:
+                break
+        if split is None:
+            return monoid.identity
+        left = monoid.identity
+        node = split.left
+        while node is not None:
+            if above(node.key):
+                part = monoid.measure(node.value)
+                if node.right is not None:
+                    part = combine(part, node.right.aggregate)
+                left = combine(part, left)
+                node = node.left
+            else:
+                node = node.right
+        right = monoid.identity
+        node = split.right
+        while node is not None:
+            if below(node.key):
+                part = monoid.measure(node.value)
+                if node.left is not None:
+                    part = combine(node.left.aggregate, part)
+                right = combine(right, part)
+                node = node.right
+            else:
+                node = node.left
+        return combine(combine(left, monoid.measure(split.value)), right)
+
+
+STATS_COUNTERS = ('comparisons', 'left_rotations', 'right_rotations', 'recolorings',
+                  'fix_double_black_calls', 'fix_double_black_steps', 'fix_double_black_max_depth')
+
+
+def _plain_key(key):
+    """
+    Returns the key wrapped in a _CountedKey, or the key itself if it is not wrapped.
+    """
+    return key.key if isinstance(key, _CountedKey) else key
+
+
+class _CountedKey:
+    """
+    Wraps the key of a value so that every comparison between two keys is counted, in the way
+    functools.cmp_to_key wraps values for a comparison function.
+
+    A wrapped key also compares with a plain one, on either side of the operator, so the internal
+    lookups that take keys rather than values, such as _find_node, work on an instrumented tree when
+    callers pass the keys they would pass to a plain tree.
+    """
+    __slots__ = ('key', 'counters')
+
+    def __init__(self, key, counters):
+        self.key = key
+        self.counters = counters
+
+    def __lt__(self, other):
+        self.counters['comparisons'] += 1
+        return self.key < _plain_key(other)
+
+    def __gt__(self, other):
+        self.counters['comparisons'] += 1
+        return self.key > _plain_key(other)
+
+    def __le__(self, other):
+        self.counters['comparisons'] += 1
+        return self.key <= _plain_key(other)
+
+    def __ge__(self, other):
+        self.counters['comparisons'] += 1
+        return self.key >= _plain_key(other)
+
+    def __eq__(self, other):
+        self.counters['comparisons'] += 1
+        return self.key == _plain_key(other)
+
+    def __hash__(self):
+        return hash(self.key)
+
+
+class InstrumentedRedBlackTree(RedBlackTree):
+
+    def __init__(self, key=None):
+        """
+        Initializes an empty red-black tree that counts the work it does: key comparisons, left and
+        right rotations, recolorings during insertion, and the calls to fix_double_black with the number
+        of levels each one climbs. The counters live in this subclass only, so RedBlackTree itself pays
+        nothing for them; a tree is instrumented by creating it from this class instead.
+        Comparisons are counted by wrapping every key, the way a comparator is wrapped by cmp_to_key.
+        """
+        RedBlackTree.__init__(self, key)
+        self.counters = dict.fromkeys(STATS_COUNTERS, 0)
+        self._order = key
+        self.key = self._counting_key()
+        self._double_black_depth = 0
+
+    def _counting_key(self):
+        """
+        Returns the key function of the tree: the one it was created with, or the identity, with its
+        result wrapped in a _CountedKey that reports to the counters of this tree.
+        """
+        counters = self.counters
+        order = self._order
+        if order is None:
+            return lambda value: _CountedKey(value, counters)
+        return lambda value: _CountedKey(order(value), counters)
+
+    def _wrap_keys(self):
+        """
+        Points the key of every node at the counters of this tree, wrapping it first if it is bare.
+        """
+        for node in self._range_nodes():
+            node.key = _CountedKey(_plain_key(node.key), self.counters)
+
+    @classmethod
+    def fromSorted(cls, values, key=None, keys=None):
+        """
+        Builds a balanced tree from sorted, duplicate-free values in linear time, as RedBlackTree.fromSorted
+        does, then wraps the keys of its nodes. Building compares nothing, so the counters start at zero.
+        """
+        if keys is None:
+            keys = values if key is None else [key(value) for value in values]
+        tree = super().fromSorted(values, key, keys)
+        tree._wrap_keys()
+        return tree
+
+    def clone(self):
+        """
+        Returns a structural copy of the tree in O(n), with counters of its own that start from the values
+        of this tree's.
+        """
+        tree = RedBlackTree.clone(self)
+        tree.counters = dict(self.counters)
+        tree.key = tree._counting_key()
+        tree._wrap_keys()
+        return tree
+
+    def items(self):
+        """
+        Generator over the (key, value) pairs in ascending order, as in RedBlackTree, with each key taken
+        out of the _CountedKey that wraps it.
+        """
+        for key, value in RedBlackTree.items(self):
+            yield key.key, value
+
+    def left_rotate(self, node):
+        """
+        Counts the rotation, then rotates left.
+        """
+        self.counters['left_rotations'] += 1
+        RedBlackTree.left_rotate(self, node)
+
+    def right_rotate(self, node):
+        """
+        Counts the rotation, then rotates right.
+        """
+        self.counters['right_rotations'] += 1
+        RedBlackTree.right_rotate(self, node)
+
+    def fix_red_red_violation(self, node):
+        """
+        Rebalances after an insertion and counts the nodes whose color it changed. The fix-up only
+        recolors nodes on the path from the new node to the root and their other children, so their
+        colors are recorded before and compared after.
+        """
+        colors = [(node, node.color)]
+        current = node
+        while current.parent is not None:
+            parent = current.parent
+            sibling = parent.right if current is parent.left else parent.left
+            colors.append((parent, parent.color))
+            if sibling is not None:
+                colors.append((sibling, sibling.color))
+            current = parent
+        RedBlackTree.fix_red_red_violation(self, node)
+        self.counters['recolorings'] += sum(1 for recorded, color in colors if recorded.color != color)
+
+    def fix_double_black(self, node):
+        """
+        Counts the call and the levels the double black climbs before it is resolved, which is the depth
+        a recursive fix-up would reach. Each level asks for the sibling of the current node once.
+        """
+        counters = self.counters
+        counters['fix_double_black_calls'] += 1
+        self._double_black_depth = 0
+        RedBlackTree.fix_double_black(self, node)
+        counters['fix_double_black_steps'] += self._double_black_depth
+        if self._double_black_depth > counters['fix_double_black_max_depth']:
+            counters['fix_double_black_max_depth'] = self._double_black_depth
+
+    def _get_sibling(self, node):
+        """
+        Returns the sibling of a node, counting one level of fix_double_black.
+        """
+        self._double_black_depth += 1
+        return RedBlackTree._get_sibling(self, node)
+
+    def reset_stats(self):
+        """
+        Sets every counter back to zero. The shape of the tree is left as it is.
+        """
+        for name in self.counters:
+            self.counters[name] = 0
+
+    def stats(self):
+        """
+        Returns a dictionary with the counters and the shape of the tree: its size, its height (the number
+        of nodes on the longest path from the root), the average depth of its nodes (the root being at
+        depth 1, so this is the average number of nodes a successful search visits) and its black-height,
+        counted along the leftmost path. The shape is measured by one O(n) walk, so the dictionary is a
+        snapshot meant for export rather than for reading on every operation.
+        """
+        result = dict(self.counters)
+        height = 0
+        total_depth = 0
+        stack = [(self.root, 1)] if self.root is not None else []
+        while stack:
+            node, depth = stack.pop()
+            total_depth += depth
+            if depth > height:
+                height = depth
+            if node.left is not None:
+                stack.append((node.left, depth + 1))
+            if node.right is not None:
+                stack.append((node.right, depth + 1))
+        black_height = 0
+        node = self.root
+        while node is not None:
+            if node.color == BLACK:
+                black_height += 1
+            node = node.left
+        result['size'] = self.size
+        result['height'] = height
+        result['average_depth'] = total_depth / self.size if self.size else 0.0
+        result['black_height'] = black_height
+        return result
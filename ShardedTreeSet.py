@@ -0,0 +1,418 @@
+import multiprocessing
+import os
+from bisect import bisect_left, bisect_right
+
+from TreeSet import TreeSet
+
+
+def _shard_worker(connection):
+    """
+    Main loop of a shard process. It owns one TreeSet and answers (method, args) requests with
+    (ok, result, size) replies until it receives None. Besides the TreeSet methods it understands
+    'values', which returns the elements as a list, and 'load', which replaces the elements with
+    an already sorted list.
+    """
+    shard = TreeSet()
+    while True:
+        request = connection.recv()
+        if request is None:
+            break
+        method, args = request
+        try:
+            if method == 'values':
+                result = list(shard.iterator())
+            elif method == 'load':
+                shard = TreeSet.fromSorted(args[0])
+                result = None
+            else:
+                result = getattr(shard, method)(*args)
+            connection.send((True, result, shard.size()))
+        except Exception as error:
+            connection.send((False, error, shard.size()))
+    connection.close()
+
+
+class ShardedTreeSet:
+    def __init__(self, shards=None, skew=2.0, rebalance_minimum=4096):
+        """
+        Constructor of the ShardedTreeSet class.
+
+        The key space is range-partitioned over worker processes, each owning a TreeSet, so bulk
+        writes run on every core instead of behind one interpreter lock. Shard i holds the elements
+        between split points i - 1 (inclusive) and i (exclusive). Point operations go to the one
+        shard owning the key; ordered queries walk the shards in order, since every element of a
+        shard is smaller than every element of the next one.
+
+        The split points are not known up front: everything starts in the first shard, and whenever
+        the largest shard holds more than skew times the average, the elements are redistributed so
+        that every shard holds the same number of them. With few shards skew times the average can
+        exceed the whole set, so the threshold is capped halfway between the average and the total:
+        two shards rebalance once one of them holds more than three quarters of the elements.
+
+        Args:
+            shards: The number of worker processes, by default the number of CPUs.
+            skew: The ratio between the largest shard and the average that triggers a rebalance.
+            rebalance_minimum: The number of elements below which the set is never rebalanced.
+        """
+        self._shard_count = shards or os.cpu_count() or 1
+        self._skew = skew
+        self._rebalance_minimum = rebalance_minimum
+        self._splits = []
+        self._sizes = [0] * self._shard_count
+        self._datatype = None
+        self._connections = []
+        self._processes = []
+        for _ in range(self._shard_count):
+            parent_end, child_end = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_shard_worker, args=(child_end,), daemon=True)
+            process.start()
+            child_end.close()
+            self._connections.append(parent_end)
+            self._processes.append(process)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _shard_of(self, obj):
+        """
+        Returns the index of the shard whose range holds the given element.
+        """
+        if not self._splits:
+            return 0
+        return bisect_right(self._splits, obj)
+
+    def _call(self, index, method, *args):
+        """
+        Runs a TreeSet method on one shard and waits for its result.
+        """
+        return self._scatter({index: (method, args)})[index]
+
+    def _scatter(self, requests):
+        """
+        Sends one request to each of several shards, then collects the replies, so the shards work
+        in parallel.
+
+        Args:
+            requests: A dict mapping shard indices to (method, args) pairs.
+
+        Returns:
+            A dict mapping the same shard indices to the results.
+
+        Raises:
+            The first exception raised by a shard, after every reply has been collected.
+        """
+        for index, request in requests.items():
+            self._connections[index].send(request)
+        results = {}
+        error = None
+        for index in requests:
+            ok, result, size = self._connections[index].recv()
+            self._sizes[index] = size
+            if ok:
+                results[index] = result
+            elif error is None:
+                error = result
+        if error is not None:
+            raise error
+        return results
+
+    def _partition(self, values):
+        """
+        Splits a sorted list of elements into per-shard runs.
+
+        Returns:
+            A dict mapping shard indices to non-empty sorted lists.
+        """
+        runs = {}
+        start = 0
+        for index in range(self._shard_count):
+            if index < len(self._splits):
+                end = bisect_left(values, self._splits[index], start)
+            else:
+                end = len(values)
+            if end > start:
+                runs[index] = values[start:end]
+            start = end
+        return runs
+
+    def _check_types(self, values):
+        """
+        Checks that every element has the set's data type, defining it from the first element if needed.
+        """
+        datatype = self._datatype or type(values[0])
+        for obj in values:
+            if type(obj) != datatype:
+                self.raise_type_error(obj, datatype)
+        self._datatype = datatype
+
+    def _maybe_rebalance(self):
+        """
+        Rebalances the shards if the largest one has grown too far past the average: beyond skew times
+        the average, or beyond halfway from the average to the total, whichever is lower.
+        """
+        total = sum(self._sizes)
+        if self._shard_count < 2 or total < self._rebalance_minimum:
+            return
+        average = total / self._shard_count
+        if max(self._sizes) > min(self._skew * average, (average + total) / 2):
+            self.rebalance()
+
+    def add(self, obj):
+        """
+        Adds an element to the shard owning its range.
+
+        Returns:
+            True if the object was added, False if it was already present.
+        """
+        self._check_types([obj])
+        added = self._call(self._shard_of(obj), 'add', obj)
+        if added:
+            self._maybe_rebalance()
+        return added
+
+    def addAll(self, objList):
+        """
+        Adds a list of elements. The elements are sorted, cut into one run per shard, and every shard
+        inserts its run in parallel.
+
+        Returns:
+            True after adding all elements.
+        """
+        values = sorted(objList)
+        if values:
+            self._check_types(values)
+            self._scatter({index: ('addAll', (run,)) for index, run in self._partition(values).items()})
+            self._maybe_rebalance()
+        return True
+
+    def ceiling(self, e):
+        """
+        Finds the smallest element that is greater than or equal to the given element, or None if none.
+        """
+        index = self._shard_of(e)
+        value = self._call(index, 'ceiling', e)
+        if value is None:
+            value = self._first_from(index + 1)
+        return value
+
+    def clear(self):
+        """
+        Removes all elements from every shard.
+        """
+        self._scatter({index: ('clear', ()) for index in range(self._shard_count)})
+        self._splits = []
+        self._datatype = None
+
+    def close(self):
+        """
+        Stops the shard processes. The set cannot be used afterwards.
+        """
+        for connection in self._connections:
+            connection.send(None)
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
+
+    def contains(self, obj):
+        """
+        Checks if the set contains a given object.
+        """
+        if type(obj) != self._datatype:
+            return False
+        return self._call(self._shard_of(obj), 'contains', obj)
+
+    def containsMany(self, values):
+        """
+        Checks membership of several values, every shard searching its own values in parallel.
+
+        Returns:
+            A list of booleans, one per value in the input order.
+        """
+        values = list(values)
+        order = sorted((v, i) for i, v in enumerate(values) if type(v) == self._datatype)
+        runs = self._partition([v for v, _ in order])
+        found = self._scatter({index: ('containsMany', (run,)) for index, run in runs.items()})
+        results = [False] * len(values)
+        position = 0
+        for index in sorted(found):
+            for flag in found[index]:
+                results[order[position][1]] = flag
+                position += 1
+        return results
+
+    def descendingIterator(self):
+        """
+        Returns an iterator over the elements in descending order, fetching one shard at a time.
+        """
+        for index in reversed(range(self._shard_count)):
+            if self._sizes[index]:
+                yield from reversed(self._call(index, 'values'))
+
+    def _first_from(self, start):
+        """
+        Returns the first element of the first non-empty shard at or after start, or None.
+        """
+        for index in range(start, self._shard_count):
+            if self._sizes[index]:
+                return self._call(index, 'first')
+        return None
+
+    def _last_before(self, end):
+        """
+        Returns the last element of the last non-empty shard before end, or None.
+        """
+        for index in reversed(range(end)):
+            if self._sizes[index]:
+                return self._call(index, 'last')
+        return None
+
+    def first(self):
+        """
+        Returns the first element of the set, or None if the set is empty.
+        """
+        return self._first_from(0)
+
+    def floor(self, e):
+        """
+        Finds the largest element that is less than or equal to the given element, or None if none.
+        """
+        index = self._shard_of(e)
+        value = self._call(index, 'floor', e)
+        if value is None:
+            value = self._last_before(index)
+        return value
+
+    def get(self, index):
+        """
+        Returns the element at the given position in ascending order, or None if the index is out of range.
+        """
+        if index < 0:
+            return None
+        for shard, size in enumerate(self._sizes):
+            if index < size:
+                return self._call(shard, 'get', index)
+            index -= size
+        return None
+
+    def higher(self, e):
+        """
+        Finds the smallest element that is strictly greater than the given element, or None if none.
+        """
+        index = self._shard_of(e)
+        value = self._call(index, 'higher', e)
+        if value is None:
+            value = self._first_from(index + 1)
+        return value
+
+    def isEmpty(self):
+        """
+        Checks if the set is empty.
+        """
+        return not any(self._sizes)
+
+    def iterator(self):
+        """
+        Returns an iterator over the elements in ascending order, fetching one shard at a time.
+        """
+        for index in range(self._shard_count):
+            if self._sizes[index]:
+                yield from self._call(index, 'values')
+
+    def last(self):
+        """
+        Returns the last element of the set, or None if the set is empty.
+        """
+        return self._last_before(self._shard_count)
+
+    def lower(self, e):
+        """
+        Finds the largest element that is strictly less than the given element, or None if none.
+        """
+        index = self._shard_of(e)
+        value = self._call(index, 'lower', e)
+        if value is None:
+            value = self._last_before(index)
+        return value
+
+    def pollFirst(self):
+        """
+        Removes and returns the first element of the set, or None if the set is empty.
+        """
+        for index in range(self._shard_count):
+            if self._sizes[index]:
+                return self._call(index, 'pollFirst')
+        return None
+
+    def pollLast(self):
+        """
+        Removes and returns the last element of the set, or None if the set is empty.
+        """
+        for index in reversed(range(self._shard_count)):
+            if self._sizes[index]:
+                return self._call(index, 'pollLast')
+        return None
+
+    def rank(self, e):
+        """
+        Counts the elements of the set that are strictly less than the given element.
+        """
+        index = self._shard_of(e)
+        return sum(self._sizes[:index]) + self._call(index, 'rank', e)
+
+    def rebalance(self):
+        """
+        Moves elements between shards so that every shard holds the same number of them, and moves
+        the split points accordingly. The shards are read in parallel, then reloaded in parallel
+        with a linear-time bulk build.
+        """
+        shards = self._scatter({index: ('values', ()) for index in range(self._shard_count)})
+        values = [value for index in range(self._shard_count) for value in shards[index]]
+        total = len(values)
+        if total < self._shard_count:
+            return
+        bounds = [total * index // self._shard_count for index in range(self._shard_count + 1)]
+        self._splits = [values[bounds[index]] for index in range(1, self._shard_count)]
+        self._scatter({index: ('load', (values[bounds[index]:bounds[index + 1]],))
+                       for index in range(self._shard_count)})
+
+    def remove(self, obj):
+        """
+        Removes an element from the set if it is present.
+
+        Returns:
+            True if the object was removed, False if it was not present.
+        """
+        if type(obj) != self._datatype:
+            return False
+        return self._call(self._shard_of(obj), 'remove', obj)
+
+    def removeAll(self, objList):
+        """
+        Removes every element of a list from the set, every shard removing its own run in parallel.
+
+        Returns:
+            True if the set changed, False otherwise.
+        """
+        values = sorted(obj for obj in objList if type(obj) == self._datatype)
+        if not values:
+            return False
+        changed = self._scatter({index: ('removeAll', (run,)) for index, run in self._partition(values).items()})
+        return any(changed.values())
+
+    def size(self):
+        """
+        Returns the number of elements in the set.
+        """
+        return sum(self._sizes)
+
+    def raise_type_error(self, obj, supported_datatype):
+        """
+        Raises a TypeError exception indicating that the datatype is not supported.
+        """
+        raise TypeError("The datatype {} is not supported. Only {} are supported.".format(
+            type(obj), supported_datatype))
@@ -0,0 +1,546 @@
+import copy
+from bisect import bisect_left, bisect_right
+from itertools import chain
+
+DEFAULT_LOAD = 1000
+
+
+class SortedChunkList:
+    # What the position lookups return where there is no element.
+    _nil = None
+
+    def __init__(self, key=None, load=DEFAULT_LOAD):
+        """
+        Initializes an empty sorted list of chunks, an alternative engine to the red-black tree.
+        The values are kept in a list of sorted Python lists ("chunks") of between load / 2 and
+        2 * load values, with the largest key of every chunk in a separate list. A search is two
+        bisections, one over the chunk maxima and one inside a chunk, both running in C over
+        contiguous lists, and an insertion or removal shifts the values of one chunk only. A chunk
+        that outgrows 2 * load values is split in two; one that shrinks below load / 2 is merged
+        into a neighbor. Positions are (chunk, offset) pairs. Positional queries read a Fenwick
+        tree over the chunk lengths, which is rebuilt lazily after a split or merge.
+        With a key function, the keys are stored in chunks parallel to the values; without one,
+        the key chunks are the value chunks themselves.
+        """
+        self.key = key
+        self._load = load
+        self._lists = []
+        self._keys = self._lists if key is None else []
+        self._maxes = []
+        self._index = None
+        self.size = 0
+        self.mod_count = 0
+
+    def _key_of(self, value):
+        """
+        Returns the key that orders a value: the value itself, or its image by the key function.
+        """
+        return value if self.key is None else self.key(value)
+
+    @classmethod
+    def fromSorted(cls, values, key=None, keys=None, load=DEFAULT_LOAD):
+        """
+        Builds the list from values that are sorted in ascending order and free of duplicates, by
+        cutting them into chunks of load values in linear time. With a key function the values must
+        be sorted by key; their keys may be passed in keys when the caller has already computed them.
+        """
+        chunks = cls(key, load)
+        values = list(values)
+        if not values:
+            return chunks
+        chunks._lists.extend(values[i:i + load] for i in range(0, len(values), load))
+        if key is not None:
+            if keys is None:
+                keys = [key(value) for value in values]
+            chunks._keys.extend(keys[i:i + load] for i in range(0, len(keys), load))
+        chunks._maxes = [chunk[-1] for chunk in chunks._keys]
+        chunks.size = len(values)
+        return chunks
+
+    def _build_index(self):
+        """
+        Builds the Fenwick tree over the chunk lengths: entry i, counted from 1, holds the total
+        length of the chunks i - (i & -i) to i - 1.
+        """
+        index = [0] + [len(chunk) for chunk in self._keys]
+        for i in range(1, len(index)):
+            parent = i + (i & -i)
+            if parent < len(index):
+                index[parent] += index[i]
+        self._index = index
+
+    def _index_add(self, i, delta):
+        """
+        Adds delta to the length of chunk i in the Fenwick tree, if the tree is currently built.
+        """
+        index = self._index
+        if index is None:
+            return
+        i += 1
+        while i < len(index):
+            index[i] += delta
+            i += i & -i
+
+    def _prefix(self, i):
+        """
+        Returns the total length of the chunks before chunk i.
+        """
+        if self._index is None:
+            self._build_index()
+        index = self._index
+        total = 0
+        while i > 0:
+            total += index[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, position):
+        """
+        Returns the (chunk, offset) pair of a position between 0 and size - 1, by descending the Fenwick tree.
+        """
+        if self._index is None:
+            self._build_index()
+        index = self._index
+        chunk = 0
+        step = 1 << (len(index) - 1).bit_length()
+        while step:
+            following = chunk + step
+            if following < len(index) and index[following] <= position:
+                chunk = following
+                position -= index[following]
+            step >>= 1
+        return chunk, position
+
+    def _split(self, i):
+        """
+        Splits chunk i into two halves.
+        """
+        load = self._load
+        keys = self._keys[i]
+        self._keys.insert(i + 1, keys[load:])
+        del keys[load:]
+        if self.key is not None:
+            values = self._lists[i]
+            self._lists.insert(i + 1, values[load:])
+            del values[load:]
+        self._maxes[i] = keys[-1]
+        self._maxes.insert(i + 1, self._keys[i + 1][-1])
+        self._index = None
+
+    def _join(self, i):
+        """
+        Merges chunk i with a neighbor, splitting the result again if it is too large.
+        """
+        if i + 1 == len(self._keys):
+            i -= 1
+        self._keys[i].extend(self._keys[i + 1])
+        del self._keys[i + 1]
+        if self.key is not None:
+            self._lists[i].extend(self._lists[i + 1])
+            del self._lists[i + 1]
+        self._maxes[i] = self._maxes[i + 1]
+        del self._maxes[i + 1]
+        self._index = None
+        if len(self._keys[i]) > 2 * self._load:
+            self._split(i)
+
+    def _delete(self, i, j):
+        """
+        Removes the value at offset j of chunk i, merging or dropping the chunk if it gets too small.
+        """
+        keys = self._keys[i]
+        del keys[j]
+        if self.key is not None:
+            del self._lists[i][j]
+        self.size -= 1
+        self.mod_count += 1
+        if not keys:
+            del self._keys[i]
+            if self.key is not None:
+                del self._lists[i]
+            del self._maxes[i]
+            self._index = None
+            return
+        self._maxes[i] = keys[-1]
+        if len(keys) < self._load // 2 and len(self._keys) > 1:
+            self._join(i)
+        else:
+            self._index_add(i, -1)
+
+    def add(self, value):
+        """
+        Adds a value to the chunk whose range covers it. Returns True if the value was inserted
+        and False if it was already present.
+        """
+        key = value if self.key is None else self.key(value)
+        maxes = self._maxes
+        if not maxes:
+            self._lists.append([value])
+            if self.key is not None:
+                self._keys.append([key])
+            maxes.append(key)
+            self._index = None
+            self.size = 1
+            self.mod_count += 1
+            return True
+        i = bisect_left(maxes, key)
+        if i == len(maxes):
+            i -= 1
+            keys = self._keys[i]
+            keys.append(key)
+            if self.key is not None:
+                self._lists[i].append(value)
+            maxes[i] = key
+        else:
+            keys = self._keys[i]
+            j = bisect_left(keys, key)
+            if not key < keys[j]:
+                return False
+            keys.insert(j, key)
+            if self.key is not None:
+                self._lists[i].insert(j, value)
+        self.size += 1
+        self.mod_count += 1
+        if len(keys) > 2 * self._load:
+            self._split(i)
+        else:
+            self._index_add(i, 1)
+        return True
+
+    def _find_node(self, key):
+        """
+        Returns the position of the value with the given key, or None if the key is not in the list.
+        """
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return None
+        keys = self._keys[i]
+        j = bisect_left(keys, key)
+        return None if key < keys[j] else (i, j)
+
+    def contains(self, value):
+        """
+        Checks if a specific value exists in the list.
+        """
+        return self._find_node(value if self.key is None else self.key(value)) is not None
+
+    def remove(self, value):
+        """
+        Removes a value from the list. Returns True if the value was removed, or False if it was not present.
+        """
+        position = self._find_node(value if self.key is None else self.key(value))
+        if position is None:
+            return False
+        self._delete(*position)
+        return True
+
+    def atIndex(self, index):
+        """
+        Returns the value at the given position in ascending order, or None if the index is out of range.
+        """
+        if index < 0 or index >= self.size:
+            return None
+        i, j = self._locate(index)
+        return self._lists[i][j]
+
+    def rank(self, value, inclusive=False):
+        """
+        Returns the number of values in the list that are strictly less than the given value,
+        or less than or equal to it if inclusive is True.
+        """
+        key = value if self.key is None else self.key(value)
+        search = bisect_right if inclusive else bisect_left
+        i = search(self._maxes, key)
+        if i == len(self._maxes):
+            return self.size
+        return self._prefix(i) + search(self._keys[i], key)
+
+    def indexOf(self, value):
+        """
+        Returns the position of the given value in ascending order, or -1 if the value is not in the list.
+        """
+        position = self._find_node(value if self.key is None else self.key(value))
+        if position is None:
+            return -1
+        return self._prefix(position[0]) + position[1]
+
+    def length(self):
+        """
+        Returns the number of values in the list.
+        """
+        return self.size
+
+    def validate(self):
+        """
+        Checks every invariant of the list in O(n) and returns True, or raises an AssertionError naming the
+        first violation: the values, keys and maxima have one chunk per entry, no chunk is empty, the
+        keys are the cached images of the values and strictly increase across all chunks, each maximum
+        is the last key of its chunk, each chunk holds at most 2 * load values and every chunk but the
+        last at least load / 2, the Fenwick tree, when built, matches the chunk lengths, and the number
+        of values is self.size.
+        """
+        lists = self._lists
+        keys = self._keys
+        if self.key is None and keys is not lists:
+            raise AssertionError("The key chunks of a list without a key function are not its value chunks.")
+        if not len(lists) == len(keys) == len(self._maxes):
+            raise AssertionError("There are {} value chunks, {} key chunks and {} maxima.".format(
+                len(lists), len(keys), len(self._maxes)))
+        count = 0
+        previous = None
+        for i, chunk in enumerate(keys):
+            if not chunk:
+                raise AssertionError("The chunk {} is empty.".format(i))
+            if len(chunk) != len(lists[i]):
+                raise AssertionError("The chunk {} has {} keys for {} values.".format(i, len(chunk), len(lists[i])))
+            if len(chunk) > 2 * self._load or (len(chunk) < self._load // 2 and i + 1 < len(keys)):
+                raise AssertionError("The chunk {} holds {} values, outside the bounds of load {}.".format(
+                    i, len(chunk), self._load))
+            if self.key is not None:
+                for value, key in zip(lists[i], chunk):
+                    if self.key(value) != key:
+                        raise AssertionError("The value {!r} is cached with the key {!r}.".format(value, key))
+            for key in chunk:
+                if previous is not None and not previous < key:
+                    raise AssertionError("The key {!r} follows {!r} in order but is not greater.".format(key, previous))
+                previous = key
+            if self._maxes[i] != chunk[-1]:
+                raise AssertionError("The maximum of chunk {} is {!r} instead of {!r}.".format(i, self._maxes[i], chunk[-1]))
+            count += len(chunk)
+        if self._index is not None:
+            index = self._index
+            self._build_index()
+            if index != self._index:
+                raise AssertionError("The Fenwick tree does not match the chunk lengths.")
+        if count != self.size:
+            raise AssertionError("The list holds {} values but its size is {}.".format(count, self.size))
+        return True
+
+    def clone(self):
+        """
+        Returns a copy of the list in O(n). The chunks are copied as contiguous blocks; the values
+        themselves are shared.
+        """
+        chunks = copy.copy(self)
+        chunks._lists = [chunk[:] for chunk in self._lists]
+        chunks._keys = chunks._lists if self.key is None else [chunk[:] for chunk in self._keys]
+        chunks._maxes = self._maxes[:]
+        chunks._index = None
+        return chunks
+
+    def clear(self):
+        """
+        Removes every value from the list.
+        """
+        self._lists = []
+        self._keys = self._lists if self.key is None else []
+        self._maxes = []
+        self._index = None
+        self.size = 0
+        self.mod_count += 1
+
+    def _lower_bound_node(self, key, inclusive=True):
+        """
+        Returns the position of the smallest key greater than or equal to the given key
+        (strictly greater if inclusive is False), or None if there is no such key.
+        """
+        search = bisect_left if inclusive else bisect_right
+        i = search(self._maxes, key)
+        if i == len(self._maxes):
+            return None
+        return i, search(self._keys[i], key)
+
+    def _upper_bound_node(self, key, inclusive=True):
+        """
+        Returns the position of the largest key less than or equal to the given key
+        (strictly less if inclusive is False), or None if there is no such key.
+        """
+        search = bisect_right if inclusive else bisect_left
+        i = search(self._maxes, key)
+        if i < len(self._maxes):
+            j = search(self._keys[i], key)
+            if j:
+                return i, j - 1
+        if i == 0:
+            return None
+        return i - 1, len(self._keys[i - 1]) - 1
+
+    def _first_node(self):
+        """
+        Returns the position of the smallest value, or None if the list is empty.
+        """
+        return (0, 0) if self.size else None
+
+    def _last_node(self):
+        """
+        Returns the position of the largest value, or None if the list is empty.
+        """
+        return (len(self._keys) - 1, len(self._keys[-1]) - 1) if self.size else None
+
+    def _successor(self, position):
+        """
+        Returns the position that follows a position, or None if it is the last one.
+        """
+        i, j = position
+        if j + 1 < len(self._keys[i]):
+            return i, j + 1
+        if i + 1 < len(self._keys):
+            return i + 1, 0
+        return None
+
+    def _predecessor(self, position):
+        """
+        Returns the position that precedes a position, or None if it is the first one.
+        """
+        i, j = position
+        if j:
+            return i, j - 1
+        if i:
+            return i - 1, len(self._keys[i - 1]) - 1
+        return None
+
+    def _value_of(self, position):
+        """
+        Returns the value at a position.
+        """
+        return self._lists[position[0]][position[1]]
+
+    def _remove_and_advance(self, position):
+        """
+        Removes the value at a position and returns the position of the next value afterwards, or None
+        if it was the last. A merge may move the next value to another chunk, so it is looked up again.
+        """
+        key = self._keys[position[0]][position[1]]
+        self._delete(*position)
+        return self._lower_bound_node(key, False)
+
+    def _value_at(self, position):
+        """
+        Returns the value at a position, or None for a missing position.
+        """
+        return None if position is None else self._lists[position[0]][position[1]]
+
+    def ceiling(self, value):
+        """
+        Finds the smallest value in the list that is greater than or equal to the given value.
+        """
+        return self._value_at(self._lower_bound_node(self._key_of(value), True))
+
+    def floor(self, value):
+        """
+        Finds the largest value in the list that is less than or equal to the given value.
+        """
+        return self._value_at(self._upper_bound_node(self._key_of(value), True))
+
+    def higher(self, value):
+        """
+        Finds the smallest value in the list that is strictly greater than the given value.
+        """
+        return self._value_at(self._lower_bound_node(self._key_of(value), False))
+
+    def lower(self, value):
+        """
+        Finds the largest value in the list that is strictly less than the given value.
+        """
+        return self._value_at(self._upper_bound_node(self._key_of(value), False))
+
+    def first(self):
+        """
+        Returns the smallest value in the list, or None if the list is empty.
+        """
+        return self._lists[0][0] if self.size else None
+
+    def last(self):
+        """
+        Returns the largest value in the list, or None if the list is empty.
+        """
+        return self._lists[-1][-1] if self.size else None
+
+    def pollFirst(self):
+        """
+        Removes and returns the smallest value in the list, or None if the list is empty.
+        """
+        if not self.size:
+            return None
+        value = self._lists[0][0]
+        self._delete(0, 0)
+        return value
+
+    def pollLast(self):
+        """
+        Removes and returns the largest value in the list, or None if the list is empty.
+        """
+        if not self.size:
+            return None
+        i = len(self._keys) - 1
+        value = self._lists[i][-1]
+        self._delete(i, len(self._keys[i]) - 1)
+        return value
+
+    def searchMany(self, probes, keys=None):
+        """
+        Finds the floor and the ceiling of every value of an ascending sequence of probes.
+        Each probe resumes the bisection of the chunk maxima where the previous one stopped.
+        Returns a list with a (floor, ceiling) pair per probe, where a missing side is None.
+        The keys of the probes may be passed in keys if the caller has them.
+        """
+        if keys is None:
+            keys = probes if self.key is None else [self.key(probe) for probe in probes]
+        maxes = self._maxes
+        lists = self._lists
+        results = []
+        i = 0
+        for key in keys:
+            i = bisect_left(maxes, key, i)
+            if i == len(maxes):
+                results.append((self.last(), None))
+                continue
+            chunk = self._keys[i]
+            j = bisect_left(chunk, key)
+            ceiling = lists[i][j]
+            if not key < chunk[j]:
+                results.append((ceiling, ceiling))
+            elif j:
+                results.append((lists[i][j - 1], ceiling))
+            elif i:
+                results.append((lists[i - 1][-1], ceiling))
+            else:
+                results.append((None, ceiling))
+        return results
+
+    def irange(self, lo=None, hi=None, lo_inclusive=True, hi_inclusive=False, reverse=False):
+        """
+        Returns an iterator over the values between lo and hi, in ascending order or in descending
+        order if reverse is True. A bound of None leaves that side of the range open.
+        Both ends are located by bisection, then the chunks in between are read by index, so no
+        chunk is copied whatever its size.
+        """
+        start = self._first_node() if lo is None else self._lower_bound_node(self._key_of(lo), lo_inclusive)
+        stop = self._last_node() if hi is None else self._upper_bound_node(self._key_of(hi), hi_inclusive)
+        if start is None or stop is None or start > stop:
+            return iter(())
+        (i, j), (k, m) = start, stop
+        lists = self._lists
+        order = range(k, i - 1, -1) if reverse else range(i, k + 1)
+        spans = ((lists[c], j if c == i else 0, m + 1 if c == k else len(lists[c])) for c in order)
+        if reverse:
+            return chain.from_iterable(map(chunk.__getitem__, range(b - 1, a - 1, -1)) for chunk, a, b in spans)
+        return chain.from_iterable(map(chunk.__getitem__, range(a, b)) for chunk, a, b in spans)
+
+    def items(self):
+        """
+        Returns an iterator over the (key, value) pairs of the list in ascending order.
+        """
+        return chain.from_iterable(zip(keys, values) for keys, values in zip(self._keys, self._lists))
+
+    def __iter__(self):
+        """
+        Returns an iterator that traverses the list in ascending order.
+        """
+        return chain.from_iterable(self._lists)
+
+    def __reversed__(self):
+        """
+        Returns an iterator that traverses the list in descending order.
+        """
+        return chain.from_iterable(reversed(chunk) for chunk in reversed(self._lists))
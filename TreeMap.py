@@ -0,0 +1,578 @@
+from RedBlack import RedBlackTree
+
+
+class TreeMap:
+    def __init__(self):
+        """
+        Constructor of the TreeMap class.
+
+        Initializes a new TreeMap with an empty Red-Black Tree and undefined key type. Each node of
+        the tree holds a key together with its value, so every operation is a single descent and no
+        separate dictionary is needed. Keys must all have the type of the first key put in the map.
+        """
+        self.tree = RedBlackTree()
+        self._datatype = None
+
+    def _check_key(self, key):
+        """
+        Checks that a key matches the key type of the map, defining the type from the key if needed.
+
+        Raises:
+            TypeError: If the key's type differs from the map's key type.
+        """
+        if self._datatype is None:
+            self._datatype = type(key)
+        elif type(key) != self._datatype:
+            self.raise_type_error(key, self._datatype)
+
+    def _comparable(self, key):
+        """
+        Checks if a key can be looked up in the map.
+        """
+        return self._datatype is not None and type(key) == self._datatype
+
+    @staticmethod
+    def _entry(node):
+        """
+        Returns the (key, value) pair of a node, or None for a missing node.
+        """
+        return None if node is None else (node.key, node.value)
+
+    def ceilingEntry(self, key):
+        """
+        Finds the entry with the smallest key greater than or equal to the given key.
+
+        Args:
+            key: The key for which the ceiling is sought.
+
+        Returns:
+            A (key, value) pair, or None if there is none.
+        """
+        return self._entry(self.tree._lower_bound_node(key, True))
+
+    def ceilingKey(self, key):
+        """
+        Finds the smallest key greater than or equal to the given key, or None if there is none.
+        """
+        node = self.tree._lower_bound_node(key, True)
+        return None if node is None else node.key
+
+    def clear(self):
+        """
+        Removes all entries from the map.
+        """
+        self.tree.clear()
+        self._datatype = None
+
+    def clone(self):
+        """
+        Creates and returns a shallow copy of the map. The tree is copied structurally in O(n); the keys
+        and values themselves are shared.
+        """
+        new_map = TreeMap()
+        new_map._datatype = self._datatype
+        new_map.tree = self.tree.clone()
+        return new_map
+
+    def containsKey(self, key):
+        """
+        Checks if the map has an entry for a given key.
+
+        Returns:
+            True if the key is present, False otherwise.
+        """
+        return self._comparable(key) and self.tree._find_node(key) is not None
+
+    def descendingItems(self):
+        """
+        Returns a lazy iterator over the (key, value) pairs of the map in descending order of key.
+        """
+        return ((node.key, node.value) for node in self.tree._range_nodes(reverse=True))
+
+    def firstEntry(self):
+        """
+        Returns the entry with the smallest key, or None if the map is empty.
+        """
+        root = self.tree.root
+        return None if root is None else self._entry(self.tree._min_value_node(root))
+
+    def firstKey(self):
+        """
+        Returns the smallest key, or None if the map is empty.
+        """
+        entry = self.firstEntry()
+        return None if entry is None else entry[0]
+
+    def floorEntry(self, key):
+        """
+        Finds the entry with the largest key less than or equal to the given key.
+
+        Args:
+            key: The key for which the floor is sought.
+
+        Returns:
+            A (key, value) pair, or None if there is none.
+        """
+        return self._entry(self.tree._upper_bound_node(key, True))
+
+    def floorKey(self, key):
+        """
+        Finds the largest key less than or equal to the given key, or None if there is none.
+        """
+        node = self.tree._upper_bound_node(key, True)
+        return None if node is None else node.key
+
+    def get(self, key, default=None):
+        """
+        Returns the value mapped to a key.
+
+        Args:
+            key: The key to look up.
+            default: The value returned when the key is not in the map.
+
+        Returns:
+            The value of the key, or the default if the key is not present.
+        """
+        if not self._comparable(key):
+            return default
+        node = self.tree._find_node(key)
+        return default if node is None else node.value
+
+    def headMap(self, toKey, inclusive=False):
+        """
+        Returns a view of the entries whose keys are less than the given key.
+
+        Args:
+            toKey: The upper bound of the view.
+            inclusive: If True, the bound itself is part of the view.
+
+        Returns:
+            A TreeMapView over the entries below the bound.
+        """
+        return TreeMapView(self, None, True, toKey, inclusive)
+
+    def higherEntry(self, key):
+        """
+        Finds the entry with the smallest key strictly greater than the given key, or None if there is none.
+        """
+        return self._entry(self.tree._lower_bound_node(key, False))
+
+    def higherKey(self, key):
+        """
+        Finds the smallest key strictly greater than the given key, or None if there is none.
+        """
+        node = self.tree._lower_bound_node(key, False)
+        return None if node is None else node.key
+
+    def isEmpty(self):
+        """
+        Checks if the map is empty.
+        """
+        return self.tree.length() == 0
+
+    def items(self):
+        """
+        Returns a lazy iterator over the (key, value) pairs of the map in ascending order of key.
+        """
+        return self.tree.items()
+
+    def keys(self):
+        """
+        Returns a lazy iterator over the keys of the map in ascending order.
+        """
+        return (key for key, _ in self.tree.items())
+
+    def lastEntry(self):
+        """
+        Returns the entry with the largest key, or None if the map is empty.
+        """
+        root = self.tree.root
+        return None if root is None else self._entry(self.tree._max_value_node(root))
+
+    def lastKey(self):
+        """
+        Returns the largest key, or None if the map is empty.
+        """
+        entry = self.lastEntry()
+        return None if entry is None else entry[0]
+
+    def lowerEntry(self, key):
+        """
+        Finds the entry with the largest key strictly less than the given key, or None if there is none.
+        """
+        return self._entry(self.tree._upper_bound_node(key, False))
+
+    def lowerKey(self, key):
+        """
+        Finds the largest key strictly less than the given key, or None if there is none.
+        """
+        node = self.tree._upper_bound_node(key, False)
+        return None if node is None else node.key
+
+    def pollFirstEntry(self):
+        """
+        Removes and returns the entry with the smallest key.
+
+        Returns:
+            A (key, value) pair, or None if the map is empty.
+        """
+        tree = self.tree
+        if tree.root is None:
+            return None
+        node = tree._min_value_node(tree.root)
+        entry = (node.key, node.value)
+        tree._remove_node(node)
+        tree.size -= 1
+        return entry
+
+    def pollLastEntry(self):
+        """
+        Removes and returns the entry with the largest key.
+
+        Returns:
+            A (key, value) pair, or None if the map is empty.
+        """
+        tree = self.tree
+        if tree.root is None:
+            return None
+        node = tree._max_value_node(tree.root)
+        entry = (node.key, node.value)
+        tree._remove_node(node)
+        tree.size -= 1
+        return entry
+
+    def put(self, key, value):
+        """
+        Maps a key to a value, replacing the previous value of the key if there was one.
+
+        The key is looked up and, if absent, inserted in the same descent.
+
+        Args:
+            key: The key.
+            value: The value to map the key to.
+
+        Returns:
+            The previous value of the key, or None if the key was not in the map.
+
+        Raises:
+            TypeError: If the key's type differs from the map's key type.
+        """
+        self._check_key(key)
+        node, added = self.tree._insert(key, value)
+        if added:
+            return None
+        previous = node.value
+        node.value = value
+        return previous
+
+    def remove(self, key):
+        """
+        Removes the entry of a key if it is present.
+
+        Returns:
+            The value the key was mapped to, or None if the key was not in the map.
+        """
+        if not self._comparable(key):
+            return None
+        tree = self.tree
+        node = tree._find_node(key)
+        if node is None:
+            return None
+        value = node.value
+        tree._remove_node(node)
+        tree.size -= 1
+        return value
+
+    def size(self):
+        """
+        Returns the number of entries in the map.
+        """
+        return self.tree.length()
+
+    def subMap(self, fromKey, toKey, fromInclusive=True, toInclusive=False):
+        """
+        Returns a view of the entries whose keys lie between two bounds.
+
+        The view holds no entries of its own: it seeks to the start bound in O(log n) when iterated and
+        counts its entries in O(log n) from the subtree sizes. Changes to the map are visible through it.
+
+        Args:
+            fromKey: The lower bound of the view.
+            toKey: The upper bound of the view.
+            fromInclusive: If True, the lower bound itself is part of the view.
+            toInclusive: If True, the upper bound itself is part of the view.
+
+        Returns:
+            A TreeMapView over the entries between the bounds.
+
+        Raises:
+            ValueError: If the lower bound is greater than the upper bound.
+        """
+        if fromKey > toKey:
+            raise ValueError("The lower bound {} is greater than the upper bound {}.".format(fromKey, toKey))
+        return TreeMapView(self, fromKey, fromInclusive, toKey, toInclusive)
+
+    def tailMap(self, fromKey, inclusive=True):
+        """
+        Returns a view of the entries whose keys are greater than or equal to the given key.
+
+        Args:
+            fromKey: The lower bound of the view.
+            inclusive: If False, the bound itself is not part of the view.
+
+        Returns:
+            A TreeMapView over the entries above the bound.
+        """
+        return TreeMapView(self, fromKey, inclusive, None, True)
+
+    def values(self):
+        """
+        Returns a lazy iterator over the values of the map in ascending order of key.
+        """
+        return (value for _, value in self.tree.items())
+
+    def raise_type_error(self, obj, supported_datatype):
+        """
+        Raises a TypeError exception indicating that the datatype is not supported.
+
+        Args:
+            obj: The object with the unsupported datatype.
+            supported_datatype: The datatype supported by the map.
+        """
+        raise TypeError("The datatype {} is not supported. Only {} are supported.".format(
+            type(obj), supported_datatype))
+
+
+class TreeMapView:
+    def __init__(self, tree_map, lo, lo_inclusive, hi, hi_inclusive):
+        """
+        Constructor of the TreeMapView class.
+
+        A view is a window on a TreeMap between two key bounds. It keeps a reference to the map and
+        never copies entries.
+
+        Args:
+            tree_map: The TreeMap that backs the view.
+            lo: The lower bound, or None for no lower bound.
+            lo_inclusive: If True, the lower bound itself is part of the view.
+            hi: The upper bound, or None for no upper bound.
+            hi_inclusive: If True, the upper bound itself is part of the view.
+        """
+        self._map = tree_map
+        self._lo = lo
+        self._lo_inclusive = lo_inclusive
+        self._hi = hi
+        self._hi_inclusive = hi_inclusive
+
+    def _too_low(self, key):
+        """
+        Checks if a key lies below the lower bound of the view.
+        """
+        if self._lo is None:
+            return False
+        return key < self._lo or (not self._lo_inclusive and key == self._lo)
+
+    def _too_high(self, key):
+        """
+        Checks if a key lies above the upper bound of the view.
+        """
+        if self._hi is None:
+            return False
+        return key > self._hi or (not self._hi_inclusive and key == self._hi)
+
+    def _in_range(self, key):
+        """
+        Checks if a key lies between the bounds of the view.
+        """
+        return not self._too_low(key) and not self._too_high(key)
+
+    def _within(self, entry):
+        """
+        Returns an entry if its key lies within the view, or None.
+        """
+        if entry is None or not self._in_range(entry[0]):
+            return None
+        return entry
+
+    def _check_bound(self, key, inclusive):
+        """
+        Checks that a bound requested for a nested view lies within this view.
+
+        Raises:
+            ValueError: If the bound is outside the view.
+        """
+        if inclusive:
+            outside = not self._in_range(key)
+        else:
+            outside = (self._lo is not None and key < self._lo) or (self._hi is not None and key > self._hi)
+        if outside:
+            raise ValueError("The bound {} is out of the range of the view.".format(key))
+
+    def ceilingEntry(self, key):
+        """
+        Finds the entry of the view with the smallest key greater than or equal to the given key, or None.
+        """
+        if self._too_low(key):
+            return self.firstEntry()
+        return self._within(self._map.ceilingEntry(key))
+
+    def containsKey(self, key):
+        """
+        Checks if the view has an entry for a given key.
+        """
+        return self._in_range(key) and self._map.containsKey(key)
+
+    def descendingItems(self):
+        """
+        Returns a lazy iterator over the (key, value) pairs of the view in descending order of key.
+        """
+        nodes = self._map.tree._range_nodes(self._lo, self._hi, self._lo_inclusive, self._hi_inclusive, reverse=True)
+        return ((node.key, node.value) for node in nodes)
+
+    def firstEntry(self):
+        """
+        Returns the entry of the view with the smallest key, or None if the view is empty.
+        """
+        if self._lo is None:
+            entry = self._map.firstEntry()
+        elif self._lo_inclusive:
+            entry = self._map.ceilingEntry(self._lo)
+        else:
+            entry = self._map.higherEntry(self._lo)
+        return self._within(entry)
+
+    def floorEntry(self, key):
+        """
+        Finds the entry of the view with the largest key less than or equal to the given key, or None.
+        """
+        if self._too_high(key):
+            return self.lastEntry()
+        return self._within(self._map.floorEntry(key))
+
+    def get(self, key, default=None):
+        """
+        Returns the value mapped to a key within the view, or the default if there is none.
+        """
+        if not self._in_range(key):
+            return default
+        return self._map.get(key, default)
+
+    def headMap(self, toKey, inclusive=False):
+        """
+        Returns a view of the entries of this view whose keys are less than the given key.
+
+        Raises:
+            ValueError: If the bound is outside this view.
+        """
+        self._check_bound(toKey, inclusive)
+        return TreeMapView(self._map, self._lo, self._lo_inclusive, toKey, inclusive)
+
+    def higherEntry(self, key):
+        """
+        Finds the entry of the view with the smallest key strictly greater than the given key, or None.
+        """
+        if self._too_low(key):
+            return self.firstEntry()
+        return self._within(self._map.higherEntry(key))
+
+    def isEmpty(self):
+        """
+        Checks if the view has no entries.
+        """
+        return self.firstEntry() is None
+
+    def items(self):
+        """
+        Returns a lazy iterator over the (key, value) pairs of the view in ascending order of key.
+        """
+        nodes = self._map.tree._range_nodes(self._lo, self._hi, self._lo_inclusive, self._hi_inclusive)
+        return ((node.key, node.value) for node in nodes)
+
+    def keys(self):
+        """
+        Returns a lazy iterator over the keys of the view in ascending order.
+        """
+        return (key for key, _ in self.items())
+
+    def lastEntry(self):
+        """
+        Returns the entry of the view with the largest key, or None if the view is empty.
+        """
+        if self._hi is None:
+            entry = self._map.lastEntry()
+        elif self._hi_inclusive:
+            entry = self._map.floorEntry(self._hi)
+        else:
+            entry = self._map.lowerEntry(self._hi)
+        return self._within(entry)
+
+    def lowerEntry(self, key):
+        """
+        Finds the entry of the view with the largest key strictly less than the given key, or None.
+        """
+        if self._too_high(key):
+            return self.lastEntry()
+        return self._within(self._map.lowerEntry(key))
+
+    def put(self, key, value):
+        """
+        Maps a key of the view's range to a value in the backing map.
+
+        Returns:
+            The previous value of the key, or None if the key was not in the map.
+
+        Raises:
+            ValueError: If the key is outside the view.
+        """
+        if not self._in_range(key):
+            raise ValueError("The key {} is out of the range of the view.".format(key))
+        return self._map.put(key, value)
+
+    def remove(self, key):
+        """
+        Removes the entry of a key from the backing map if the key lies within the view.
+
+        Returns:
+            The value the key was mapped to, or None if it is outside the view or not present.
+        """
+        if not self._in_range(key):
+            return None
+        return self._map.remove(key)
+
+    def size(self):
+        """
+        Returns the number of entries in the view, computed from two rank queries in O(log n).
+        """
+        tree = self._map.tree
+        upper = tree.length() if self._hi is None else tree.rank(self._hi, self._hi_inclusive)
+        lower = 0 if self._lo is None else tree.rank(self._lo, not self._lo_inclusive)
+        return max(upper - lower, 0)
+
+    def subMap(self, fromKey, toKey, fromInclusive=True, toInclusive=False):
+        """
+        Returns a view of the entries of this view whose keys lie between two bounds.
+
+        Raises:
+            ValueError: If a bound is outside this view or the lower bound is greater than the upper bound.
+        """
+        if fromKey > toKey:
+            raise ValueError("The lower bound {} is greater than the upper bound {}.".format(fromKey, toKey))
+        self._check_bound(fromKey, fromInclusive)
+        self._check_bound(toKey, toInclusive)
+        return TreeMapView(self._map, fromKey, fromInclusive, toKey, toInclusive)
+
+    def tailMap(self, fromKey, inclusive=True):
+        """
+        Returns a view of the entries of this view whose keys are greater than or equal to the given key.
+
+        Raises:
+            ValueError: If the bound is outside this view.
+        """
+        self._check_bound(fromKey, inclusive)
+        return TreeMapView(self._map, fromKey, inclusive, self._hi, self._hi_inclusive)
+
+    def values(self):
+        """
+        Returns a lazy iterator over the values of the view in ascending order of key.
+        """
+        return (value for _, value in self.items())
@@ -0,0 +1,412 @@
+from itertools import chain, repeat
+
+from RedBlack import BLACK, RED, Node, RedBlackTree
+
+
+class _CountedTree(RedBlackTree):
+    """
+    Red-black tree with one node per distinct element. The node's key is the element, its value the
+    number of occurrences, and its size the total number of occurrences in its subtree, so that rank
+    and select count duplicates without storing them. The tree's own size is the number of nodes.
+    """
+
+    def left_rotate(self, node):
+        """
+        Rotates left, then recomputes the size of the node that moved down from its count.
+        """
+        RedBlackTree.left_rotate(self, node)
+        node.size = node.value + self._size(node.left) + self._size(node.right)
+
+    def right_rotate(self, node):
+        """
+        Rotates right, then recomputes the size of the node that moved down from its count.
+        """
+        RedBlackTree.right_rotate(self, node)
+        node.size = node.value + self._size(node.left) + self._size(node.right)
+
+    def _own_size(self, node):
+        """
+        Returns the count of a node, which is what it adds to the size of its subtree.
+        """
+        return node.value
+
+    def _grow_path(self, node, amount):
+        """
+        Adds an amount to the size of a node and of every ancestor up to the root.
+        """
+        while node is not None:
+            node.size += amount
+            node = node.parent
+
+    def addCount(self, key, n):
+        """
+        Adds n occurrences of a key in a single descent, creating its node if the key is new.
+        Returns the number of occurrences before the call.
+        """
+        if self.root is None:
+            self.root = Node(n, BLACK, key)
+            self.root.size = n
+            self.size = 1
+            self.mod_count += 1
+            return 0
+        current = self.root
+        while True:
+            if key < current.key:
+                if current.left is None:
+                    new_node = current.left = Node(n, RED, key)
+                    break
+                current = current.left
+            elif key > current.key:
+                if current.right is None:
+                    new_node = current.right = Node(n, RED, key)
+                    break
+                current = current.right
+            else:
+                current.value += n
+                self._grow_path(current, n)
+                return current.value - n
+        new_node.size = n
+        new_node.parent = current
+        self._grow_path(current, n)
+        self.fix_red_red_violation(new_node)
+        self.size += 1
+        self.mod_count += 1
+        return 0
+
+    def removeCount(self, node, n):
+        """
+        Removes up to n occurrences of the key of a node, and the node itself with the last one.
+        Returns the number of occurrences before the call.
+        """
+        count = node.value
+        if n < count:
+            node.value -= n
+            self._grow_path(node, -n)
+            return count
+        self._remove_node(node)
+        self.size -= 1
+        return count
+
+    def _remove_node(self, node):
+        """
+        Removes a node and all its occurrences. The counts leave the sizes of the affected paths first,
+        so that the node to unlink weighs nothing while fix_double_black rotates around it.
+        """
+        self.mod_count += 1
+        self._grow_path(node, -node.value)
+        if node.left is not None and node.right is not None:
+            successor = self._min_value_node(node.right)
+            current = successor
+            while current is not node:
+                current.size -= successor.value
+                current = current.parent
+            node.key = successor.key
+            node.value = successor.value
+            node = successor
+        node.value = 0
+        self._unlink_node(node)
+
+    def atIndex(self, index):
+        """
+        Returns the element at the given position, each element occupying as many positions as its count.
+        """
+        current = self.root
+        while current is not None:
+            left_size = self._size(current.left)
+            if index < left_size:
+                current = current.left
+            elif index < left_size + current.value:
+                return current.key
+            else:
+                index -= left_size + current.value
+                current = current.right
+        return None
+
+    def rank(self, key, inclusive=False):
+        """
+        Returns the number of occurrences of keys strictly less than the given key,
+        or less than or equal to it if inclusive is True.
+        """
+        current = self.root
+        rank = 0
+        while current is not None:
+            if key < current.key:
+                current = current.left
+            elif key > current.key:
+                rank += self._size(current.left) + current.value
+                current = current.right
+            elif inclusive:
+                return rank + self._size(current.left) + current.value
+            else:
+                return rank + self._size(current.left)
+        return rank
+
+
+class TreeMultiset:
+    def __init__(self):
+        """
+        Constructor of the TreeMultiset class.
+
+        A sorted collection that keeps duplicates. Each distinct element is stored once, in one node of a
+        Red-Black Tree, together with its number of occurrences, so memory grows with the number of
+        distinct elements rather than with the number of additions. Every node also holds the total
+        number of occurrences in its subtree, which makes rank and positional access count duplicates
+        in O(log n). Elements must all have the type of the first element added.
+        """
+        self.tree = _CountedTree()
+        self._datatype = None
+
+    def _comparable(self, obj):
+        """
+        Checks if an object can be looked up in the multiset.
+        """
+        return self._datatype is not None and type(obj) == self._datatype
+
+    @staticmethod
+    def _check_count(n):
+        """
+        Checks that a number of occurrences is not negative.
+
+        Raises:
+            ValueError: If the number is negative.
+        """
+        if n < 0:
+            raise ValueError("The number of occurrences cannot be negative: {}.".format(n))
+
+    def add(self, obj, n=1):
+        """
+        Adds occurrences of an element.
+
+        If the data type of the multiset is not defined, it defines it with the type of the first added element.
+        Adding no occurrences leaves the data type undefined.
+
+        Args:
+            obj: The element to add.
+            n: The number of occurrences to add.
+
+        Returns:
+            The number of occurrences of the element before the call.
+
+        Raises:
+            TypeError: If the element's type differs from the multiset's type.
+            ValueError: If n is negative.
+        """
+        self._check_count(n)
+        if self._datatype is None:
+            if n == 0:
+                return 0
+            self._datatype = type(obj)
+        elif type(obj) != self._datatype:
+            self.raise_type_error(obj, self._datatype)
+        if n == 0:
+            return self.count(obj)
+        return self.tree.addCount(obj, n)
+
+    def addAll(self, objList):
+        """
+        Adds one occurrence of every element of a list.
+
+        Returns:
+            True after adding all elements.
+        """
+        for obj in objList:
+            self.add(obj)
+        return True
+
+    def ceiling(self, e):
+        """
+        Finds the smallest element that is greater than or equal to the given element, or None if none.
+        """
+        node = self.tree._lower_bound_node(e, True) if self._comparable(e) else None
+        return None if node is None else node.key
+
+    def clear(self):
+        """
+        Removes all occurrences of all elements.
+        """
+        self.tree.clear()
+        self._datatype = None
+
+    def clone(self):
+        """
+        Creates and returns a shallow copy of the multiset. The tree is copied structurally in O(n),
+        with the counts; the elements themselves are shared.
+        """
+        new_multiset = TreeMultiset()
+        new_multiset._datatype = self._datatype
+        new_multiset.tree = self.tree.clone()
+        return new_multiset
+
+    def contains(self, obj):
+        """
+        Checks if the multiset holds at least one occurrence of an element.
+        """
+        return self._comparable(obj) and self.tree._find_node(obj) is not None
+
+    def count(self, obj):
+        """
+        Returns the number of occurrences of an element, 0 if it is not present.
+        """
+        node = self.tree._find_node(obj) if self._comparable(obj) else None
+        return 0 if node is None else node.value
+
+    def descendingIterator(self):
+        """
+        Returns an iterator over the elements in descending order, each repeated as many times as it occurs.
+        """
+        return chain.from_iterable(repeat(node.key, node.value) for node in self.tree._range_nodes(reverse=True))
+
+    def distinctSize(self):
+        """
+        Returns the number of distinct elements, which is the number of nodes of the tree.
+        """
+        return self.tree.length()
+
+    def entries(self):
+        """
+        Returns an iterator over the (element, count) pairs in ascending order, one per distinct element.
+        """
+        return ((node.key, node.value) for node in self.tree._range_nodes())
+
+    def first(self):
+        """
+        Returns the smallest element, or None if the multiset is empty.
+        """
+        root = self.tree.root
+        return None if root is None else self.tree._min_value_node(root).key
+
+    def floor(self, e):
+        """
+        Finds the largest element that is less than or equal to the given element, or None if none.
+        """
+        node = self.tree._upper_bound_node(e, True) if self._comparable(e) else None
+        return None if node is None else node.key
+
+    def get(self, index):
+        """
+        Returns the element at the given position in ascending order, counting every occurrence.
+
+        Args:
+            index: The zero-based position, between 0 and size() - 1.
+
+        Returns:
+            The element at the given position, or None if the index is out of range.
+        """
+        if index < 0 or index >= self.size():
+            return None
+        return self.tree.atIndex(index)
+
+    def higher(self, e):
+        """
+        Finds the smallest element that is strictly greater than the given element, or None if none.
+        """
+        node = self.tree._lower_bound_node(e, False) if self._comparable(e) else None
+        return None if node is None else node.key
+
+    def isEmpty(self):
+        """
+        Checks if the multiset holds no occurrence of any element.
+        """
+        return self.tree.root is None
+
+    def iterator(self):
+        """
+        Returns an iterator over the elements in ascending order, each repeated as many times as it occurs.
+        """
+        return chain.from_iterable(repeat(node.key, node.value) for node in self.tree._range_nodes())
+
+    def last(self):
+        """
+        Returns the largest element, or None if the multiset is empty.
+        """
+        root = self.tree.root
+        return None if root is None else self.tree._max_value_node(root).key
+
+    def lower(self, e):
+        """
+        Finds the largest element that is strictly less than the given element, or None if none.
+        """
+        node = self.tree._upper_bound_node(e, False) if self._comparable(e) else None
+        return None if node is None else node.key
+
+    def pollFirst(self):
+        """
+        Removes one occurrence of the smallest element and returns it.
+
+        Returns:
+            The smallest element, or None if the multiset is empty.
+        """
+        tree = self.tree
+        if tree.root is None:
+            return None
+        node = tree._min_value_node(tree.root)
+        obj = node.key
+        tree.removeCount(node, 1)
+        return obj
+
+    def pollLast(self):
+        """
+        Removes one occurrence of the largest element and returns it.
+
+        Returns:
+            The largest element, or None if the multiset is empty.
+        """
+        tree = self.tree
+        if tree.root is None:
+            return None
+        node = tree._max_value_node(tree.root)
+        obj = node.key
+        tree.removeCount(node, 1)
+        return obj
+
+    def rank(self, e):
+        """
+        Counts the occurrences of elements strictly less than the given element.
+
+        Args:
+            e: The element to rank. It does not need to be in the multiset.
+
+        Returns:
+            The number of occurrences of smaller elements, which is the position of the first occurrence of e.
+        """
+        return self.tree.rank(e) if self._comparable(e) else 0
+
+    def remove(self, obj, n=1):
+        """
+        Removes occurrences of an element. The element leaves the multiset when its last occurrence is removed.
+
+        Args:
+            obj: The element to remove.
+            n: The number of occurrences to remove. Removing more than are present removes them all.
+
+        Returns:
+            The number of occurrences of the element before the call, 0 if it was not present.
+
+        Raises:
+            ValueError: If n is negative.
+        """
+        self._check_count(n)
+        node = self.tree._find_node(obj) if self._comparable(obj) else None
+        if node is None:
+            return 0
+        if n == 0:
+            return node.value
+        return self.tree.removeCount(node, n)
+
+    def size(self):
+        """
+        Returns the total number of occurrences of all elements.
+        """
+        root = self.tree.root
+        return 0 if root is None else root.size
+
+    def raise_type_error(self, obj, supported_datatype):
+        """
+        Raises a TypeError exception indicating that the datatype is not supported.
+
+        Args:
+            obj: The object with the unsupported datatype.
+            supported_datatype: The datatype supported by the multiset.
+        """
+        raise TypeError("The datatype {} is not supported. Only {} are supported.".format(
+            type(obj), supported_datatype))
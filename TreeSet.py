@@ -1,275 +1,1819 @@
-from RedBlack import Node
-from RedBlack import RedBlackTree
-
-
-class TreeSet:
-    def __init__(self):
-        """
-        Constructor of the TreeSet class.
-
-        Initializes a new TreeSet with an empty Red-Black Tree and undefined data type.
-        """
-        self.tree = RedBlackTree()
-        self._datatype = None
-
-    def add(self, obj):
-        """
-        Adds an element to the set.
-
-        If the data type of the set is not defined, it defines it with the type of the first added element.
-
-        Args:
-            obj: The object to add to the set.
-
-        Returns:
-            True if the object was added successfully, False if the data type does not match the set's type.
-        """
-        if self._datatype is None:
-            self._datatype = type(obj)
-        elif type(obj) != self._datatype:
-            self.raise_type_error(obj, self._datatype)
-            return False
-
-        if self.tree.contains(obj):
-            return False  # Do not add duplicates
-        self.tree.add(obj)
-        return True
-
-    def addAll(self, objList):
-        """
-        Adds a list of elements to the set.
-
-        Args:
-            objList: A list of objects to add to the set.
-
-        Returns:
-            True after adding all elements.
-        """
-        for obj in objList:
-            self.add(obj)
-        return True
-
-    def ceiling(self, e):
-        """
-        Finds the smallest value in the set that is greater than or equal to the given element.
-
-        Args:
-            e: The element for which the ceiling is sought.
-
-        Returns:
-            The smallest value in the set that is greater than or equal to the given element, or None if none.
-        """
-        return self.tree.ceiling(e)
-
-    def clear(self):
-        """
-        Removes all elements from the set.
-        """
-        self.tree.clear()
-        self._datatype = None
-
-    def clone(self):
-        """
-        Creates and returns a shallow copy of the set.
-
-        Returns:
-            A shallow copy of the set.
-        """
-        new_set = TreeSet()
-        new_set.tree = self.tree.clone()
-        new_set._datatype = self._datatype
-        return new_set
-
-    def contains(self, obj):
-        """
-        Checks if the set contains a given object.
-
-        Args:
-            obj: The object to check for its presence in the set.
-
-        Returns:
-            True if the object is present in the set, False otherwise.
-        """
-        return self.tree.contains(obj)
-
-    def descendingIterator(self):
-        """
-        Returns an iterator to traverse the set in descending order.
-
-        Returns:
-            An iterator to traverse the set in descending order.
-        """
-        return iter(reversed(self.tree))
-
-    def first(self):
-        """
-        Returns the first value in the set.
-
-        Returns:
-            The first value in the set, or None if the set is empty.
-        """
-        current = self.tree.root
-        if self.tree.length == 0:
-            raise TypeError("The tree is empty")
-        else:
-            while current and current.left:
-                current = current.left
-        return current.value if current else None
-
-    def floor(self, value):
-        """
-        Finds the largest element in the set that is less than or equal to the given value.
-
-        Args:
-            value: The value for which the floor is sought.
-
-        Returns:
-            The largest element in the set that is less than or equal to the given value, or None if none.
-        """
-        current = self.tree.root
-        floor_value = None
-
-        while current:
-            if current.value == value:
-                return current.value
-            elif current.value < value:
-                floor_value = current.value
-                current = current.right
-            else:
-                current = current.left
-        return floor_value
-
-    def higher(self, value):
-        """
-        Finds the smallest element in the set that is greater than the given value.
-
-        Args:
-            value: The value for which a greater value is sought.
-
-        Returns:
-            The smallest element in the set that is greater than the given value, or None if none.
-        """
-        current = self.tree.root
-        higher_value = None
-
-        while current:
-            if current.value > value:
-                higher_value = current.value
-                current = current.left
-            else:
-                current = current.right
-        return higher_value
-
-    def isEmpty(self):
-        """
-        Checks if the set is empty.
-
-        Returns:
-            True if the set is empty, False otherwise.
-        """
-        return self.tree.length() == 0
-
-    def iterator(self):
-        """
-        Returns an iterator to traverse the set.
-
-        Returns:
-            An iterator to traverse the set.
-        """
-        return iter(self.tree)
-
-    def last(self):
-        """
-        Returns the last element of the set.
-
-        Returns:
-            The last element of the set, or None if the set is empty.
-        """
-        current = self.tree.root
-        if self.tree.length == 0:
-            raise TypeError("The tree is empty")
-        else:
-            while current and current.right:
-                current = current.right
-        return current.value if current else None
-
-    def lower(self, e):
-        """
-        Finds the largest element in the set that is less than the given element.
-
-        Args:
-            e: The element for which a smaller value is sought.
-
-        Returns:
-            The largest element in the set that is less than the given element, or None if none.
-        """
-        current = self.tree.root
-        result = None
-        while current:
-            if e > current.value:
-                result = current.value
-                current = current.right
-            else:
-                current = current.left
-        return result
-
-    def pollFirst(self):
-        """
-        Removes and returns the first element of the set.
-
-        Returns:
-            The first element of the set, or None if the set is empty.
-        """
-        if self.isEmpty():
-            return None
-        first = self.first()
-        self.remove(first)
-        return first
-
-    def pollLast(self):
-        """
-        Removes and returns the value of the node with the maximum value in the tree.
-        Uses the last method to find this node and then removes it.
-        """
-        if self.isEmpty():
-            return None
-        last_value = self.last()
-        self.remove(last_value)
-        return last_value
-
-    def remove(self, obj):
-        """
-        Removes an element from the set if it is present.
-
-        Args:
-            obj: The object to remove from the set.
-
-        Returns:
-            True if the object was removed successfully, False if the object is not present.
-        """
-        if self.isEmpty() or type(obj) != self._datatype:
-            return False
-        if not self.tree.contains(obj):
-            return False
-        self.tree.remove(obj)
-        return True
-
-    def size(self):
-        """
-        Returns the number of elements in the set.
-
-        Returns:
-            The number of elements in the set.
-        """
-        return self.tree.length()
-
-    def raise_type_error(self, obj, supported_datatype):
-        """
-        Raises a TypeError exception indicating that the datatype is not supported.
-
-        Args:
-            obj: The object with the unsupported datatype.
-            supported_datatype: The datatype supported by the set.
-        """
-        raise TypeError("The datatype {} is not supported. Only {} are supported.".format(
-            type(obj), supported_datatype))
+import threading
+import weakref
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import cmp_to_key
+from numbers import Number
+
+from RedBlack import Node
+from RedBlack import AugmentedRedBlackTree, InstrumentedRedBlackTree, RedBlackTree, SUM
+from ArrayRedBlack import ArrayRedBlackTree, TYPECODES
+from SortedChunks import SortedChunkList
+from TreeSetIO import MappedTreeSet, read_sorted, write_sorted
+
+
+BACKENDS = ('redblack', 'chunked')
+
+
+class _ShareCount:
+    __slots__ = ('count', 'lock')
+
+    def __init__(self):
+        """
+        Counts the sets that share one tree after copy-on-write clones. The count is only read and
+        changed under its lock, so that sets used by different threads can join and leave the group.
+        The lock is reentrant because a set may leave from a finalizer, run by the garbage collector
+        in whatever thread it interrupts.
+        """
+        self.count = 0
+        self.lock = threading.RLock()
+
+    def claim(self):
+        """
+        Returns True, and empties the group, if the caller is the only set left in it.
+        """
+        with self.lock:
+            if self.count == 1:
+                self.count = 0
+                return True
+            return False
+
+    def join(self):
+        """
+        Adds a set to the group.
+        """
+        with self.lock:
+            self.count += 1
+
+    def leave(self):
+        """
+        Removes a set from the group.
+        """
+        with self.lock:
+            self.count -= 1
+
+
+class _KeyedElement:
+    __slots__ = ('key', 'value')
+
+    def __init__(self, key, value):
+        """
+        Pairs an element of a set ordered by a key function with its key, so that the sorting and
+        merging helpers can compare elements by their cached keys.
+        """
+        self.key = key
+        self.value = value
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+    def __gt__(self, other):
+        return self.key > other.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+    __hash__ = None
+
+
+class TreeSet:
+    def __init__(self, key=None, comparator=None, trackSums=False, backend='redblack', collectStats=False):
+        """
+        Constructor of the TreeSet class.
+
+        Initializes a new TreeSet with an empty Red-Black Tree and undefined data type.
+
+        With a key function, elements are ordered by key(element) instead of by themselves, and two
+        elements with equal keys are the same element of the set. The key is computed once when an
+        element is inserted and cached in its node, so searches compare cached keys rather than
+        calling the key function or the rich comparisons of the elements. Elements may then be of
+        any type, as long as their keys are mutually comparable. A comparator, a function returning
+        a negative, zero or positive number like Java's Comparator, can be given instead of a key.
+
+        With trackSums, every node of the tree also holds the sum of the elements of its subtree, so
+        sumRange runs in O(log n) instead of adding up the range element by element. Keeping the sums
+        costs an update of every ancestor on each insertion and removal, and the set always uses the
+        linked Red-Black Tree, even for int and float elements. The elements must then be numbers; any
+        other element is rejected with a TypeError before the set is changed.
+
+        The 'chunked' backend replaces the Red-Black Tree with a SortedChunkList, a list of sorted
+        chunks of about a thousand elements searched with bisect. Its searches and updates run mostly
+        in C over contiguous lists instead of following one node link per level in Python, and it
+        stores no node objects; inserting or removing shifts the elements of one chunk.
+
+        With collectStats, the set runs on an InstrumentedRedBlackTree, which counts the comparisons,
+        rotations and recolorings of every operation for stats, to tell why a workload is slow. Like
+        trackSums, it always uses the linked Red-Black Tree, even for int and float elements, and the
+        counting slows every operation down, so it is meant for diagnosis rather than production.
+
+        Args:
+            key: A function mapping an element to the key that orders it.
+            comparator: A function comparing two elements.
+            trackSums: If True, maintain subtree sums for sumRange.
+            backend: The engine holding the elements, 'redblack' or 'chunked'.
+            collectStats: If True, count the work done by the tree for stats.
+
+        Raises:
+            ValueError: If both a key and a comparator are given, if the backend is unknown,
+                if trackSums is asked of the chunked backend, or if collectStats is combined with
+                trackSums or the chunked backend.
+        """
+        if key is not None and comparator is not None:
+            raise ValueError("Give either a key or a comparator, not both.")
+        if backend not in BACKENDS:
+            raise ValueError("Unknown backend {!r}. Use one of {}.".format(backend, ", ".join(BACKENDS)))
+        if trackSums and backend != 'redblack':
+            raise ValueError("Subtree sums are only kept by the redblack backend.")
+        if collectStats and (trackSums or backend != 'redblack'):
+            raise ValueError("Stats are only collected by the plain redblack backend, without trackSums.")
+        self._key = cmp_to_key(comparator) if comparator is not None else key
+        self._track_sums = trackSums
+        self._backend = backend
+        self._collect_stats = collectStats
+        self.tree = self._new_tree(None)
+        self._datatype = None
+        self._shared = None
+        self._leave_group = None
+
+    def _join_group(self, shared):
+        """
+        Joins a group of sets sharing a tree after a copy-on-write clone.
+
+        The set leaves the group when it is garbage-collected, so that a clone which is dropped without
+        being modified does not make the other sets of the group copy the tree on their next change.
+        """
+        shared.join()
+        self._shared = shared
+        self._leave_group = weakref.finalize(self, shared.leave)
+
+    def _own_tree(self):
+        """
+        Makes sure the tree is not shared with a copy-on-write clone before it is modified in place.
+
+        Sets that share a tree hold the same _ShareCount. A set that modifies the tree while others
+        still share it copies the tree first and leaves the group only then, so the tree is modified in
+        place only by the last set left in the group, once no other set can still be reading it.
+        """
+        shared = self._shared
+        if shared is not None:
+            leave_group = self._leave_group
+            self._shared = self._leave_group = None
+            if shared.claim():
+                leave_group.detach()
+            else:
+                self.tree = self.tree.clone()
+                leave_group()
+
+    def _release_tree(self):
+        """
+        Leaves the group of sets sharing the tree before the tree is replaced by a new one, without copying it.
+        """
+        leave_group = self._leave_group
+        if leave_group is not None:
+            self._shared = self._leave_group = None
+            leave_group()
+
+    def _new_tree(self, datatype):
+        """
+        Creates the tree engine used for a given data type.
+
+        Int and float sets use the array-backed engine, which stores the values and links in
+        contiguous buffers instead of one node object per element. Any other type, and any set
+        ordered by a key function, uses the linked Red-Black Tree, which also holds the subtree
+        sums of a set that tracks them or counts the work of a set that collects stats. Sets with the
+        chunked backend use a SortedChunkList whatever their data type.
+
+        Args:
+            datatype: The data type locked in by the first element of the set.
+
+        Returns:
+            An empty tree engine for the data type.
+        """
+        if self._backend == 'chunked':
+            return SortedChunkList(self._key)
+        if self._track_sums:
+            return AugmentedRedBlackTree(self._key, SUM)
+        if self._collect_stats:
+            return InstrumentedRedBlackTree(self._key)
+        if self._key is not None:
+            return RedBlackTree(self._key)
+        typecode = TYPECODES.get(datatype)
+        if typecode is None:
+            return RedBlackTree()
+        return ArrayRedBlackTree(typecode)
+
+    @staticmethod
+    def _tree_from_sorted(datatype, values):
+        """
+        Builds the tree engine for a data type from sorted, duplicate-free values in linear time.
+
+        Args:
+            datatype: The data type of the values.
+            values: A list of values in ascending order without duplicates.
+
+        Returns:
+            A balanced tree engine holding the values.
+        """
+        typecode = TYPECODES.get(datatype)
+        if typecode is not None:
+            try:
+                return ArrayRedBlackTree.fromSorted(values, typecode)
+            except OverflowError:
+                pass
+        return RedBlackTree.fromSorted(values)
+
+    def _use_linked_tree(self):
+        """
+        Moves the elements of an array-backed set into a linked Red-Black Tree.
+
+        Used when an int does not fit in the fixed-width buffer of the array-backed engine.
+        """
+        values = list(self.tree)
+        self._release_tree()
+        self.tree = RedBlackTree.fromSorted(values)
+
+    def _elements(self):
+        """
+        Returns the elements of the set in ascending order, in the form the sorting and merging helpers
+        work on: the elements themselves, or _KeyedElement pairs carrying the cached keys if the set is
+        ordered by a key function.
+        """
+        if self._key is None:
+            return list(self.tree)
+        return [_KeyedElement(key, value) for key, value in self.tree.items()]
+
+    def _plain(self, elements):
+        """
+        Strips the keys from a list produced by _elements or _sorted_values.
+        """
+        if self._key is None:
+            return elements
+        return [element.value for element in elements]
+
+    def _build_tree(self, datatype, elements):
+        """
+        Builds the tree engine of the set from ascending, duplicate-free elements in linear time.
+
+        Args:
+            datatype: The data type of the elements.
+            elements: A list in the form produced by _elements.
+
+        Returns:
+            A balanced tree engine holding the elements.
+        """
+        if self._backend == 'chunked' or self._track_sums:
+            keys = None if self._key is None else [element.key for element in elements]
+            if self._track_sums:
+                return AugmentedRedBlackTree.fromSorted(self._plain(elements), self._key, keys, SUM)
+            return SortedChunkList.fromSorted(self._plain(elements), self._key, keys)
+        if self._collect_stats:
+            keys = None if self._key is None else [element.key for element in elements]
+            return InstrumentedRedBlackTree.fromSorted(self._plain(elements), self._key, keys)
+        if self._key is None:
+            return self._tree_from_sorted(datatype, elements)
+        return RedBlackTree.fromSorted([element.value for element in elements], self._key,
+                                       [element.key for element in elements])
+
+    @staticmethod
+    def _unique_sorted(values, presorted=False):
+        """
+        Returns the values in ascending order with duplicates dropped.
+
+        Args:
+            values: A list of mutually comparable values.
+            presorted: If True, the values must already be in ascending order and are only deduplicated.
+
+        Returns:
+            A new list of the distinct values in ascending order.
+
+        Raises:
+            ValueError: If presorted is True and the values are not in ascending order.
+        """
+        if not presorted:
+            values = sorted(values)
+        unique = []
+        for value in values:
+            if unique:
+                previous = unique[-1]
+                if value == previous:
+                    continue
+                if value < previous:
+                    raise ValueError("The values are not sorted in ascending order.")
+            unique.append(value)
+        return unique
+
+    @staticmethod
+    def _merge_unique(left, right):
+        """
+        Merges two ascending, duplicate-free lists into one ascending, duplicate-free list.
+
+        Args:
+            left: The first list.
+            right: The second list.
+
+        Returns:
+            The merged list.
+        """
+        merged = []
+        i = j = 0
+        while i < len(left) and j < len(right):
+            a = left[i]
+            b = right[j]
+            if a < b:
+                merged.append(a)
+                i += 1
+            elif b < a:
+                merged.append(b)
+                j += 1
+            else:
+                merged.append(a)
+                i += 1
+                j += 1
+        merged.extend(left[i:])
+        merged.extend(right[j:])
+        return merged
+
+    @staticmethod
+    def _intersect_sorted(left, right):
+        """
+        Returns the values present in both of two ascending, duplicate-free lists, in ascending order.
+        """
+        common = []
+        i = j = 0
+        while i < len(left) and j < len(right):
+            a = left[i]
+            b = right[j]
+            if a < b:
+                i += 1
+            elif b < a:
+                j += 1
+            else:
+                common.append(a)
+                i += 1
+                j += 1
+        return common
+
+    @staticmethod
+    def _difference_sorted(left, right):
+        """
+        Returns the values of the first ascending, duplicate-free list that are not in the second, in ascending order.
+        """
+        remaining = []
+        i = j = 0
+        while i < len(left) and j < len(right):
+            a = left[i]
+            b = right[j]
+            if a < b:
+                remaining.append(a)
+                i += 1
+            elif b < a:
+                j += 1
+            else:
+                i += 1
+                j += 1
+        remaining.extend(left[i:])
+        return remaining
+
+    @staticmethod
+    def _symmetric_difference_sorted(left, right):
+        """
+        Returns the values that are in exactly one of two ascending, duplicate-free lists, in ascending order.
+        """
+        result = []
+        i = j = 0
+        while i < len(left) and j < len(right):
+            a = left[i]
+            b = right[j]
+            if a < b:
+                result.append(a)
+                i += 1
+            elif b < a:
+                result.append(b)
+                j += 1
+            else:
+                i += 1
+                j += 1
+        result.extend(left[i:])
+        result.extend(right[j:])
+        return result
+
+    def _probe_common(self, values):
+        """
+        Looks up each of the given ascending elements in the tree and returns the matching elements as they
+        are stored in this set, in the form _elements uses. As in the merge walk of _intersect_sorted, an
+        element whose key is equal to that of a stored element yields the stored one, not itself.
+        """
+        tree = self.tree
+        nil = tree._nil
+        common = []
+        if self._key is None:
+            for value in values:
+                node = tree._find_node(value)
+                if node != nil:
+                    common.append(tree._value_of(node))
+        else:
+            for element in values:
+                node = tree._find_node(element.key)
+                if node != nil:
+                    common.append(_KeyedElement(element.key, tree._value_of(node)))
+        return common
+
+    @staticmethod
+    def _prefer_probing(small, large):
+        """
+        Decides whether looking up each of small elements in a tree of large elements, at O(small log large),
+        is cheaper than a linear merge walk over both.
+        """
+        return small * large.bit_length() < large
+
+    def _sorted_values(self, other):
+        """
+        Returns the distinct elements of another collection in ascending order, together with their data type.
+
+        TreeSets and views are already sorted and are read in order, unless they are ordered by a key
+        function. Any other iterable is type-checked, sorted and deduplicated. If the set is ordered by
+        a key function, the elements come as _KeyedElement pairs and no data type is checked; the keys
+        cached in another set with the same key function are reused.
+
+        Args:
+            other: A TreeSet, a TreeSetView or an iterable of elements.
+
+        Returns:
+            A tuple with the list of elements and their data type, which is None if there are no elements.
+        """
+        if self._key is not None:
+            if isinstance(other, TreeSet) and other._key is self._key:
+                return [_KeyedElement(key, value) for key, value in other.tree.items()], None
+            values = other.iterator() if isinstance(other, (TreeSet, TreeSetView)) else other
+            key = self._key
+            return self._unique_sorted([_KeyedElement(key(value), value) for value in values]), None
+        if isinstance(other, TreeSetView) and other._set._key is None:
+            values = list(other.iterator())
+            datatype = other._set._datatype
+        elif isinstance(other, TreeSet) and other._key is None:
+            values = list(other.tree)
+            datatype = other._datatype
+        else:
+            values = list(other.iterator()) if isinstance(other, (TreeSet, TreeSetView)) else list(other)
+            if not values:
+                return values, None
+            datatype = self._check_types(values)
+            return self._unique_sorted(values), datatype
+        if values and self._datatype is not None and datatype != self._datatype:
+            self.raise_type_error(values[0], self._datatype)
+        return values, datatype
+
+    def _from_values(self, values, datatype):
+        """
+        Creates a new set from ascending, duplicate-free values in linear time.
+        """
+        new_set = TreeSet(self._key, trackSums=self._track_sums, backend=self._backend,
+                          collectStats=self._collect_stats)
+        if values:
+            new_set._datatype = datatype if datatype is not None else self._datatype
+            new_set.tree = self._build_tree(new_set._datatype, values)
+        return new_set
+
+    def _replace_values(self, values, datatype):
+        """
+        Replaces the elements of the set with ascending, duplicate-free values in linear time.
+        """
+        if datatype is not None and self._datatype is None:
+            self._datatype = datatype
+        self._release_tree()
+        if values:
+            self.tree = self._build_tree(self._datatype, values)
+        else:
+            self.tree = self._new_tree(self._datatype)
+
+    def _order_key(self, e):
+        """
+        Returns what orders an element in the set: the element itself, or its key.
+        """
+        return e if self._key is None else self._key(e)
+
+    def _search_many(self, probes):
+        """
+        Answers floor and ceiling for many probes with a single coordinated walk of the tree.
+
+        The probes are sorted once and handed to the tree in ascending order, so that each search
+        starts from the path of the previous one instead of from the root.
+
+        Args:
+            probes: An iterable of probes, such as a list or a NumPy array.
+
+        Returns:
+            A tuple with the list of the keys of the probes (the probes themselves unless the set has a
+            key function) and a list of (floor, ceiling) pairs in the same order.
+        """
+        probes = list(probes)
+        keys = probes if self._key is None else [self._key(probe) for probe in probes]
+        order = sorted(range(len(probes)), key=keys.__getitem__)
+        if self._key is None:
+            found = self.tree.searchMany([probes[i] for i in order])
+        else:
+            found = self.tree.searchMany([probes[i] for i in order], [keys[i] for i in order])
+        results = [None] * len(probes)
+        for position, i in enumerate(order):
+            results[i] = found[position]
+        return keys, results
+
+    def _check_types(self, values):
+        """
+        Checks that every value matches the data type of the set, or of the first value if the set has none.
+
+        Sets ordered by a key function accept elements of any type and skip the check.
+
+        Args:
+            values: A list of values to check.
+
+        Returns:
+            The data type shared by the values, or None for a set ordered by a key function.
+        """
+        if self._key is not None:
+            return None
+        datatype = self._datatype if self._datatype is not None else type(values[0])
+        for obj in values:
+            if type(obj) != datatype:
+                self.raise_type_error(obj, datatype)
+        return datatype
+
+    def _check_summable(self, values):
+        """
+        Checks that values can be added up in the subtree sums of a set created with trackSums, before
+        any of them is stored. Any other value would only fail once the sums are updated, halfway
+        through a change of the tree.
+
+        Args:
+            values: An iterable of elements about to be added to the set.
+
+        Raises:
+            TypeError: If the set tracks sums and a value is not a number.
+        """
+        if self._track_sums:
+            for value in values:
+                if not isinstance(value, Number):
+                    self.raise_type_error(value, Number)
+
+    @classmethod
+    def fromSorted(cls, iterable, key=None):
+        """
+        Creates a set from elements that are already in ascending order.
+
+        The tree is built bottom-up in linear time, perfectly balanced and without rotations,
+        instead of inserting the elements one by one. Adjacent duplicates are dropped.
+
+        Args:
+            iterable: The elements in ascending order, or in ascending order of their keys if a key is given.
+            key: A function mapping an element to the key that orders it.
+
+        Returns:
+            A new set holding the elements.
+
+        Raises:
+            ValueError: If the elements are not in ascending order.
+        """
+        new_set = cls(key)
+        values = list(iterable)
+        if values:
+            datatype = new_set._check_types(values)
+            if key is not None:
+                values = [_KeyedElement(key(value), value) for value in values]
+            values = cls._unique_sorted(values, presorted=True)
+            new_set._datatype = datatype
+            new_set.tree = new_set._build_tree(datatype, values)
+        return new_set
+
+    def add(self, obj):
+        """
+        Adds an element to the set.
+
+        If the data type of the set is not defined, it defines it with the type of the first added element.
+
+        Args:
+            obj: The object to add to the set.
+
+        Returns:
+            True if the object was added successfully, False if the data type does not match the set's type.
+        """
+        self._check_summable((obj,))
+        if self._key is not None:
+            self._own_tree()
+            return self.tree.add(obj)
+        if self._datatype is None:
+            self._datatype = type(obj)
+            self._release_tree()
+            self.tree = self._new_tree(self._datatype)
+        elif type(obj) != self._datatype:
+            self.raise_type_error(obj, self._datatype)
+            return False
+
+        self._own_tree()
+        try:
+            return self.tree.add(obj)  # Reports False for duplicates
+        except OverflowError:
+            self._use_linked_tree()
+            return self.tree.add(obj)
+
+    def addAll(self, objList):
+        """
+        Adds a list of elements to the set.
+
+        When the set is empty, or the new elements are numerous compared to the set, the elements
+        are sorted, merged with the current ones in a single walk and the tree is rebuilt in linear
+        time instead of inserting them one by one.
+
+        Args:
+            objList: A list of objects, a TreeSet or a TreeSetView to add to the set.
+
+        Returns:
+            True after adding all elements.
+        """
+        values, datatype = self._sorted_values(objList)
+        if not values:
+            return True
+        self._check_summable(self._plain(values))
+        size = self.size()
+        if self._prefer_probing(len(values), size):
+            for obj in self._plain(values):
+                self.add(obj)
+            return True
+        if size:
+            values = self._merge_unique(self._elements(), values)
+        self._datatype = datatype
+        self._release_tree()
+        self.tree = self._build_tree(datatype, values)
+        return True
+
+    def ceiling(self, e):
+        """
+        Finds the smallest value in the set that is greater than or equal to the given element.
+
+        Args:
+            e: The element for which the ceiling is sought.
+
+        Returns:
+            The smallest value in the set that is greater than or equal to the given element, or None if none.
+        """
+        return self.tree.ceiling(e)
+
+    def ceilingMany(self, probes):
+        """
+        Finds the ceiling of many elements at once.
+
+        Args:
+            probes: An iterable of elements, such as a list or a NumPy array.
+
+        Returns:
+            A list with, for each probe in the given order, the smallest value in the set that is
+            greater than or equal to it, or None if none.
+        """
+        _, results = self._search_many(probes)
+        return [ceiling for _, ceiling in results]
+
+    def clear(self):
+        """
+        Removes all elements from the set.
+        """
+        if self._shared is not None:
+            self._release_tree()
+            self.tree = self._new_tree(None)
+        else:
+            self.tree.clear()
+        self._datatype = None
+
+    def clone(self, copyOnWrite=False):
+        """
+        Creates and returns a shallow copy of the set.
+
+        By default the tree is copied structurally in O(n), keeping its shape and colors, without
+        inserting or rebalancing anything. With copyOnWrite, the clone is made in O(1) by sharing the
+        tree, and the structural copy is deferred until the clone or the original is first modified.
+        A clone that is dropped unmodified gives the tree back when it is garbage-collected, after which
+        the original changes its tree in place again.
+
+        Args:
+            copyOnWrite: If True, share the tree until one of the sets is modified.
+
+        Returns:
+            A shallow copy of the set.
+        """
+        new_set = TreeSet(self._key, trackSums=self._track_sums, backend=self._backend,
+                          collectStats=self._collect_stats)
+        new_set._datatype = self._datatype
+        if copyOnWrite:
+            if self._shared is None:
+                self._join_group(_ShareCount())
+            new_set._join_group(self._shared)
+            new_set.tree = self.tree
+        else:
+            new_set.tree = self.tree.clone()
+        return new_set
+
+    def contains(self, obj):
+        """
+        Checks if the set contains a given object.
+
+        Args:
+            obj: The object to check for its presence in the set.
+
+        Returns:
+            True if the object is present in the set, False otherwise.
+        """
+        return self.tree.contains(obj)
+
+    def containsAll(self, objList):
+        """
+        Checks if the set contains every element of a collection.
+
+        Large collections are checked with a single merge walk over both sorted sequences instead of
+        one lookup per element.
+
+        Args:
+            objList: A list of objects, a TreeSet or a TreeSetView.
+
+        Returns:
+            True if every element is present in the set, False otherwise.
+        """
+        values, _ = self._sorted_values(objList)
+        size = self.size()
+        if len(values) > size:
+            return False
+        if self._prefer_probing(len(values), size):
+            return all(self.tree.contains(obj) for obj in self._plain(values))
+        return len(self._intersect_sorted(self._elements(), values)) == len(values)
+
+    def containsMany(self, probes):
+        """
+        Checks the presence of many objects at once.
+
+        Args:
+            probes: An iterable of objects, such as a list or a NumPy array.
+
+        Returns:
+            A list with, for each probe in the given order, True if it is in the set and False otherwise.
+        """
+        keys, results = self._search_many(probes)
+        if self._key is not None:
+            return [floor is not None and self._key(floor) == key for key, (floor, _) in zip(keys, results)]
+        return [floor is not None and floor == probe for probe, (floor, _) in zip(keys, results)]
+
+    def countRange(self, fromElement, toElement, fromInclusive=True, toInclusive=True):
+        """
+        Counts the elements between two bounds in O(log n), from two rank queries on the subtree sizes.
+
+        Args:
+            fromElement: The lower bound, or None to leave the range open below.
+            toElement: The upper bound, or None to leave the range open above.
+            fromInclusive: If True, the lower bound itself is counted when present.
+            toInclusive: If True, the upper bound itself is counted when present.
+
+        Returns:
+            The number of elements in the range, 0 if the lower bound is greater than the upper bound.
+        """
+        if self.isEmpty():
+            return 0
+        lower = 0 if fromElement is None else self.tree.rank(fromElement, not fromInclusive)
+        upper = self.size() if toElement is None else self.tree.rank(toElement, toInclusive)
+        return max(upper - lower, 0)
+
+    def descendingIterator(self):
+        """
+        Returns an iterator to traverse the set in descending order.
+
+        Returns:
+            An iterator to traverse the set in descending order.
+        """
+        return iter(reversed(self.tree))
+
+    def difference(self, other):
+        """
+        Returns a new set with the elements of this set that are not in another collection.
+
+        Args:
+            other: A TreeSet, a TreeSetView or an iterable of elements.
+
+        Returns:
+            A new TreeSet built in linear time from a merge walk of both sorted sequences.
+        """
+        values, _ = self._sorted_values(other)
+        return self._from_values(self._difference_sorted(self._elements(), values), self._datatype)
+
+    def dump(self, path):
+        """
+        Writes the set to a binary file that load can read back.
+
+        The file holds a header recording the data type of the set, followed by the elements in
+        ascending order: fixed-width 8-byte entries for int and float sets, length-prefixed records
+        for str sets.
+
+        Args:
+            path: The path of the file to write.
+
+        Raises:
+            TypeError: If the data type of the set is not int, float or str, or the set is ordered by a key function.
+        """
+        if self._key is not None:
+            raise TypeError("A set ordered by a key function cannot be dumped.")
+        write_sorted(path, self._datatype, list(self.tree))
+
+    def first(self):
+        """
+        Returns the first value in the set.
+
+        Returns:
+            The first value in the set, or None if the set is empty.
+        """
+        return self.tree.first()
+
+    def floor(self, value):
+        """
+        Finds the largest element in the set that is less than or equal to the given value.
+
+        Args:
+            value: The value for which the floor is sought.
+
+        Returns:
+            The largest element in the set that is less than or equal to the given value, or None if none.
+        """
+        return self.tree.floor(value)
+
+    def floorMany(self, probes):
+        """
+        Finds the floor of many values at once.
+
+        Args:
+            probes: An iterable of values, such as a list or a NumPy array.
+
+        Returns:
+            A list with, for each probe in the given order, the largest element in the set that is
+            less than or equal to it, or None if none.
+        """
+        _, results = self._search_many(probes)
+        return [floor for floor, _ in results]
+
+    def freeze(self):
+        """
+        Returns a read-only copy of the set as a contiguous sorted array.
+
+        Lookups on the frozen set are binary searches over the array with bisect, with no node links
+        to follow, and the elements take one slot each: int and float elements are packed into an
+        array.array of 8-byte values, other elements are kept in a list. The set itself is unchanged.
+
+        Returns:
+            A FrozenTreeSet holding the elements of the set.
+        """
+        return FrozenTreeSet(self)
+
+    def get(self, index):
+        """
+        Returns the element at the given position in ascending order.
+
+        Args:
+            index: The zero-based position of the element.
+
+        Returns:
+            The element at the given position, or None if the index is out of range.
+        """
+        if index < 0 or index >= self.size():
+            return None
+        return self.tree.atIndex(index)
+
+    def headSet(self, toElement, inclusive=False):
+        """
+        Returns a view of the elements that are less than the given element.
+
+        Args:
+            toElement: The upper bound of the view.
+            inclusive: If True, the bound itself is part of the view.
+
+        Returns:
+            A TreeSetView over the elements below the bound.
+        """
+        return TreeSetView(self, None, True, toElement, inclusive)
+
+    def higher(self, value):
+        """
+        Finds the smallest element in the set that is greater than the given value.
+
+        Args:
+            value: The value for which a greater value is sought.
+
+        Returns:
+            The smallest element in the set that is greater than the given value, or None if none.
+        """
+        return self.tree.higher(value)
+
+    def indexOf(self, e):
+        """
+        Returns the position of an element in ascending order.
+
+        Args:
+            e: The element whose position is sought.
+
+        Returns:
+            The zero-based position of the element, or -1 if the element is not in the set.
+        """
+        return self.tree.indexOf(e)
+
+    def intersection(self, other):
+        """
+        Returns a new set with the elements that are both in this set and in another collection.
+
+        When the other collection is much smaller than the set, its elements are looked up one by one;
+        otherwise both sorted sequences are merge-walked.
+
+        Args:
+            other: A TreeSet, a TreeSetView or an iterable of elements.
+
+        Returns:
+            A new TreeSet with the common elements.
+        """
+        values, datatype = self._sorted_values(other)
+        if self._prefer_probing(len(values), self.size()):
+            common = self._probe_common(values)
+        else:
+            common = self._intersect_sorted(self._elements(), values)
+        return self._from_values(common, datatype)
+
+    def isEmpty(self):
+        """
+        Checks if the set is empty.
+
+        Returns:
+            True if the set is empty, False otherwise.
+        """
+        return self.tree.length() == 0
+
+    def iterator(self):
+        """
+        Returns an iterator to traverse the set.
+
+        Returns:
+            An iterator to traverse the set.
+        """
+        return iter(self.tree)
+
+    def last(self):
+        """
+        Returns the last element of the set.
+
+        Returns:
+            The last element of the set, or None if the set is empty.
+        """
+        return self.tree.last()
+
+    @classmethod
+    def load(cls, path, mapped=False):
+        """
+        Reads a set written by dump.
+
+        The elements are stored in ascending order, so the tree is rebuilt bottom-up in linear time
+        instead of inserting them one by one.
+
+        Args:
+            path: The path of the file to read.
+            mapped: If True, returns a read-only MappedTreeSet that memory-maps the file and answers
+                contains, ceiling, floor and the other lookups by binary search over it, without
+                building any node.
+
+        Returns:
+            A new TreeSet holding the elements, or a MappedTreeSet if mapped is True.
+
+        Raises:
+            ValueError: If the file was not written by dump.
+        """
+        if mapped:
+            return MappedTreeSet(path)
+        datatype, values = read_sorted(path)
+        new_set = cls()
+        if values:
+            new_set._datatype = datatype
+            new_set.tree = cls._tree_from_sorted(datatype, values)
+        return new_set
+
+    def lower(self, e):
+        """
+        Finds the largest element in the set that is less than the given element.
+
+        Args:
+            e: The element for which a smaller value is sought.
+
+        Returns:
+            The largest element in the set that is less than the given element, or None if none.
+        """
+        return self.tree.lower(e)
+
+    def pollFirst(self):
+        """
+        Removes and returns the first element of the set.
+
+        Returns:
+            The first element of the set, or None if the set is empty.
+        """
+        self._own_tree()
+        return self.tree.pollFirst()
+
+    def pollLast(self):
+        """
+        Removes and returns the value of the node with the maximum value in the tree.
+        The tree finds this node and removes it in a single descent.
+        """
+        self._own_tree()
+        return self.tree.pollLast()
+
+    def rank(self, e):
+        """
+        Counts the elements of the set that are strictly less than the given element.
+
+        Args:
+            e: The element to rank. It does not need to be in the set.
+
+        Returns:
+            The number of elements in the set that are less than the given element.
+        """
+        return self.tree.rank(e)
+
+    def remove(self, obj):
+        """
+        Removes an element from the set if it is present.
+
+        Args:
+            obj: The object to remove from the set.
+
+        Returns:
+            True if the object was removed successfully, False if the object is not present.
+        """
+        if self.isEmpty() or (self._key is None and type(obj) != self._datatype):
+            return False
+        self._own_tree()
+        return self.tree.remove(obj)
+
+    def removeAll(self, objList):
+        """
+        Removes every element of a collection from the set.
+
+        Args:
+            objList: A list of objects, a TreeSet or a TreeSetView.
+
+        Returns:
+            True if the set changed, False otherwise.
+        """
+        values, _ = self._sorted_values(objList)
+        size = self.size()
+        if self._prefer_probing(len(values), size):
+            self._own_tree()
+            changed = False
+            for obj in self._plain(values):
+                changed = self.tree.remove(obj) or changed
+            return changed
+        remaining = self._difference_sorted(self._elements(), values)
+        self._replace_values(remaining, None)
+        return len(remaining) != size
+
+    def resetStats(self):
+        """
+        Sets the counters of a set created with collectStats back to zero.
+
+        Raises:
+            ValueError: If the set does not collect stats.
+        """
+        if not self._collect_stats:
+            raise ValueError("The set was not created with collectStats.")
+        self.tree.reset_stats()
+
+    def retainAll(self, objList):
+        """
+        Keeps only the elements of the set that are also in a collection.
+
+        Args:
+            objList: A list of objects, a TreeSet or a TreeSetView.
+
+        Returns:
+            True if the set changed, False otherwise.
+        """
+        values, _ = self._sorted_values(objList)
+        size = self.size()
+        if self._prefer_probing(len(values), size):
+            common = self._probe_common(values)
+        else:
+            common = self._intersect_sorted(self._elements(), values)
+        if len(common) == size:
+            return False
+        self._replace_values(common, None)
+        return True
+
+    def seek(self, e):
+        """
+        Returns a cursor on the smallest element greater than or equal to the given element.
+
+        Stepping a cursor follows the parent and child links from its current node instead of descending
+        from the root, so walking k neighbors costs O(log n + k) rather than O(k log n).
+
+        Args:
+            e: The element to seek. It does not need to be in the set.
+
+        Returns:
+            A TreeSetCursor, past the last element if every element is smaller than e.
+        """
+        return TreeSetCursor(self, self.tree._lower_bound_node(self._order_key(e), True))
+
+    def size(self):
+        """
+        Returns the number of elements in the set.
+
+        Returns:
+            The number of elements in the set.
+        """
+        return self.tree.length()
+
+    def stats(self):
+        """
+        Returns the counters of a set created with collectStats, with the shape of its tree.
+
+        The counters belong to the tree, so they start again from zero when the tree is rebuilt in bulk,
+        as by addAll of many elements or by an in-place set operation.
+
+        Returns:
+            A dictionary as returned by InstrumentedRedBlackTree.stats.
+
+        Raises:
+            ValueError: If the set does not collect stats.
+        """
+        if not self._collect_stats:
+            raise ValueError("The set was not created with collectStats.")
+        return self.tree.stats()
+
+    def subSet(self, fromElement, toElement, fromInclusive=True, toInclusive=False):
+        """
+        Returns a view of the elements between two bounds.
+
+        The view holds no elements of its own: it seeks to the start bound in O(log n) when iterated,
+        streams elements until the end bound, and counts its elements in O(log n) from the subtree sizes.
+        Changes to the set are visible through the view.
+
+        Args:
+            fromElement: The lower bound of the view.
+            toElement: The upper bound of the view.
+            fromInclusive: If True, the lower bound itself is part of the view.
+            toInclusive: If True, the upper bound itself is part of the view.
+
+        Returns:
+            A TreeSetView over the elements between the bounds.
+
+        Raises:
+            ValueError: If the lower bound is greater than the upper bound.
+        """
+        if self._order_key(fromElement) > self._order_key(toElement):
+            raise ValueError("The lower bound {} is greater than the upper bound {}.".format(fromElement, toElement))
+        return TreeSetView(self, fromElement, fromInclusive, toElement, toInclusive)
+
+    def sumRange(self, fromElement, toElement, fromInclusive=True, toInclusive=True):
+        """
+        Adds up the elements between two bounds.
+
+        A set created with trackSums answers in O(log n) from the subtree sums stored in the tree;
+        any other set adds up the elements of the range one by one.
+
+        Args:
+            fromElement: The lower bound, or None to leave the range open below.
+            toElement: The upper bound, or None to leave the range open above.
+            fromInclusive: If True, the lower bound itself is included when present.
+            toInclusive: If True, the upper bound itself is included when present.
+
+        Returns:
+            The sum of the elements in the range, 0 if there are none.
+        """
+        if self.isEmpty():
+            return 0
+        if self._track_sums:
+            return self.tree.rangeAggregate(fromElement, toElement, fromInclusive, toInclusive)
+        return sum(self.tree.irange(fromElement, toElement, fromInclusive, toInclusive))
+
+    def symmetricDifference(self, other):
+        """
+        Returns a new set with the elements that are in exactly one of this set and another collection.
+
+        Args:
+            other: A TreeSet, a TreeSetView or an iterable of elements.
+
+        Returns:
+            A new TreeSet built in linear time from a merge walk of both sorted sequences.
+        """
+        values, datatype = self._sorted_values(other)
+        self._check_summable(self._plain(values))
+        return self._from_values(self._symmetric_difference_sorted(self._elements(), values), datatype)
+
+    def symmetricDifferenceUpdate(self, other):
+        """
+        Replaces the set with the elements that are in exactly one of the set and another collection.
+
+        Args:
+            other: A TreeSet, a TreeSetView or an iterable of elements.
+
+        Returns:
+            True if the set changed, False otherwise.
+        """
+        values, datatype = self._sorted_values(other)
+        if not values:
+            return False
+        self._check_summable(self._plain(values))
+        self._replace_values(self._symmetric_difference_sorted(self._elements(), values), datatype)
+        return True
+
+    def tailSet(self, fromElement, inclusive=True):
+        """
+        Returns a view of the elements that are greater than or equal to the given element.
+
+        Args:
+            fromElement: The lower bound of the view.
+            inclusive: If False, the bound itself is not part of the view.
+
+        Returns:
+            A TreeSetView over the elements above the bound.
+        """
+        return TreeSetView(self, fromElement, inclusive, None, True)
+
+    def union(self, other):
+        """
+        Returns a new set with the elements that are in this set, in another collection, or in both.
+
+        Args:
+            other: A TreeSet, a TreeSetView or an iterable of elements.
+
+        Returns:
+            A new TreeSet built in linear time from a merge walk of both sorted sequences.
+        """
+        values, datatype = self._sorted_values(other)
+        self._check_summable(self._plain(values))
+        return self._from_values(self._merge_unique(self._elements(), values), datatype)
+
+    def raise_type_error(self, obj, supported_datatype):
+        """
+        Raises a TypeError exception indicating that the datatype is not supported.
+
+        Args:
+            obj: The object with the unsupported datatype.
+            supported_datatype: The datatype supported by the set.
+        """
+        raise TypeError("The datatype {} is not supported. Only {} are supported.".format(
+            type(obj), supported_datatype))
+
+
+class TreeSetView:
+    def __init__(self, tree_set, lo, lo_inclusive, hi, hi_inclusive):
+        """
+        Constructor of the TreeSetView class.
+
+        A view is a window on a TreeSet between two bounds. It keeps a reference to the set rather
+        than to its tree, so it keeps working when the set replaces its tree, and it never copies elements.
+
+        Args:
+            tree_set: The TreeSet that backs the view.
+            lo: The lower bound, or None for no lower bound.
+            lo_inclusive: If True, the lower bound itself is part of the view.
+            hi: The upper bound, or None for no upper bound.
+            hi_inclusive: If True, the upper bound itself is part of the view.
+        """
+        self._set = tree_set
+        self._lo = lo
+        self._lo_inclusive = lo_inclusive
+        self._hi = hi
+        self._hi_inclusive = hi_inclusive
+        self._lo_key = None if lo is None else tree_set._order_key(lo)
+        self._hi_key = None if hi is None else tree_set._order_key(hi)
+
+    def _too_low(self, e):
+        """
+        Checks if an element lies below the lower bound of the view.
+        """
+        if self._lo is None:
+            return False
+        e = self._set._order_key(e)
+        return e < self._lo_key or (not self._lo_inclusive and e == self._lo_key)
+
+    def _too_high(self, e):
+        """
+        Checks if an element lies above the upper bound of the view.
+        """
+        if self._hi is None:
+            return False
+        e = self._set._order_key(e)
+        return e > self._hi_key or (not self._hi_inclusive and e == self._hi_key)
+
+    def _in_range(self, e):
+        """
+        Checks if an element lies between the bounds of the view.
+        """
+        return not self._too_low(e) and not self._too_high(e)
+
+    def _check_bound(self, e, inclusive):
+        """
+        Checks that a bound requested for a nested view lies within this view.
+
+        An exclusive bound may sit exactly on an exclusive bound of this view.
+
+        Raises:
+            ValueError: If the bound is outside the view.
+        """
+        if inclusive:
+            outside = not self._in_range(e)
+        else:
+            key = self._set._order_key(e)
+            outside = (self._lo is not None and key < self._lo_key) or (self._hi is not None and key > self._hi_key)
+        if outside:
+            raise ValueError("The bound {} is out of the range of the view.".format(e))
+
+    def add(self, obj):
+        """
+        Adds an element to the backing set.
+
+        Args:
+            obj: The object to add. It must lie within the bounds of the view.
+
+        Returns:
+            True if the object was added, False if it was already present.
+
+        Raises:
+            ValueError: If the object is outside the view.
+        """
+        if not self._in_range(obj):
+            raise ValueError("The element {} is out of the range of the view.".format(obj))
+        return self._set.add(obj)
+
+    def ceiling(self, e):
+        """
+        Finds the smallest element of the view that is greater than or equal to the given element.
+
+        Returns:
+            The element, or None if there is none.
+        """
+        if self._too_low(e):
+            return self.first()
+        value = self._set.tree.ceiling(e)
+        if value is None or self._too_high(value):
+            return None
+        return value
+
+    def contains(self, obj):
+        """
+        Checks if the view contains a given object.
+
+        Returns:
+            True if the object is within the bounds and present in the set, False otherwise.
+        """
+        return self._in_range(obj) and self._set.contains(obj)
+
+    def descendingIterator(self):
+        """
+        Returns a lazy iterator over the elements of the view in descending order.
+        """
+        return self._set.tree.irange(self._lo, self._hi, self._lo_inclusive, self._hi_inclusive, reverse=True)
+
+    def first(self):
+        """
+        Returns the smallest element of the view, or None if the view is empty.
+        """
+        tree = self._set.tree
+        if self._lo is None:
+            value = tree.first()
+        elif self._lo_inclusive:
+            value = tree.ceiling(self._lo)
+        else:
+            value = tree.higher(self._lo)
+        if value is None or self._too_high(value):
+            return None
+        return value
+
+    def floor(self, e):
+        """
+        Finds the largest element of the view that is less than or equal to the given element.
+
+        Returns:
+            The element, or None if there is none.
+        """
+        if self._too_high(e):
+            return self.last()
+        value = self._set.tree.floor(e)
+        if value is None or self._too_low(value):
+            return None
+        return value
+
+    def headSet(self, toElement, inclusive=False):
+        """
+        Returns a view of the elements of this view that are less than the given element.
+
+        Raises:
+            ValueError: If the bound is outside this view.
+        """
+        self._check_bound(toElement, inclusive)
+        return TreeSetView(self._set, self._lo, self._lo_inclusive, toElement, inclusive)
+
+    def higher(self, e):
+        """
+        Finds the smallest element of the view that is strictly greater than the given element.
+
+        Returns:
+            The element, or None if there is none.
+        """
+        if self._too_low(e):
+            return self.first()
+        value = self._set.tree.higher(e)
+        if value is None or self._too_high(value):
+            return None
+        return value
+
+    def isEmpty(self):
+        """
+        Checks if the view has no elements.
+        """
+        return self.first() is None
+
+    def iterator(self):
+        """
+        Returns a lazy iterator over the elements of the view in ascending order.
+        """
+        return self._set.tree.irange(self._lo, self._hi, self._lo_inclusive, self._hi_inclusive)
+
+    def last(self):
+        """
+        Returns the largest element of the view, or None if the view is empty.
+        """
+        tree = self._set.tree
+        if self._hi is None:
+            value = tree.last()
+        elif self._hi_inclusive:
+            value = tree.floor(self._hi)
+        else:
+            value = tree.lower(self._hi)
+        if value is None or self._too_low(value):
+            return None
+        return value
+
+    def lower(self, e):
+        """
+        Finds the largest element of the view that is strictly less than the given element.
+
+        Returns:
+            The element, or None if there is none.
+        """
+        if self._too_high(e):
+            return self.last()
+        value = self._set.tree.lower(e)
+        if value is None or self._too_low(value):
+            return None
+        return value
+
+    def remove(self, obj):
+        """
+        Removes an element from the backing set if it lies within the view.
+
+        Returns:
+            True if the object was removed, False if it is outside the view or not present.
+        """
+        return self._in_range(obj) and self._set.remove(obj)
+
+    def size(self):
+        """
+        Returns the number of elements in the view, computed from two rank queries in O(log n).
+        """
+        tree = self._set.tree
+        upper = tree.length() if self._hi is None else tree.rank(self._hi, self._hi_inclusive)
+        lower = 0 if self._lo is None else tree.rank(self._lo, not self._lo_inclusive)
+        return max(upper - lower, 0)
+
+    def subSet(self, fromElement, toElement, fromInclusive=True, toInclusive=False):
+        """
+        Returns a view of the elements of this view between two bounds.
+
+        Raises:
+            ValueError: If a bound is outside this view or the lower bound is greater than the upper bound.
+        """
+        if self._set._order_key(fromElement) > self._set._order_key(toElement):
+            raise ValueError("The lower bound {} is greater than the upper bound {}.".format(fromElement, toElement))
+        self._check_bound(fromElement, fromInclusive)
+        self._check_bound(toElement, toInclusive)
+        return TreeSetView(self._set, fromElement, fromInclusive, toElement, toInclusive)
+
+    def tailSet(self, fromElement, inclusive=True):
+        """
+        Returns a view of the elements of this view that are greater than or equal to the given element.
+
+        Raises:
+            ValueError: If the bound is outside this view.
+        """
+        self._check_bound(fromElement, inclusive)
+        return TreeSetView(self._set, fromElement, inclusive, self._hi, self._hi_inclusive)
+
+
+class TreeSetCursor:
+    def __init__(self, tree_set, node):
+        """
+        Constructor of the TreeSetCursor class.
+
+        A cursor stands on one element of a TreeSet, or past either end of it, and moves to the
+        neighboring elements along the links of the tree. A full walk over the set visits every link
+        twice, so each step costs O(1) amortized. Any change to the set other than the cursor's own
+        remove invalidates the cursor, and using it afterwards raises a RuntimeError.
+
+        Args:
+            tree_set: The TreeSet the cursor walks.
+            node: The node of the tree the cursor stands on, or the tree's missing-node marker for past the last element.
+        """
+        self._set = tree_set
+        self._tree = tree_set.tree
+        self._mod_count = self._tree.mod_count
+        self._node = node
+        self._before_first = False
+
+    def _check(self):
+        """
+        Raises a RuntimeError if the set has changed since the cursor was created or last removed an element.
+        """
+        if self._set.tree is not self._tree or self._tree.mod_count != self._mod_count:
+            raise RuntimeError("The set was modified after the cursor was created.")
+
+    @property
+    def value(self):
+        """
+        The element the cursor stands on, or None if it is past either end of the set.
+        """
+        self._check()
+        node = self._node
+        return None if node == self._tree._nil else self._tree._value_of(node)
+
+    def next(self):
+        """
+        Moves the cursor to the next element. From before the first element, it moves to the first one.
+
+        Returns:
+            The new element under the cursor, or None once the cursor is past the last element.
+        """
+        self._check()
+        tree = self._tree
+        node = self._node
+        if node != tree._nil:
+            node = tree._successor(node)
+        elif self._before_first:
+            node = tree._first_node()
+        self._node = node
+        self._before_first = False
+        return None if node == tree._nil else tree._value_of(node)
+
+    def prev(self):
+        """
+        Moves the cursor to the previous element. From past the last element, it moves to the last one.
+
+        Returns:
+            The new element under the cursor, or None once the cursor is before the first element.
+        """
+        self._check()
+        tree = self._tree
+        node = self._node
+        if node != tree._nil:
+            node = tree._predecessor(node)
+        elif not self._before_first:
+            node = tree._last_node()
+        self._node = node
+        self._before_first = node == tree._nil
+        return None if node == tree._nil else tree._value_of(node)
+
+    def remove(self):
+        """
+        Removes the element under the cursor from the set and moves the cursor to the next element.
+        The cursor stays valid.
+
+        Returns:
+            The removed element.
+
+        Raises:
+            ValueError: If the cursor is past either end of the set.
+        """
+        self._check()
+        if self._node == self._tree._nil:
+            raise ValueError("The cursor is not on an element.")
+        value = self._tree._value_of(self._node)
+        tree_set = self._set
+        tree_set._own_tree()
+        tree = tree_set.tree
+        node = self._node
+        if tree is not self._tree:
+            # The tree was shared with a copy-on-write clone and has just been copied.
+            node = tree._find_node(tree_set._order_key(value))
+        self._node = tree._remove_and_advance(node)
+        self._tree = tree
+        self._mod_count = tree.mod_count
+        return value
+
+
+class FrozenTreeSet:
+    def __init__(self, tree_set):
+        """
+        Constructor of the FrozenTreeSet class, called by TreeSet.freeze.
+
+        The elements are copied in ascending order into one contiguous sequence: an array.array for
+        int and float sets, a list otherwise. Every query is a bisect over it. Sets ordered by a key
+        function also keep the list of keys, which is what the searches run on.
+
+        Args:
+            tree_set: The TreeSet to copy.
+        """
+        self._key = tree_set._key
+        self._track_sums = tree_set._track_sums
+        self._backend = tree_set._backend
+        self._collect_stats = tree_set._collect_stats
+        self._datatype = tree_set._datatype
+        if self._key is None:
+            values = list(tree_set.tree)
+            typecode = TYPECODES.get(self._datatype)
+            if typecode is not None:
+                try:
+                    values = array(typecode, values)
+                except OverflowError:
+                    pass
+            self._values = self._keys = values
+        else:
+            pairs = list(tree_set.tree.items())
+            self._keys = [key for key, _ in pairs]
+            self._values = [value for _, value in pairs]
+
+    def _order_key(self, e):
+        """
+        Returns what orders an element in the set: the element itself, or its key.
+        """
+        return e if self._key is None else self._key(e)
+
+    def _positions(self, probes):
+        """
+        Returns the insertion point of every probe in the sorted keys, in the order of the probes.
+        """
+        keys = self._keys
+        if self._key is None:
+            return [bisect_left(keys, probe) for probe in probes]
+        key = self._key
+        return [bisect_left(keys, key(probe)) for probe in probes]
+
+    def ceiling(self, e):
+        """
+        Finds the smallest element that is greater than or equal to the given element, or None if none.
+        """
+        index = bisect_left(self._keys, self._order_key(e))
+        return self._values[index] if index < len(self._values) else None
+
+    def ceilingMany(self, probes):
+        """
+        Finds the ceiling of many elements at once.
+
+        Args:
+            probes: An iterable of elements.
+
+        Returns:
+            A list with, for each probe in the given order, the smallest element that is greater than
+            or equal to it, or None if none.
+        """
+        values = self._values
+        size = len(values)
+        return [values[index] if index < size else None for index in self._positions(probes)]
+
+    def contains(self, obj):
+        """
+        Checks if the set contains a given object.
+        """
+        key = self._order_key(obj)
+        keys = self._keys
+        index = bisect_left(keys, key)
+        return index < len(keys) and not key < keys[index]
+
+    def containsMany(self, probes):
+        """
+        Checks the presence of many objects at once.
+
+        Args:
+            probes: An iterable of objects.
+
+        Returns:
+            A list with, for each probe in the given order, True if it is in the set and False otherwise.
+        """
+        probes = list(probes)
+        keys = self._keys
+        size = len(keys)
+        probe_keys = probes if self._key is None else [self._key(probe) for probe in probes]
+        return [index < size and not key < keys[index]
+                for key, index in zip(probe_keys, self._positions(probes))]
+
+    def descendingIterator(self):
+        """
+        Returns an iterator over the elements in descending order.
+        """
+        return reversed(self._values)
+
+    def first(self):
+        """
+        Returns the first element of the set, or None if the set is empty.
+        """
+        return self._values[0] if len(self._values) else None
+
+    def floor(self, e):
+        """
+        Finds the largest element that is less than or equal to the given element, or None if none.
+        """
+        index = bisect_right(self._keys, self._order_key(e))
+        return self._values[index - 1] if index else None
+
+    def floorMany(self, probes):
+        """
+        Finds the floor of many elements at once.
+
+        Args:
+            probes: An iterable of elements.
+
+        Returns:
+            A list with, for each probe in the given order, the largest element that is less than
+            or equal to it, or None if none.
+        """
+        probes = list(probes)
+        keys = self._keys
+        values = self._values
+        size = len(keys)
+        probe_keys = probes if self._key is None else [self._key(probe) for probe in probes]
+        results = []
+        for key, index in zip(probe_keys, self._positions(probes)):
+            if index < size and not key < keys[index]:
+                results.append(values[index])
+            else:
+                results.append(values[index - 1] if index else None)
+        return results
+
+    def get(self, index):
+        """
+        Returns the element at the given position in ascending order, or None if the index is out of range.
+        """
+        return self._values[index] if 0 <= index < len(self._values) else None
+
+    def higher(self, e):
+        """
+        Finds the smallest element that is strictly greater than the given element, or None if none.
+        """
+        index = bisect_right(self._keys, self._order_key(e))
+        return self._values[index] if index < len(self._values) else None
+
+    def indexOf(self, e):
+        """
+        Returns the position of the given element in ascending order, or -1 if it is not in the set.
+        """
+        key = self._order_key(e)
+        index = bisect_left(self._keys, key)
+        return index if index < len(self._keys) and not key < self._keys[index] else -1
+
+    def isEmpty(self):
+        """
+        Checks if the set is empty.
+        """
+        return len(self._values) == 0
+
+    def iterator(self):
+        """
+        Returns an iterator over the elements in ascending order.
+        """
+        return iter(self._values)
+
+    def last(self):
+        """
+        Returns the last element of the set, or None if the set is empty.
+        """
+        return self._values[-1] if len(self._values) else None
+
+    def lower(self, e):
+        """
+        Finds the largest element that is strictly less than the given element, or None if none.
+        """
+        index = bisect_left(self._keys, self._order_key(e))
+        return self._values[index - 1] if index else None
+
+    def rank(self, e):
+        """
+        Counts the elements of the set that are strictly less than the given element.
+        """
+        return bisect_left(self._keys, self._order_key(e))
+
+    def size(self):
+        """
+        Returns the number of elements in the set.
+        """
+        return len(self._values)
+
+    def thaw(self):
+        """
+        Returns a mutable TreeSet holding the elements, with the key, sums and backend of the set that
+        was frozen. The tree is built bottom-up from the sorted array in linear time.
+        """
+        new_set = TreeSet(self._key, trackSums=self._track_sums, backend=self._backend,
+                          collectStats=self._collect_stats)
+        if len(self._values):
+            new_set._datatype = self._datatype
+            if self._key is None:
+                elements = self._values
+            else:
+                elements = [_KeyedElement(key, value) for key, value in zip(self._keys, self._values)]
+            new_set.tree = new_set._build_tree(self._datatype, elements)
+        return new_set
@@ -0,0 +1,315 @@
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+MAGIC = b'TSET'
+VERSION = 1
+
+# Header: magic, format version, datatype code, padding to keep the values 8-byte aligned, number of elements.
+HEADER = struct.Struct('<4sBc2xQ')
+RECORD_LENGTH = struct.Struct('<I')
+OFFSET = struct.Struct('<Q')
+
+# Fixed-width datatypes are stored as one little-endian array. Variable-width datatypes are
+# stored as a table of record offsets followed by the length-prefixed records.
+FIXED_CODES = {int: b'q', float: b'd'}
+VARIABLE_CODES = {str: b's', int: b'n'}
+DATATYPES = {b'q': int, b'd': float, b's': str, b'n': int, b'-': None}
+
+
+def _encode(code, value):
+    """
+    Encodes one variable-width value: UTF-8 for str, minimal two's complement for big ints.
+    """
+    if code == b's':
+        return value.encode('utf-8')
+    return value.to_bytes((value + (value < 0)).bit_length() // 8 + 1, 'little', signed=True)
+
+
+def _decode(code, data):
+    """
+    Decodes one variable-width value written by _encode.
+    """
+    if code == b's':
+        return str(data, 'utf-8')
+    return int.from_bytes(data, 'little', signed=True)
+
+
+def _fixed_array(typecode, values):
+    """
+    Returns the values as an array, little-endian whatever the byte order of the machine.
+    Raises OverflowError if an int does not fit in 64 bits.
+    """
+    buffer = values if isinstance(values, array) and values.typecode == typecode else array(typecode, values)
+    if sys.byteorder != 'little':
+        buffer = array(typecode, buffer)
+        buffer.byteswap()
+    return buffer
+
+
+def write_sorted(path, datatype, values):
+    """
+    Writes sorted, duplicate-free values of one datatype to a file.
+
+    Int and float values are written as one fixed-width array of 8-byte entries; ints that do
+    not fit in 64 bits switch the whole file to the variable-width layout. Str values are
+    written as a table of offsets followed by length-prefixed UTF-8 records, so a reader can
+    still reach the i-th value directly.
+
+    Args:
+        path: The path of the file to write.
+        datatype: The datatype of the values, or None for an empty set without one.
+        values: The values in ascending order.
+
+    Raises:
+        TypeError: If the datatype cannot be serialized.
+    """
+    count = len(values)
+    code = b'-' if datatype is None else FIXED_CODES.get(datatype)
+    body = None
+    if code is not None and code != b'-':
+        try:
+            body = _fixed_array(code.decode(), values).tobytes()
+        except OverflowError:
+            code = None
+    if code is None:
+        code = VARIABLE_CODES.get(datatype)
+        if code is None:
+            raise TypeError("The datatype {} cannot be serialized. Only int, float and str are supported.".format(datatype))
+        records = [_encode(code, value) for value in values]
+        offsets = array('Q')
+        position = HEADER.size + OFFSET.size * count
+        for record in records:
+            offsets.append(position)
+            position += RECORD_LENGTH.size + len(record)
+        if sys.byteorder != 'little':
+            offsets.byteswap()
+        body = offsets.tobytes() + b''.join(RECORD_LENGTH.pack(len(record)) + record for record in records)
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, code, count))
+        if body:
+            file.write(body)
+
+
+def _read_header(data, path):
+    """
+    Parses and checks the header of a file.
+
+    Returns:
+        The datatype code and the number of elements.
+
+    Raises:
+        ValueError: If the file is not a TreeSet file of a supported version.
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("{} is not a TreeSet file.".format(path))
+    magic, version, code, count = HEADER.unpack_from(data)
+    if magic != MAGIC or code not in DATATYPES:
+        raise ValueError("{} is not a TreeSet file.".format(path))
+    if version != VERSION:
+        raise ValueError("{} has unsupported format version {}.".format(path, version))
+    return code, count
+
+
+def read_sorted(path):
+    """
+    Reads the values written by write_sorted.
+
+    Returns:
+        The datatype and the values in ascending order: an array for fixed-width datatypes,
+        a list otherwise.
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    code, count = _read_header(data, path)
+    if code in (b'q', b'd'):
+        values = array(code.decode())
+        values.frombytes(data[HEADER.size:HEADER.size + values.itemsize * count])
+        if sys.byteorder != 'little':
+            values.byteswap()
+        return DATATYPES[code], values
+    values = []
+    position = HEADER.size + OFFSET.size * count
+    for _ in range(count):
+        length, = RECORD_LENGTH.unpack_from(data, position)
+        position += RECORD_LENGTH.size
+        values.append(_decode(code, data[position:position + length]))
+        position += length
+    return DATATYPES[code], values
+
+
+class _FixedRecords:
+    """
+    Sequence view of the fixed-width values of a mapped file, for byte orders where the
+    buffer cannot be cast directly.
+    """
+
+    def __init__(self, buffer, code, count):
+        self._buffer = buffer
+        self._format = struct.Struct('<' + code.decode())
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        return self._format.unpack_from(self._buffer, HEADER.size + self._format.size * index)[0]
+
+
+class _VariableRecords:
+    """
+    Sequence view of the length-prefixed values of a mapped file. Each access decodes one
+    record, reached through the offset table.
+    """
+
+    def __init__(self, buffer, code, count):
+        self._buffer = buffer
+        self._code = code
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        position, = OFFSET.unpack_from(self._buffer, HEADER.size + OFFSET.size * index)
+        length, = RECORD_LENGTH.unpack_from(self._buffer, position)
+        start = position + RECORD_LENGTH.size
+        return _decode(self._code, self._buffer[start:start + length])
+
+
+class MappedTreeSet:
+    def __init__(self, path):
+        """
+        Opens a file written by TreeSet.dump as a read-only set.
+
+        The file is memory-mapped and queries binary-search it in place: no node is built
+        and only the pages that a search touches are read from disk, so opening is
+        instantaneous whatever the size of the set.
+
+        Args:
+            path: The path of the file.
+        """
+        with open(path, 'rb') as file:
+            if file.seek(0, 2) < HEADER.size:
+                raise ValueError("{} is not a TreeSet file.".format(path))
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        code, count = _read_header(self._mmap, path)
+        self._datatype = DATATYPES[code]
+        self._buffer = memoryview(self._mmap)
+        if code in (b'q', b'd') and sys.byteorder == 'little':
+            self._values = self._buffer[HEADER.size:HEADER.size + 8 * count].cast(code.decode())
+        elif code in (b'q', b'd'):
+            self._values = _FixedRecords(self._buffer, code, count)
+        else:
+            self._values = _VariableRecords(self._buffer, code, count)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Releases the mapping of the file. The set cannot be used afterwards.
+        """
+        if isinstance(self._values, memoryview):
+            self._values.release()
+        self._values = None
+        self._buffer.release()
+        self._mmap.close()
+
+    def _bisect(self, search, e):
+        """
+        Runs a binary search for an element over the values of the file.
+
+        Returns:
+            The insertion point, or None if the element cannot be compared with the values.
+        """
+        try:
+            return search(self._values, e)
+        except TypeError:
+            return None
+
+    def ceiling(self, e):
+        """
+        Finds the smallest value in the set that is greater than or equal to the given element.
+
+        Returns:
+            The value, or None if there is none.
+        """
+        index = self._bisect(bisect_left, e)
+        return self._values[index] if index is not None and index < len(self._values) else None
+
+    def contains(self, obj):
+        """
+        Checks if the set contains a given object.
+
+        Returns:
+            True if the object is present in the set, False otherwise.
+        """
+        index = self._bisect(bisect_left, obj)
+        return index is not None and index < len(self._values) and self._values[index] == obj
+
+    def first(self):
+        """
+        Returns the first element of the set, or None if the set is empty.
+        """
+        return self._values[0] if len(self._values) else None
+
+    def floor(self, e):
+        """
+        Finds the largest value in the set that is less than or equal to the given element.
+
+        Returns:
+            The value, or None if there is none.
+        """
+        index = self._bisect(bisect_right, e)
+        return self._values[index - 1] if index else None
+
+    def get(self, index):
+        """
+        Returns the element at the given position in ascending order, or None if the index is out of range.
+        """
+        return self._values[index] if 0 <= index < len(self._values) else None
+
+    def higher(self, e):
+        """
+        Finds the smallest value in the set that is strictly greater than the given element, or None if none.
+        """
+        index = self._bisect(bisect_right, e)
+        return self._values[index] if index is not None and index < len(self._values) else None
+
+    def isEmpty(self):
+        """
+        Checks if the set is empty.
+        """
+        return len(self._values) == 0
+
+    def iterator(self):
+        """
+        Returns an iterator over the elements in ascending order, read from the file as it advances.
+        """
+        values = self._values
+        return (values[index] for index in range(len(values)))
+
+    def last(self):
+        """
+        Returns the last element of the set, or None if the set is empty.
+        """
+        return self._values[len(self._values) - 1] if len(self._values) else None
+
+    def lower(self, e):
+        """
+        Finds the largest value in the set that is strictly less than the given element, or None if none.
+        """
+        index = self._bisect(bisect_left, e)
+        return self._values[index - 1] if index else None
+
+    def size(self):
+        """
+        Returns the number of elements in the set.
+        """
+        return len(self._values)
@@ -0,0 +1,951 @@
+import argparse
+import bisect
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from ConcurrentTreeSet import ConcurrentTreeSet
+from DurableTreeSet import DurableTreeSet
+from PersistentTreeSet import PersistentTreeSet
+from RedBlack import RedBlackTree
+from ShardedTreeSet import ShardedTreeSet
+from TreeSet import BACKENDS, TreeSet
+
+
+# The keys each engine of memory_per_element is measured with: int sets run on the array-backed engine,
+# and str sets on the linked Red-Black Tree, with one slotted Node per element.
+MEMORY_KEYS = {
+    'array': lambda number: number,
+    'linked': lambda number: str(number).zfill(10),
+}
+
+
+def memory_per_element(n, engine='array'):
+    """
+    Builds a TreeSet of n keys and returns the number of bytes allocated per element.
+
+    The keys are created before tracing starts, so the figure covers only the structure
+    of the set (nodes or buffers and tree bookkeeping), not the key objects themselves.
+
+    Args:
+        n: The number of elements to insert.
+        engine: One of MEMORY_KEYS, which picks the type of the keys and so the engine of the set.
+
+    Returns:
+        The traced allocation size divided by n.
+    """
+    keys = [MEMORY_KEYS[engine](number) for number in range(n)]
+    gc.collect()
+    tracemalloc.start()
+    ts = TreeSet()
+    for key in keys:
+        ts.add(key)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del ts
+    return current / n
+
+
+def run_memory(sizes):
+    """
+    Prints the bytes per element of each engine for each of the given set sizes.
+    """
+    for n in sizes:
+        for engine in MEMORY_KEYS:
+            print("memory {:<6} n={:>10}  {:8.1f} bytes/element".format(engine, n, memory_per_element(n, engine)))
+
+
+class CountingKey:
+    """
+    Key wrapper that counts every rich comparison made against it.
+    """
+    __slots__ = ('key',)
+    comparisons = 0
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        CountingKey.comparisons += 1
+        return self.key < other.key
+
+    def __gt__(self, other):
+        CountingKey.comparisons += 1
+        return self.key > other.key
+
+    def __le__(self, other):
+        CountingKey.comparisons += 1
+        return self.key <= other.key
+
+    def __ge__(self, other):
+        CountingKey.comparisons += 1
+        return self.key >= other.key
+
+    def __eq__(self, other):
+        CountingKey.comparisons += 1
+        return self.key == other.key
+
+    __hash__ = None
+
+
+def comparisons_per_operation(n, seed=0):
+    """
+    Counts key comparisons per add and per remove on a TreeSet of n keys.
+
+    The single-descent write path is compared with the previous lookup-then-write path,
+    which ran contains before add (twice, once in TreeSet and once in the tree) and
+    contains before remove.
+
+    Args:
+        n: The number of keys.
+        seed: The seed of the key shuffle.
+
+    Returns:
+        A dict with the comparisons per operation for each path.
+    """
+    keys = [CountingKey(i) for i in range(n)]
+    random.Random(seed).shuffle(keys)
+    results = {}
+
+    ts = TreeSet()
+    CountingKey.comparisons = 0
+    for key in keys:
+        ts.add(key)
+    results['add'] = CountingKey.comparisons / n
+    CountingKey.comparisons = 0
+    for key in keys:
+        ts.remove(key)
+    results['remove'] = CountingKey.comparisons / n
+
+    tree = RedBlackTree()
+    CountingKey.comparisons = 0
+    for key in keys:
+        if not tree.contains(key) and not tree.contains(key):
+            tree.add(key)
+    results['add (lookup first)'] = CountingKey.comparisons / n
+    CountingKey.comparisons = 0
+    for key in keys:
+        if tree.contains(key):
+            tree.remove(key)
+    results['remove (lookup first)'] = CountingKey.comparisons / n
+    return results
+
+
+def run_comparisons(sizes):
+    """
+    Prints the comparisons per add and remove for each of the given set sizes.
+    """
+    for n in sizes:
+        for name, value in comparisons_per_operation(n).items():
+            print("comparisons n={:>10}  {:<22} {:6.1f} per op".format(n, name, value))
+
+
+def _recursive_inorder(node):
+    """
+    The recursive in-order generator that RedBlackTree used before iteration followed parent links.
+    Kept as the reference point of the scan benchmark.
+    """
+    if node is not None:
+        yield from _recursive_inorder(node.left)
+        yield node.value
+        yield from _recursive_inorder(node.right)
+
+
+def _scan_rate(iterable_factory, n, repeat=3):
+    """
+    Returns the best elements-per-second rate of fully consuming a fresh iterator.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in iterable_factory():
+            pass
+        best = min(best, time.perf_counter() - start)
+    return n / best
+
+
+def full_scan_throughput(n):
+    """
+    Measures full in-order scan throughput of a tree of n keys.
+
+    Args:
+        n: The number of keys.
+
+    Returns:
+        A dict with elements per second for the recursive generator, the linked tree's
+        parent-pointer iterator and the array-backed engine's iterator.
+    """
+    keys = list(range(n))
+    tree = RedBlackTree.fromSorted(keys)
+    numeric = TreeSet.fromSorted(keys)
+    return {
+        'recursive generator': _scan_rate(lambda: _recursive_inorder(tree.root), n),
+        'linked iterator': _scan_rate(lambda: iter(tree), n),
+        'array iterator': _scan_rate(numeric.iterator, n),
+    }
+
+
+def run_scan(sizes):
+    """
+    Prints the full-scan throughput for each of the given set sizes.
+    """
+    for n in sizes:
+        for name, rate in full_scan_throughput(n).items():
+            print("scan n={:>10}  {:<20} {:12.0f} elements/s".format(n, name, rate))
+
+
+def _best_time(function, repeat=3):
+    """
+    Returns the best wall-clock time of calling a function several times.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def clone_times(n):
+    """
+    Times cloning a set of n keys against rebuilding it with addAll.
+
+    Args:
+        n: The number of keys.
+
+    Returns:
+        A dict with seconds per copy for each engine and copy strategy.
+    """
+    results = {}
+    for engine, keys in (('array', list(range(n))), ('linked', [str(i).zfill(10) for i in range(n)])):
+        ts = TreeSet.fromSorted(keys)
+
+        def rebuild():
+            copy = TreeSet()
+            copy.addAll(ts.iterator())
+
+        def insert():
+            copy = TreeSet()
+            for key in ts.iterator():
+                copy.add(key)
+
+        results[engine + ' clone'] = _best_time(ts.clone)
+        results[engine + ' copy-on-write clone'] = _best_time(lambda: ts.clone(copyOnWrite=True))
+        results[engine + ' addAll rebuild'] = _best_time(rebuild)
+        results[engine + ' add one by one'] = _best_time(insert, repeat=1)
+    return results
+
+
+def run_clone(sizes):
+    """
+    Prints the clone and rebuild times for each of the given set sizes.
+    """
+    for n in sizes:
+        for name, seconds in clone_times(n).items():
+            print("clone n={:>10}  {:<28} {:10.4f} s".format(n, name, seconds))
+
+
+def reader_throughput(n, readers=4, duration=2.0):
+    """
+    Measures how many full scans reader threads complete while one writer thread keeps adding and
+    removing keys.
+
+    The persistent set is read through lock-free snapshots. The baseline is a TreeSet whose
+    readers and writer share a global lock, as readers of the mutable tree must.
+
+    Args:
+        n: The number of keys in the set.
+        readers: The number of reader threads.
+        duration: The number of seconds each configuration runs.
+
+    Returns:
+        A dict with, for each configuration, the elements read per second and the writes per second.
+    """
+    keys = list(range(0, 2 * n, 2))
+    results = {}
+
+    def run(read, write):
+        stop = threading.Event()
+        counts = {'read': 0, 'write': 0}
+
+        def reader():
+            while not stop.is_set():
+                counts['read'] += read()
+
+        def writer():
+            rng = random.Random(0)
+            while not stop.is_set():
+                write(rng.randrange(2 * n) | 1)
+                counts['write'] += 1
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads.append(threading.Thread(target=writer))
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return counts['read'] / duration, counts['write'] / duration
+
+    persistent = PersistentTreeSet()
+    persistent.addAll(keys)
+
+    def persistent_write(key):
+        if not persistent.add(key):
+            persistent.remove(key)
+
+    results['persistent snapshots'] = run(lambda: sum(1 for _ in persistent.snapshot().iterator()),
+                                          persistent_write)
+
+    locked = TreeSet.fromSorted(keys)
+    lock = threading.Lock()
+
+    def locked_read():
+        with lock:
+            return sum(1 for _ in locked.iterator())
+
+    def locked_write(key):
+        with lock:
+            if not locked.add(key):
+                locked.remove(key)
+
+    results['TreeSet with global lock'] = run(locked_read, locked_write)
+    return results
+
+
+def run_readers(sizes):
+    """
+    Prints the reader and writer throughput for each of the given set sizes.
+    """
+    for n in sizes:
+        for name, (reads, writes) in reader_throughput(n).items():
+            print("readers n={:>10}  {:<26} {:12.0f} elements read/s {:10.0f} writes/s".format(n, name, reads, writes))
+
+
+class _LockedTreeSet:
+    """
+    A TreeSet guarded by one plain lock for every operation, the baseline of the contention benchmark.
+    """
+
+    def __init__(self, keys):
+        self._set = TreeSet.fromSorted(keys)
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        method = getattr(self._set, name)
+
+        def locked(*args):
+            with self._lock:
+                return method(*args)
+        return locked
+
+
+def contention_throughput(n, threads=8, read_ratios=(0.5, 0.9, 0.99), duration=1.0):
+    """
+    Measures the operations per second of a pool of threads sharing one set, for several mixes of
+    reads and writes.
+
+    Each thread draws a random key and, with the given probability, reads it (contains, ceiling,
+    floor, higher or lower); otherwise it adds or removes it.
+
+    Args:
+        n: The number of keys in the set.
+        threads: The number of worker threads.
+        read_ratios: The fractions of operations that are reads.
+        duration: The number of seconds each configuration runs.
+
+    Returns:
+        A dict mapping (implementation, read ratio) to operations per second.
+    """
+    keys = list(range(0, 2 * n, 2))
+    results = {}
+    for read_ratio in read_ratios:
+        concurrent = ConcurrentTreeSet()
+        concurrent.addAll(keys)
+        for name, shared in (('ConcurrentTreeSet', concurrent), ('TreeSet with global lock', _LockedTreeSet(keys))):
+            stop = threading.Event()
+            counts = [0] * threads
+
+            def worker(index):
+                rng = random.Random(index)
+                reads = (shared.contains, shared.ceiling, shared.floor, shared.higher, shared.lower)
+                done = 0
+                while not stop.is_set():
+                    key = rng.randrange(2 * n)
+                    if rng.random() < read_ratio:
+                        rng.choice(reads)(key)
+                    elif not shared.add(key):
+                        shared.remove(key)
+                    done += 1
+                counts[index] = done
+
+            workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+            for thread in workers:
+                thread.start()
+            time.sleep(duration)
+            stop.set()
+            for thread in workers:
+                thread.join()
+            results[(name, read_ratio)] = sum(counts) / duration
+    return results
+
+
+def run_contention(sizes):
+    """
+    Prints the multi-threaded throughput for each of the given set sizes and read ratios.
+    """
+    for n in sizes:
+        for (name, read_ratio), rate in contention_throughput(n).items():
+            print("contention n={:>10}  reads={:<5} {:<26} {:12.0f} ops/s".format(n, read_ratio, name, rate))
+
+
+def ingest_throughput(n, shards=None, batch=10 ** 5):
+    """
+    Measures the rate of ingesting n random keys in batches with addAll, on one TreeSet and on a
+    ShardedTreeSet whose shards insert their part of each batch in parallel processes.
+
+    Args:
+        n: The number of keys.
+        shards: The number of shard processes, by default the number of CPUs.
+        batch: The number of keys per addAll call.
+
+    Returns:
+        A dict with keys per second for each implementation.
+    """
+    rng = random.Random(0)
+    keys = [rng.randrange(1 << 60) for _ in range(n)]
+    batches = [keys[i:i + batch] for i in range(0, n, batch)]
+    results = {}
+
+    ts = TreeSet()
+    start = time.perf_counter()
+    for chunk in batches:
+        ts.addAll(chunk)
+    results['TreeSet'] = n / (time.perf_counter() - start)
+
+    shards = shards or os.cpu_count() or 1
+    with ShardedTreeSet(shards=shards) as sharded:
+        start = time.perf_counter()
+        for chunk in batches:
+            sharded.addAll(chunk)
+        results['ShardedTreeSet ({} shards)'.format(shards)] = n / (time.perf_counter() - start)
+    return results
+
+
+def run_ingest(sizes):
+    """
+    Prints the batched ingest rate for each of the given set sizes.
+    """
+    for n in sizes:
+        for name, rate in ingest_throughput(n).items():
+            print("ingest n={:>10}  {:<26} {:12.0f} keys/s".format(n, name, rate))
+
+
+def cold_start_times(n):
+    """
+    Times the ways of getting a set of n keys back after a restart: inserting the keys one by one,
+    loading a dump, and memory-mapping a dump.
+
+    Args:
+        n: The number of keys.
+
+    Returns:
+        A dict with seconds for each way, for int and str keys.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'set.bin')
+        for datatype, keys in (('int', list(range(n))), ('str', [str(i).zfill(10) for i in range(n)])):
+            shuffled = keys[:]
+            random.Random(0).shuffle(shuffled)
+            TreeSet.fromSorted(keys).dump(path)
+
+            def insert():
+                ts = TreeSet()
+                for key in shuffled:
+                    ts.add(key)
+
+            def open_mapped():
+                TreeSet.load(path, mapped=True).close()
+
+            results[datatype + ' add one by one'] = _best_time(insert, repeat=1)
+            results[datatype + ' load'] = _best_time(lambda: TreeSet.load(path))
+            results[datatype + ' mapped open'] = _best_time(open_mapped)
+    return results
+
+
+def run_cold_start(sizes):
+    """
+    Prints the cold start times for each of the given set sizes.
+    """
+    for n in sizes:
+        for name, seconds in cold_start_times(n).items():
+            print("coldstart n={:>10}  {:<20} {:10.4f} s".format(n, name, seconds))
+
+
+def durable_throughput(n, seconds=2.0):
+    """
+    Measures the rate of random adds and removes on a DurableTreeSet with fsync batching on and off,
+    next to the in-memory TreeSet.
+
+    Args:
+        n: The number of distinct keys drawn from.
+        seconds: The time budget of each configuration. Without batching every operation waits for
+            an fsync, so the configuration stops once the budget is spent.
+
+    Returns:
+        A dict with operations per second for each configuration.
+    """
+    rng = random.Random(0)
+    keys = [rng.randrange(n) for _ in range(n)]
+    results = {}
+
+    def run(target):
+        done = 0
+        start = time.perf_counter()
+        for key in keys:
+            if not target.add(key):
+                target.remove(key)
+            done += 1
+            if done % 256 == 0 and time.perf_counter() - start > seconds:
+                break
+        if isinstance(target, DurableTreeSet):
+            target.flush()
+        return done / (time.perf_counter() - start)
+
+    results['TreeSet in memory'] = run(TreeSet())
+    for batching in (True, False):
+        with tempfile.TemporaryDirectory() as directory:
+            with DurableTreeSet(directory, fsync_batching=batching) as durable:
+                name = 'DurableTreeSet fsync batching ' + ('on' if batching else 'off')
+                results[name] = run(durable)
+    return results
+
+
+def run_durable(sizes):
+    """
+    Prints the durable write rate for each of the given key ranges.
+    """
+    for n in sizes:
+        for name, rate in durable_throughput(n).items():
+            print("durable n={:>10}  {:<34} {:12.0f} ops/s".format(n, name, rate))
+
+
+def backend_rates(n, probes=10 ** 5):
+    """
+    Measures the red-black and chunked backends of TreeSet on the same random streams: n adds,
+    random contains and ceiling probes, a full iteration, and n removes.
+
+    Args:
+        n: The number of keys.
+        probes: The number of contains and ceiling calls timed.
+
+    Returns:
+        A dict with operations per second for each key type, backend and operation.
+    """
+    rng = random.Random(0)
+    numbers = list(range(n))
+    rng.shuffle(numbers)
+    lookups = [rng.randrange(n) for _ in range(probes)]
+    results = {}
+    for datatype, convert in (('int', int), ('str', lambda number: str(number).zfill(10))):
+        keys = [convert(number) for number in numbers]
+        queries = [convert(number) for number in lookups]
+        for backend in ('redblack', 'chunked'):
+            ts = TreeSet(backend=backend)
+            name = '{} {} '.format(datatype, backend)
+
+            def add():
+                for key in keys:
+                    ts.add(key)
+
+            def contains():
+                for key in queries:
+                    ts.contains(key)
+
+            def ceiling():
+                for key in queries:
+                    ts.ceiling(key)
+
+            def iterate():
+                for _ in ts.iterator():
+                    pass
+
+            def remove():
+                for key in keys:
+                    ts.remove(key)
+
+            results[name + 'add'] = n / _best_time(add, repeat=1)
+            results[name + 'contains'] = probes / _best_time(contains)
+            results[name + 'ceiling'] = probes / _best_time(ceiling)
+            results[name + 'iteration'] = n / _best_time(iterate)
+            results[name + 'remove'] = n / _best_time(remove, repeat=1)
+    return results
+
+
+def run_backends(sizes):
+    """
+    Prints the rates of the red-black and chunked backends for each of the given set sizes.
+    """
+    for n in sizes:
+        for name, rate in backend_rates(n).items():
+            print("backends n={:>10}  {:<24} {:14.0f} ops/s".format(n, name, rate))
+
+
+STREAMS = ('random', 'sorted', 'reverse', 'adversarial')
+
+# Every key type maps the numbers 0 .. 2n - 1 to keys in the same order. The set holds the even
+# numbers, so odd numbers give probes that are absent but fall between two elements.
+KEY_TYPES = {
+    'int': lambda number: number,
+    'float': lambda number: number + 0.5,
+    'str': lambda number: str(number).zfill(10),
+    'tuple': lambda number: (number // 1000, number % 1000),
+}
+
+
+def _stream_numbers(stream, n, rng):
+    """
+    Returns the numbers 0, 2, .., 2n - 2 in the order of a key stream. The adversarial stream takes
+    them alternately from both ends (0, 2n - 2, 2, 2n - 4, ..), so every insertion lands at the end
+    of one of the two longest paths and the rebalancing runs up both spines of the tree in turn.
+    """
+    numbers = list(range(0, 2 * n, 2))
+    if stream == 'random':
+        rng.shuffle(numbers)
+    elif stream == 'reverse':
+        numbers.reverse()
+    elif stream == 'adversarial':
+        numbers = [numbers[i // 2] if i % 2 == 0 else numbers[n - 1 - i // 2] for i in range(n)]
+    return numbers
+
+
+def _timed_calls(call, arguments):
+    """
+    Calls a function once per argument and returns the duration of every call in nanoseconds.
+    """
+    clock = time.perf_counter_ns
+    latencies = []
+    for argument in arguments:
+        start = clock()
+        call(argument)
+        latencies.append(clock() - start)
+    return latencies
+
+
+def _peak_bytes(function):
+    """
+    Runs a function under tracemalloc and returns the peak number of bytes it had allocated.
+    """
+    gc.collect()
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def _record(results, structure, method, latencies, peak, **case):
+    """
+    Summarizes the latencies of a method into one result: calls per second and the 50th and 99th
+    percentile of the latency, with the peak memory of one call. A method that made no calls, such as
+    pollFirst on a set of one key, gives no result. Calls too fast for the clock give None calls per
+    second, which is valid JSON where an infinity is not.
+    """
+    if not latencies:
+        return
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    results.append(dict(case, structure=structure, method=method, calls=len(ordered),
+                        ops_per_sec=len(ordered) * 1e9 / total if total else None,
+                        p50_ns=ordered[len(ordered) // 2],
+                        p99_ns=ordered[min(len(ordered) - 1, len(ordered) * 99 // 100)],
+                        peak_bytes=peak))
+
+
+def suite_results(n, stream, type_name, methods=None, probes=1000, repeat=3, seed=0,
+                  backend='redblack', insort_limit=10 ** 5):
+    """
+    Times every public TreeSet method on a set of n keys built from one key stream, and the
+    equivalent operations of a sorted list searched with bisect.
+
+    The set is built by adding the keys one by one in stream order, which times add. Each lookup
+    is then timed on probes calls with random arguments, half of them absent from the set; methods
+    that take a batch or visit the whole set are timed on repeat calls. Methods that change the set
+    are timed in pairs that undo each other (addAll and removeAll of absent keys, pollFirst followed
+    by adding the element back), or on a clone, so every method sees a set of n keys. remove is
+    timed last, by removing every key in stream order. The peak memory of a method is traced on one
+    extra call, and that of add on a second, traced build of the whole set.
+
+    The bisect baseline answers the lookups on a sorted list. Its insertions and removals shift the
+    list, so they are timed only up to insort_limit keys.
+
+    Args:
+        n: The number of keys.
+        stream: One of STREAMS.
+        type_name: One of the names of KEY_TYPES.
+        methods: The names of the methods to time, or None for all of them.
+        probes: The number of calls to a lookup.
+        repeat: The number of calls to a method that takes a batch or visits the whole set.
+        seed: The seed of the key stream and of the probes.
+        backend: The TreeSet backend.
+        insort_limit: The largest n for which the baseline times insertions and removals.
+
+    Returns:
+        A list of results, one dictionary per structure and method.
+    """
+    convert = KEY_TYPES[type_name]
+    rng = random.Random(seed)
+    keys = [convert(number) for number in _stream_numbers(stream, n, rng)]
+    ordered = sorted(keys)
+    queries = [convert(rng.randrange(2 * n)) for _ in range(probes)]
+    positions = [rng.randrange(n) for _ in range(probes)]
+    ranges = []
+    for _ in range(probes):
+        low = rng.randrange(2 * n)
+        ranges.append((convert(low), convert(low + 200)))
+    batch = [convert(2 * i + 1) for i in rng.sample(range(n), min(probes, n))]
+    mixed = queries[:len(batch)]
+    numeric = type_name in ('int', 'float')
+    serializable = type_name in ('int', 'float', 'str')
+    case = dict(n=n, stream=stream, type=type_name, backend=backend)
+    results = []
+
+    def wanted(method):
+        return methods is None or method in methods
+
+    def each(method, call, arguments):
+        if wanted(method):
+            latencies = _timed_calls(call, arguments)
+            _record(results, 'TreeSet', method, latencies, _peak_bytes(lambda: call(arguments[0])), **case)
+
+    def whole(method, call):
+        if wanted(method):
+            latencies = _timed_calls(lambda _: call(), range(repeat))
+            _record(results, 'TreeSet', method, latencies, _peak_bytes(call), **case)
+
+    ts = TreeSet(backend=backend)
+    latencies = _timed_calls(ts.add, keys)
+    if wanted('add'):
+        def build():
+            traced = TreeSet(backend=backend)
+            for key in keys:
+                traced.add(key)
+        _record(results, 'TreeSet', 'add', latencies, _peak_bytes(build), **case)
+
+    each('ceiling', ts.ceiling, queries)
+    whole('ceilingMany', lambda: ts.ceilingMany(queries))
+    whole('clone', ts.clone)
+    each('contains', ts.contains, queries)
+    whole('containsAll', lambda: ts.containsAll(mixed))
+    whole('containsMany', lambda: ts.containsMany(queries))
+    each('countRange', lambda bounds: ts.countRange(*bounds), ranges)
+    whole('descendingIterator', lambda: all(True for _ in ts.descendingIterator()))
+    whole('difference', lambda: ts.difference(mixed))
+    each('first', lambda _: ts.first(), range(probes))
+    each('floor', ts.floor, queries)
+    whole('floorMany', lambda: ts.floorMany(queries))
+    whole('freeze', ts.freeze)
+    whole('fromSorted', lambda: TreeSet.fromSorted(ordered))
+    each('get', ts.get, positions)
+    each('headSet', ts.headSet, queries)
+    each('higher', ts.higher, queries)
+    each('indexOf', ts.indexOf, queries)
+    whole('intersection', lambda: ts.intersection(mixed))
+    each('isEmpty', lambda _: ts.isEmpty(), range(probes))
+    whole('iterator', lambda: all(True for _ in ts.iterator()))
+    each('last', lambda _: ts.last(), range(probes))
+    each('lower', ts.lower, queries)
+    each('rank', ts.rank, queries)
+    each('seek', ts.seek, queries)
+    each('size', lambda _: ts.size(), range(probes))
+    each('subSet', lambda bounds: ts.subSet(*bounds), ranges)
+    if numeric:
+        each('sumRange', lambda bounds: ts.sumRange(*bounds), ranges)
+    whole('symmetricDifference', lambda: ts.symmetricDifference(mixed))
+    each('tailSet', ts.tailSet, queries)
+    whole('union', lambda: ts.union(mixed))
+    if serializable and (wanted('dump') or wanted('load')):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'set.bin')
+            whole('dump', lambda: ts.dump(path))
+            ts.dump(path)
+            whole('load', lambda: TreeSet.load(path))
+
+    # Mutations, in pairs that leave the set as it was.
+    if wanted('addAll') or wanted('removeAll'):
+        latencies = {'addAll': [], 'removeAll': []}
+        for _ in range(repeat):
+            latencies['addAll'] += _timed_calls(ts.addAll, [batch])
+            latencies['removeAll'] += _timed_calls(ts.removeAll, [batch])
+        peaks = {'addAll': _peak_bytes(lambda: ts.addAll(batch)), 'removeAll': _peak_bytes(lambda: ts.removeAll(batch))}
+        for method in ('addAll', 'removeAll'):
+            if wanted(method):
+                _record(results, 'TreeSet', method, latencies[method], peaks[method], **case)
+    if wanted('symmetricDifferenceUpdate'):
+        latencies = _timed_calls(ts.symmetricDifferenceUpdate, [batch] * (2 * repeat))
+        peak = _peak_bytes(lambda: ts.symmetricDifferenceUpdate(batch))
+        ts.symmetricDifferenceUpdate(batch)
+        _record(results, 'TreeSet', 'symmetricDifferenceUpdate', latencies, peak, **case)
+    for method in ('pollFirst', 'pollLast'):
+        if wanted(method):
+            polled = []
+            poll = getattr(ts, method)
+            latencies = _timed_calls(lambda _: polled.append(poll()), range(min(probes, n - 1)))
+            peak = _peak_bytes(lambda: polled.append(poll()))
+            ts.addAll(polled)
+            _record(results, 'TreeSet', method, latencies, peak, **case)
+    for method, call in (('clear', lambda copy: copy.clear()), ('retainAll', lambda copy: copy.retainAll(mixed))):
+        if wanted(method):
+            copies = [ts.clone() for _ in range(repeat + 1)]
+            latencies = _timed_calls(call, copies[:repeat])
+            _record(results, 'TreeSet', method, latencies, _peak_bytes(lambda: call(copies[repeat])), **case)
+            del copies
+    if wanted('remove'):
+        peak = _peak_bytes(lambda: ts.remove(keys[0]))
+        ts.add(keys[0])
+        _record(results, 'TreeSet', 'remove', _timed_calls(ts.remove, keys), peak, **case)
+    del ts
+
+    # Baseline: a sorted list searched with bisect.
+    def baseline(method, call, arguments):
+        if wanted(method):
+            latencies = _timed_calls(call, arguments)
+            _record(results, 'bisect', method, latencies, _peak_bytes(lambda: call(arguments[0])), **case)
+
+    values = ordered
+    if n <= insort_limit and wanted('add'):
+        values = []
+        latencies = _timed_calls(lambda key: bisect.insort(values, key), keys)
+
+        def build_list():
+            traced = []
+            for key in keys:
+                bisect.insort(traced, key)
+        _record(results, 'bisect', 'add', latencies, _peak_bytes(build_list), **case)
+
+    def at(index):
+        return values[index] if 0 <= index < len(values) else None
+
+    def contains(key):
+        index = bisect.bisect_left(values, key)
+        return index < len(values) and values[index] == key
+
+    def index_of(key):
+        index = bisect.bisect_left(values, key)
+        return index if index < len(values) and values[index] == key else -1
+
+    baseline('ceiling', lambda key: at(bisect.bisect_left(values, key)), queries)
+    baseline('contains', contains, queries)
+    baseline('countRange', lambda bounds: bisect.bisect_right(values, bounds[1]) - bisect.bisect_left(values, bounds[0]), ranges)
+    baseline('first', lambda _: values[0], range(probes))
+    baseline('floor', lambda key: at(bisect.bisect_right(values, key) - 1), queries)
+    baseline('get', at, positions)
+    baseline('higher', lambda key: at(bisect.bisect_right(values, key)), queries)
+    baseline('indexOf', index_of, queries)
+    if wanted('iterator'):
+        latencies = _timed_calls(lambda _: all(True for _ in values), range(repeat))
+        _record(results, 'bisect', 'iterator', latencies, 0, **case)
+    baseline('last', lambda _: values[-1], range(probes))
+    baseline('lower', lambda key: at(bisect.bisect_left(values, key) - 1), queries)
+    baseline('rank', lambda key: bisect.bisect_left(values, key), queries)
+    if n <= insort_limit and wanted('remove'):
+        latencies = _timed_calls(lambda key: values.pop(bisect.bisect_left(values, key)), keys)
+        _record(results, 'bisect', 'remove', latencies, 0, **case)
+    return results
+
+
+def _git_commit():
+    """
+    Returns the commit the benchmark runs on, or None outside a git checkout.
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes, streams=STREAMS, types=tuple(KEY_TYPES), methods=None, probes=1000, repeat=3,
+              seed=0, backend='redblack', output=None):
+    """
+    Runs the suite for every combination of size, key stream and key type. Prints one line per result,
+    and writes all of them as JSON to output if given, with the commit and environment they were
+    measured on, so that runs on two commits can be compared.
+    """
+    results = []
+    for n in sizes:
+        for stream in streams:
+            for type_name in types:
+                for result in suite_results(n, stream, type_name, methods, probes, repeat, seed, backend):
+                    results.append(result)
+                    rate = result['ops_per_sec']
+                    print("suite n={:>10}  {:<11} {:<5} {:<7} {:<25} {:>14} ops/s  p50 {:>10} ns  p99 {:>10} ns  "
+                          "peak {:>12} B".format(n, stream, type_name, result['structure'], result['method'],
+                                                 "-" if rate is None else "{:.0f}".format(rate),
+                                                 result['p50_ns'], result['p99_ns'], result['peak_bytes']))
+    if output is not None:
+        report = {
+            'commit': _git_commit(),
+            'python': sys.version,
+            'platform': platform.platform(),
+            'parameters': dict(sizes=list(sizes), streams=list(streams), types=list(types), methods=methods,
+                               probes=probes, repeat=repeat, seed=seed, backend=backend),
+            'results': results,
+        }
+        with open(output, 'w') as file:
+            json.dump(report, file, indent=1, allow_nan=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TreeSet benchmarks")
+    parser.add_argument("benchmark", choices=["memory", "comparisons", "scan", "clone", "readers", "contention", "ingest", "coldstart", "durable", "backends", "suite"])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        help="set sizes (default: 10^5 10^6 10^7, or 10^3 to 10^7 for the suite)")
+    parser.add_argument("--streams", nargs="+", choices=STREAMS, default=list(STREAMS), help="suite key streams")
+    parser.add_argument("--types", nargs="+", choices=list(KEY_TYPES), default=list(KEY_TYPES), help="suite key types")
+    parser.add_argument("--methods", nargs="+", help="suite methods to time (default: all)")
+    parser.add_argument("--probes", type=int, default=1000, help="suite calls per lookup method")
+    parser.add_argument("--repeat", type=int, default=3, help="suite calls per batch or whole-set method")
+    parser.add_argument("--seed", type=int, default=0, help="suite seed of the key streams and probes")
+    parser.add_argument("--backend", choices=BACKENDS, default="redblack", help="suite TreeSet backend")
+    parser.add_argument("--json", help="path of the JSON report of the suite")
+    args = parser.parse_args()
+    sizes = args.sizes
+    if sizes is None:
+        sizes = [10 ** k for k in range(3, 8)] if args.benchmark == "suite" else [10 ** 5, 10 ** 6, 10 ** 7]
+    if args.benchmark == "memory":
+        run_memory(sizes)
+    elif args.benchmark == "comparisons":
+        run_comparisons(sizes)
+    elif args.benchmark == "scan":
+        run_scan(sizes)
+    elif args.benchmark == "clone":
+        run_clone(sizes)
+    elif args.benchmark == "readers":
+        run_readers(sizes)
+    elif args.benchmark == "contention":
+        run_contention(sizes)
+    elif args.benchmark == "ingest":
+        run_ingest(sizes)
+    elif args.benchmark == "coldstart":
+        run_cold_start(sizes)
+    elif args.benchmark == "durable":
+        run_durable(sizes)
+    elif args.benchmark == "backends":
+        run_backends(sizes)
+    elif args.benchmark == "suite":
+        run_suite(sizes, args.streams, args.types, args.methods, args.probes, args.repeat, args.seed,
+                  args.backend, args.json)
+
+if __name__ == '__main__':
+    main()
@@ -1,178 +1,1199 @@
-import unittest
-from TreeSet import TreeSet
-
-class TestTreeSet(unittest.TestCase):
-    def test_add_elements(self):
-        """Test to verify that elements can be added to the set correctly and duplicate verification."""
-        ts = TreeSet()
-        self.assertTrue(ts.add(5))
-        self.assertTrue(ts.add(10))
-        self.assertTrue(ts.add(3))
-        self.assertEqual(ts.size(), 3)
-        self.assertTrue(ts.add(1))
-        self.assertFalse(ts.add(5))
-
-    def test_add_different_types(self):
-        """Test to verify that different types cannot be mixed in the set."""
-        ts = TreeSet()
-        ts.add(10)
-        with self.assertRaises(TypeError):
-            ts.add("test")
-
-    def test_contains(self):
-        """Test to verify if the set contains certain elements."""
-        ts = TreeSet()
-        ts.add(1)
-        ts.add(2)
-        ts.add(3)
-        self.assertTrue(ts.contains(1))
-        self.assertFalse(ts.contains(4))
-
-    def test_remove(self):
-        """Test to verify element removal and that an absent element cannot be removed."""
-        ts = TreeSet()
-        ts.add(1)
-        ts.add(2)
-        ts.add(3)
-        self.assertTrue(ts.remove(2))
-        self.assertFalse(ts.contains(2))
-        self.assertEqual(ts.size(), 2)
-        self.assertFalse(ts.remove(2))
-
-    def test_first_last_elements(self):
-        """Test to verify that the first and last elements of the set can be obtained."""
-        ts = TreeSet()
-        ts.add(3)
-        ts.add(1)
-        ts.add(5)
-        self.assertEqual(ts.first(), 1)
-        self.assertEqual(ts.last(), 5)
-
-    def test_clear_and_empty(self):
-        """Test to verify that the set can be cleared and checked if it is empty."""
-        ts = TreeSet()
-        ts.add(1)
-        ts.add(2)
-        ts.clear()
-        self.assertTrue(ts.isEmpty())
-
-    def test_poll_methods(self):
-        """Test to verify the functionality of pollFirst and pollLast."""
-        ts = TreeSet()
-        ts.add(1)
-        ts.add(2)
-        ts.add(3)
-        self.assertEqual(ts.pollFirst(), 1)
-        self.assertEqual(ts.pollLast(), 3)
-        self.assertEqual(ts.size(), 1)
-
-    def test_iterators(self):
-        """Test to verify that iterators iterate correctly in normal and descending order."""
-        ts = TreeSet()
-        elements = [3, 1, 4, 2]
-        for e in elements:
-            ts.add(e)
-        sorted_elements = sorted(elements)
-        self.assertEqual(list(ts.iterator()), sorted_elements)
-        self.assertEqual(list(ts.descendingIterator()), sorted_elements[::-1])
-
-    def test_ceiling_floor(self):
-        """Test to verify the ceiling and floor operations in the set."""
-        ts = TreeSet()
-        ts.add(5)
-        ts.add(10)
-        ts.add(15)
-        ts.add(20)
-        self.assertEqual(ts.ceiling(12), 15)
-        self.assertEqual(ts.floor(12), 10)
-
-    def test_higher_lower(self):
-        """Test to verify the higher and lower operations in the set."""
-        ts = TreeSet()
-        ts.add(3)
-        ts.add(6)
-        ts.add(9)
-        self.assertEqual(ts.higher(4), 6)
-        self.assertEqual(ts.lower(8), 6)
-
-    def test_type_error_on_empty_remove(self):
-        """Test to verify that an attempt to remove from an empty set is handled correctly."""
-        ts = TreeSet()
-        self.assertFalse(ts.remove(5))
-
-    def test_type_consistency_after_clear(self):
-        """Test to verify that data type consistency is maintained even after clearing the set."""
-        ts = TreeSet()
-        ts.add(10)
-        ts.clear()
-        # This should not raise an error because the set was cleared
-        ts.add("test")
-
-    def test_empty_set_operations(self):
-        """Test to verify operations on an empty set."""
-        ts = TreeSet()
-        self.assertTrue(ts.isEmpty())
-        self.assertEqual(ts.size(), 0)
-        self.assertIsNone(ts.first())
-        self.assertIsNone(ts.last())
-        self.assertIsNone(ts.pollFirst())
-        self.assertIsNone(ts.pollLast())
-
-    def test_duplicates_handling(self):
-        """Test to verify that duplicates are not added to the set."""
-        ts = TreeSet()
-        ts.add(1)
-        ts.add(1)
-        self.assertEqual(ts.size(), 1)
-        ts.add(2)
-        ts.add(2)
-        self.assertEqual(ts.size(), 2)
-
-    def test_boundaries_of_ceiling_floor(self):
-        """Test to verify ceiling and floor at boundaries."""
-        ts = TreeSet()
-        ts.add(10)
-        ts.add(20)
-        self.assertEqual(ts.ceiling(10), 10)
-        self.assertEqual(ts.floor(20), 20)
-        self.assertEqual(ts.ceiling(5), 10)
-        self.assertEqual(ts.floor(25), 20)
-
-    def test_boundaries_of_higher_lower(self):
-        """Test to verify higher and lower at boundaries."""
-        ts = TreeSet()
-        ts.add(10)
-        ts.add(20)
-        self.assertEqual(ts.higher(10), 20)
-        self.assertIsNone(ts.higher(20))
-        self.assertEqual(ts.lower(20), 10)
-        self.assertIsNone(ts.lower(10))
-
-    def test_mixed_type_handling(self):
-        """Test to verify that set does not accept mixed types after initial type is set."""
-        ts = TreeSet()
-        ts.add(1)
-        with self.assertRaises(TypeError):
-            ts.add("string")
-        ts.clear()
-        ts.add("string")
-        with self.assertRaises(TypeError):
-            ts.add(1)
-
-    def test_large_number_of_elements(self):
-        """Test the performance and correctness with a large number of elements."""
-        ts = TreeSet()
-        num_elements = 1000
-        for i in range(num_elements):
-            ts.add(i)
-        self.assertEqual(ts.size(), num_elements)
-        self.assertEqual(ts.first(), 0)
-        self.assertEqual(ts.last(), num_elements - 1)
-        for i in range(num_elements):
-            self.assertTrue(ts.contains(i))
-        for i in range(num_elements):
-            self.assertTrue(ts.remove(i))
-        self.assertTrue(ts.isEmpty(), f"Set is not empty after removing all elements: {ts.size()} remaining")
-
-if __name__ == '__main__':
-    unittest.main()
+import bisect
+import gc
+import os
+import random
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from ArrayRedBlack import ArrayRedBlackTree
+from ConcurrentTreeSet import ConcurrentTreeSet
+from DurableTreeSet import DurableTreeSet
+from PersistentTreeSet import PersistentTreeSet
+from ShardedTreeSet import ShardedTreeSet
+from RedBlack import InstrumentedRedBlackTree, RedBlackTree
+from TreeMap import TreeMap
+from TreeMultiset import TreeMultiset
+from SortedChunks import SortedChunkList
+from TreeSet import TreeSet
+import stress
+
+class TestTreeSet(unittest.TestCase):
+    def test_add_elements(self):
+        """Test to verify that elements can be added to the set correctly and duplicate verification."""
+        ts = TreeSet()
+        self.assertTrue(ts.add(5))
+        self.assertTrue(ts.add(10))
+        self.assertTrue(ts.add(3))
+        self.assertEqual(ts.size(), 3)
+        self.assertTrue(ts.add(1))
+        self.assertFalse(ts.add(5))
+
+    def test_add_different_types(self):
+        """Test to verify that different types cannot be mixed in the set."""
+        ts = TreeSet()
+        ts.add(10)
+        with self.assertRaises(TypeError):
+            ts.add("test")
+
+    def test_contains(self):
+        """Test to verify if the set contains certain elements."""
+        ts = TreeSet()
+        ts.add(1)
+        ts.add(2)
+        ts.add(3)
+        self.assertTrue(ts.contains(1))
+        self.assertFalse(ts.contains(4))
+
+    def test_remove(self):
+        """Test to verify element removal and that an absent element cannot be removed."""
+        ts = TreeSet()
+        ts.add(1)
+        ts.add(2)
+        ts.add(3)
+        self.assertTrue(ts.remove(2))
+        self.assertFalse(ts.contains(2))
+        self.assertEqual(ts.size(), 2)
+        self.assertFalse(ts.remove(2))
+
+    def test_first_last_elements(self):
+        """Test to verify that the first and last elements of the set can be obtained."""
+        ts = TreeSet()
+        ts.add(3)
+        ts.add(1)
+        ts.add(5)
+        self.assertEqual(ts.first(), 1)
+        self.assertEqual(ts.last(), 5)
+
+    def test_clear_and_empty(self):
+        """Test to verify that the set can be cleared and checked if it is empty."""
+        ts = TreeSet()
+        ts.add(1)
+        ts.add(2)
+        ts.clear()
+        self.assertTrue(ts.isEmpty())
+
+    def test_poll_methods(self):
+        """Test to verify the functionality of pollFirst and pollLast."""
+        ts = TreeSet()
+        ts.add(1)
+        ts.add(2)
+        ts.add(3)
+        self.assertEqual(ts.pollFirst(), 1)
+        self.assertEqual(ts.pollLast(), 3)
+        self.assertEqual(ts.size(), 1)
+
+    def test_iterators(self):
+        """Test to verify that iterators iterate correctly in normal and descending order."""
+        ts = TreeSet()
+        elements = [3, 1, 4, 2]
+        for e in elements:
+            ts.add(e)
+        sorted_elements = sorted(elements)
+        self.assertEqual(list(ts.iterator()), sorted_elements)
+        self.assertEqual(list(ts.descendingIterator()), sorted_elements[::-1])
+
+    def test_ceiling_floor(self):
+        """Test to verify the ceiling and floor operations in the set."""
+        ts = TreeSet()
+        ts.add(5)
+        ts.add(10)
+        ts.add(15)
+        ts.add(20)
+        self.assertEqual(ts.ceiling(12), 15)
+        self.assertEqual(ts.floor(12), 10)
+
+    def test_higher_lower(self):
+        """Test to verify the higher and lower operations in the set."""
+        ts = TreeSet()
+        ts.add(3)
+        ts.add(6)
+        ts.add(9)
+        self.assertEqual(ts.higher(4), 6)
+        self.assertEqual(ts.lower(8), 6)
+
+    def test_type_error_on_empty_remove(self):
+        """Test to verify that an attempt to remove from an empty set is handled correctly."""
+        ts = TreeSet()
+        self.assertFalse(ts.remove(5))
+
+    def test_type_consistency_after_clear(self):
+        """Test to verify that data type consistency is maintained even after clearing the set."""
+        ts = TreeSet()
+        ts.add(10)
+        ts.clear()
+        # This should not raise an error because the set was cleared
+        ts.add("test")
+
+    def test_empty_set_operations(self):
+        """Test to verify operations on an empty set."""
+        ts = TreeSet()
+        self.assertTrue(ts.isEmpty())
+        self.assertEqual(ts.size(), 0)
+        self.assertIsNone(ts.first())
+        self.assertIsNone(ts.last())
+        self.assertIsNone(ts.pollFirst())
+        self.assertIsNone(ts.pollLast())
+
+    def test_duplicates_handling(self):
+        """Test to verify that duplicates are not added to the set."""
+        ts = TreeSet()
+        ts.add(1)
+        ts.add(1)
+        self.assertEqual(ts.size(), 1)
+        ts.add(2)
+        ts.add(2)
+        self.assertEqual(ts.size(), 2)
+
+    def test_boundaries_of_ceiling_floor(self):
+        """Test to verify ceiling and floor at boundaries."""
+        ts = TreeSet()
+        ts.add(10)
+        ts.add(20)
+        self.assertEqual(ts.ceiling(10), 10)
+        self.assertEqual(ts.floor(20), 20)
+        self.assertEqual(ts.ceiling(5), 10)
+        self.assertEqual(ts.floor(25), 20)
+
+    def test_boundaries_of_higher_lower(self):
+        """Test to verify higher and lower at boundaries."""
+        ts = TreeSet()
+        ts.add(10)
+        ts.add(20)
+        self.assertEqual(ts.higher(10), 20)
+        self.assertIsNone(ts.higher(20))
+        self.assertEqual(ts.lower(20), 10)
+        self.assertIsNone(ts.lower(10))
+
+    def test_mixed_type_handling(self):
+        """Test to verify that set does not accept mixed types after initial type is set."""
+        ts = TreeSet()
+        ts.add(1)
+        with self.assertRaises(TypeError):
+            ts.add("string")
+        ts.clear()
+        ts.add("string")
+        with self.assertRaises(TypeError):
+            ts.add(1)
+
+    def test_large_number_of_elements(self):
+        """Test the performance and correctness with a large number of elements."""
+        ts = TreeSet()
+        num_elements = 1000
+        for i in range(num_elements):
+            ts.add(i)
+        self.assertEqual(ts.size(), num_elements)
+        self.assertEqual(ts.first(), 0)
+        self.assertEqual(ts.last(), num_elements - 1)
+        for i in range(num_elements):
+            self.assertTrue(ts.contains(i))
+        for i in range(num_elements):
+            self.assertTrue(ts.remove(i))
+        self.assertTrue(ts.isEmpty(), f"Set is not empty after removing all elements: {ts.size()} remaining")
+
+    def test_remove_keeps_order(self):
+        """Test to verify that removals leave exactly the remaining elements in order."""
+        ts = TreeSet()
+        for i in range(200):
+            ts.add((i * 37) % 200)
+        for i in range(0, 200, 3):
+            self.assertTrue(ts.remove(i))
+        expected = [i for i in range(200) if i % 3 != 0]
+        self.assertEqual(list(ts.iterator()), expected)
+        self.assertEqual(ts.size(), len(expected))
+
+    def test_get_rank_index_of(self):
+        """Test to verify positional access and ranks, including after removals."""
+        ts = TreeSet()
+        for i in range(0, 100, 2):
+            ts.add(i)
+        self.assertEqual(ts.get(0), 0)
+        self.assertEqual(ts.get(10), 20)
+        self.assertIsNone(ts.get(50))
+        self.assertIsNone(ts.get(-1))
+        self.assertEqual(ts.indexOf(20), 10)
+        self.assertEqual(ts.indexOf(21), -1)
+        self.assertEqual(ts.rank(21), 11)
+        self.assertEqual(ts.rank(-5), 0)
+        self.assertEqual(ts.rank(1000), 50)
+        for i in range(0, 50, 2):
+            ts.remove(i)
+        remaining = list(ts.iterator())
+        for index, value in enumerate(remaining):
+            self.assertEqual(ts.get(index), value)
+            self.assertEqual(ts.indexOf(value), index)
+
+    def test_engine_selection(self):
+        """Test to verify that numeric sets use the array-backed engine and other types the linked tree."""
+        ints = TreeSet()
+        ints.add(1)
+        self.assertIsInstance(ints.tree, ArrayRedBlackTree)
+        floats = TreeSet()
+        floats.addAll([2.5, 0.5, 1.5])
+        self.assertIsInstance(floats.tree, ArrayRedBlackTree)
+        self.assertEqual(list(floats.iterator()), [0.5, 1.5, 2.5])
+        strings = TreeSet()
+        strings.add("a")
+        self.assertIsInstance(strings.tree, RedBlackTree)
+        strings.clear()
+        strings.add(3)
+        self.assertIsInstance(strings.tree, ArrayRedBlackTree)
+
+    def test_large_int_falls_back_to_linked_tree(self):
+        """Test to verify that ints beyond 64 bits move the set to the linked tree without losing elements."""
+        ts = TreeSet()
+        ts.addAll([3, 1, 2])
+        self.assertTrue(ts.add(2 ** 70))
+        self.assertIsInstance(ts.tree, RedBlackTree)
+        self.assertEqual(list(ts.iterator()), [1, 2, 3, 2 ** 70])
+
+    def test_engines_match_sorted_list(self):
+        """Test to verify both engines against a sorted list under random insertions and removals."""
+        rng = random.Random(7)
+        for make in (lambda: TreeSet(), lambda: _linked_set()):
+            ts = make()
+            expected = set()
+            for _ in range(3000):
+                value = rng.randrange(500)
+                if rng.random() < 0.6:
+                    self.assertEqual(ts.add(value), value not in expected)
+                    expected.add(value)
+                else:
+                    self.assertEqual(ts.remove(value), value in expected)
+                    expected.discard(value)
+            ordered = sorted(expected)
+            self.assertEqual(list(ts.iterator()), ordered)
+            self.assertEqual(list(ts.descendingIterator()), ordered[::-1])
+            self.assertEqual(ts.size(), len(ordered))
+            for probe in range(-1, 502, 7):
+                index = bisect.bisect_left(ordered, probe)
+                self.assertEqual(ts.rank(probe), index)
+                self.assertEqual(ts.ceiling(probe), ordered[index] if index < len(ordered) else None)
+                self.assertEqual(ts.lower(probe), ordered[index - 1] if index > 0 else None)
+                index = bisect.bisect_right(ordered, probe)
+                self.assertEqual(ts.higher(probe), ordered[index] if index < len(ordered) else None)
+                self.assertEqual(ts.floor(probe), ordered[index - 1] if index > 0 else None)
+            self.assertEqual(ts.pollFirst(), ordered[0])
+            self.assertEqual(ts.pollLast(), ordered[-1])
+
+    def test_from_sorted(self):
+        """Test to verify building a set from sorted input, including duplicates and unsorted input."""
+        ts = TreeSet.fromSorted([1, 2, 2, 3, 5, 8])
+        self.assertEqual(list(ts.iterator()), [1, 2, 3, 5, 8])
+        self.assertEqual(ts.size(), 5)
+        self.assertEqual(ts.get(3), 5)
+        self.assertTrue(ts.add(4))
+        self.assertTrue(ts.remove(2))
+        self.assertEqual(list(ts.iterator()), [1, 3, 4, 5, 8])
+        words = TreeSet.fromSorted(["apple", "kiwi", "pear"])
+        self.assertIsInstance(words.tree, RedBlackTree)
+        self.assertEqual(words.ceiling("banana"), "kiwi")
+        self.assertTrue(TreeSet.fromSorted([]).isEmpty())
+        with self.assertRaises(ValueError):
+            TreeSet.fromSorted([3, 1, 2])
+        with self.assertRaises(TypeError):
+            TreeSet.fromSorted([1, "a"])
+
+    def test_add_all_bulk_paths(self):
+        """Test to verify addAll when it rebuilds the tree and when it inserts one by one."""
+        ts = TreeSet()
+        ts.addAll([5, 3, 9, 3, 1])
+        self.assertEqual(list(ts.iterator()), [1, 3, 5, 9])
+        ts.addAll(range(4, 12))
+        self.assertEqual(list(ts.iterator()), [1, 3, 4, 5, 6, 7, 8, 9, 10, 11])
+        big = TreeSet.fromSorted(range(0, 2000, 2))
+        big.addAll([7, 3])
+        self.assertEqual(big.size(), 1002)
+        self.assertEqual(big.get(2), 3)
+        with self.assertRaises(TypeError):
+            big.addAll([1, "a"])
+        self.assertEqual(big.size(), 1002)
+
+    def test_single_descent_write_results(self):
+        """Test to verify the results reported by the tree's own add, remove and poll methods."""
+        tree = RedBlackTree()
+        self.assertTrue(tree.add("m"))
+        self.assertTrue(tree.add("c"))
+        self.assertTrue(tree.add("x"))
+        self.assertFalse(tree.add("c"))
+        self.assertEqual(tree.length(), 3)
+        self.assertFalse(tree.remove("q"))
+        self.assertTrue(tree.remove("m"))
+        self.assertEqual(tree.pollLast(), "x")
+        self.assertEqual(tree.pollFirst(), "c")
+        self.assertIsNone(tree.pollFirst())
+        self.assertEqual(tree.length(), 0)
+
+    def test_range_views(self):
+        """Test to verify subSet, headSet and tailSet views against slices of a sorted list on both engines."""
+        for make in (lambda: TreeSet(), lambda: _linked_set()):
+            ts = make()
+            ts.addAll(range(0, 100, 3))
+            ordered = list(range(0, 100, 3))
+            for lo_inclusive in (True, False):
+                for hi_inclusive in (True, False):
+                    view = ts.subSet(9, 30, lo_inclusive, hi_inclusive)
+                    expected = [v for v in ordered
+                                if (v > 9 or (lo_inclusive and v == 9)) and (v < 30 or (hi_inclusive and v == 30))]
+                    self.assertEqual(list(view.iterator()), expected)
+                    self.assertEqual(list(view.descendingIterator()), expected[::-1])
+                    self.assertEqual(view.size(), len(expected))
+                    self.assertEqual(view.first(), expected[0])
+                    self.assertEqual(view.last(), expected[-1])
+            view = ts.subSet(10, 40)
+            self.assertEqual(view.ceiling(0), 12)
+            self.assertIsNone(view.ceiling(40))
+            self.assertEqual(view.floor(100), 39)
+            self.assertEqual(view.higher(12), 15)
+            self.assertEqual(view.lower(12), None)
+            self.assertFalse(view.contains(9))
+            self.assertTrue(view.contains(39))
+            self.assertEqual(list(ts.headSet(9).iterator()), [0, 3, 6])
+            self.assertEqual(list(ts.headSet(9, True).iterator()), [0, 3, 6, 9])
+            self.assertEqual(list(ts.tailSet(90).iterator()), [90, 93, 96, 99])
+            self.assertEqual(ts.tailSet(90, False).size(), 3)
+            self.assertEqual(list(view.tailSet(30).iterator()), [30, 33, 36, 39])
+            with self.assertRaises(ValueError):
+                view.headSet(50)
+            with self.assertRaises(ValueError):
+                ts.subSet(5, 1)
+            ts.add(11)
+            self.assertEqual(view.size(), 11)
+            with self.assertRaises(ValueError):
+                view.add(50)
+            self.assertTrue(view.remove(11))
+            self.assertFalse(view.remove(3))
+            self.assertTrue(ts.subSet(200, 300).isEmpty())
+            self.assertEqual(ts.subSet(200, 300).size(), 0)
+
+    def test_set_algebra(self):
+        """Test to verify union, intersection, difference and symmetric difference on small and large operands."""
+        rng = random.Random(11)
+        for size_a, size_b in ((300, 300), (2000, 5), (5, 2000), (0, 40)):
+            a_values = set(rng.sample(range(5000), size_a))
+            b_values = set(rng.sample(range(5000), size_b))
+            a = TreeSet()
+            a.addAll(a_values)
+            b = TreeSet.fromSorted(sorted(b_values))
+            for other in (b, list(b_values)):
+                self.assertEqual(list(a.union(other).iterator()), sorted(a_values | b_values))
+                self.assertEqual(list(a.intersection(other).iterator()), sorted(a_values & b_values))
+                self.assertEqual(list(a.difference(other).iterator()), sorted(a_values - b_values))
+                self.assertEqual(list(a.symmetricDifference(other).iterator()), sorted(a_values ^ b_values))
+                self.assertEqual(a.containsAll(other), b_values <= a_values)
+            for method, expected in (("retainAll", a_values & b_values), ("removeAll", a_values - b_values),
+                                     ("symmetricDifferenceUpdate", a_values ^ b_values), ("addAll", a_values | b_values)):
+                copy = TreeSet()
+                copy.addAll(a_values)
+                getattr(copy, method)(b)
+                self.assertEqual(list(copy.iterator()), sorted(expected))
+                self.assertEqual(copy.size(), len(expected))
+
+    def test_set_algebra_results(self):
+        """Test to verify the change flags of the in-place operations and type checks between sets."""
+        ts = TreeSet.fromSorted([1, 2, 3, 4])
+        self.assertFalse(ts.retainAll([1, 2, 3, 4, 5]))
+        self.assertTrue(ts.retainAll([2, 3, 9]))
+        self.assertFalse(ts.removeAll([7]))
+        self.assertTrue(ts.removeAll(TreeSet.fromSorted([3])))
+        self.assertEqual(list(ts.iterator()), [2])
+        self.assertTrue(ts.containsAll(ts.subSet(0, 10)))
+        self.assertTrue(ts.removeAll([2]))
+        self.assertTrue(ts.isEmpty())
+        with self.assertRaises(TypeError):
+            TreeSet.fromSorted([1, 2]).union(TreeSet.fromSorted(["a"]))
+        words = TreeSet.fromSorted(["a", "c"]).union(["b"])
+        self.assertIsInstance(words.tree, RedBlackTree)
+        self.assertEqual(list(words.iterator()), ["a", "b", "c"])
+
+    def test_batched_lookups(self):
+        """Test to verify containsMany, ceilingMany and floorMany against bisect on both engines."""
+        rng = random.Random(5)
+        ordered = sorted(rng.sample(range(10000), 700))
+        probes = [rng.randrange(-50, 10050) for _ in range(900)] + ordered[:50] + [ordered[0], ordered[-1]]
+        rng.shuffle(probes)
+        for make in (lambda: TreeSet(), lambda: _linked_set()):
+            ts = make()
+            ts.addAll(ordered)
+            contained = ts.containsMany(probes)
+            ceilings = ts.ceilingMany(probes)
+            floors = ts.floorMany(probes)
+            for probe, is_in, ceiling, floor in zip(probes, contained, ceilings, floors):
+                index = bisect.bisect_left(ordered, probe)
+                self.assertEqual(is_in, index < len(ordered) and ordered[index] == probe)
+                self.assertEqual(ceiling, ordered[index] if index < len(ordered) else None)
+                index = bisect.bisect_right(ordered, probe)
+                self.assertEqual(floor, ordered[index - 1] if index > 0 else None)
+        empty = TreeSet()
+        self.assertEqual(empty.containsMany([1, 2]), [False, False])
+        self.assertEqual(empty.ceilingMany([]), [])
+
+    def test_clone(self):
+        """Test to verify that a clone has the same elements and shape and is independent of the original."""
+        for make in (lambda: TreeSet(), lambda: _linked_set()):
+            ts = make()
+            ts.addAll(range(0, 60, 3))
+            ts.remove(30)
+            copy = ts.clone()
+            self.assertIsNot(copy.tree, ts.tree)
+            self.assertEqual(list(copy.iterator()), list(ts.iterator()))
+            self.assertEqual(copy.get(5), ts.get(5))
+            copy.add(1)
+            ts.remove(0)
+            self.assertEqual(copy.first(), 0)
+            self.assertEqual(ts.first(), 3)
+            self.assertFalse(ts.contains(1))
+            self.assertEqual(copy.size(), ts.size() + 2)
+        self.assertTrue(TreeSet().clone().isEmpty())
+
+    def test_copy_on_write_clone(self):
+        """Test to verify that copy-on-write clones share the tree until one side modifies it."""
+        ts = TreeSet.fromSorted(["a", "b", "c"])
+        first = ts.clone(copyOnWrite=True)
+        second = ts.clone(copyOnWrite=True)
+        self.assertIs(first.tree, ts.tree)
+        self.assertIs(second.tree, ts.tree)
+        first.add("d")
+        self.assertIsNot(first.tree, ts.tree)
+        self.assertEqual(list(ts.iterator()), ["a", "b", "c"])
+        ts.remove("a")
+        self.assertEqual(list(second.iterator()), ["a", "b", "c"])
+        self.assertEqual(list(ts.iterator()), ["b", "c"])
+        tree = second.tree
+        second.pollFirst()
+        self.assertIs(second.tree, tree)
+        self.assertEqual(list(first.iterator()), ["a", "b", "c", "d"])
+        third = first.clone(copyOnWrite=True)
+        third.clear()
+        self.assertTrue(third.isEmpty())
+        self.assertEqual(first.size(), 4)
+
+    def test_dropped_copy_on_write_clones(self):
+        """Test to verify that a garbage-collected copy-on-write clone or snapshot no longer makes the original copy its tree."""
+        ts = TreeSet.fromSorted(["a", "b", "c"])
+        clone = ts.clone(copyOnWrite=True)
+        del clone
+        gc.collect()
+        tree = ts.tree
+        ts.add("d")
+        self.assertIs(ts.tree, tree)
+        cts = ConcurrentTreeSet()
+        cts.addAll(["a", "b", "c"])
+        snapshot = cts.snapshot()
+        cts.add("d")
+        self.assertEqual(list(snapshot.iterator()), ["a", "b", "c"])
+        del snapshot
+        gc.collect()
+        tree = cts._set.tree
+        cts.add("e")
+        self.assertIs(cts._set.tree, tree)
+
+    def test_key_intersection_keeps_stored_elements(self):
+        """Test to verify that intersection and retainAll keep this set's elements, not equal-keyed ones of the other collection."""
+        stored = ["Apple{}".format(i) for i in range(200)]
+        for probes in (["APPLE5"], ["APPLE{}".format(i) for i in range(0, 400, 2)]):
+            ts = TreeSet(key=str.lower)
+            ts.addAll(stored)
+            expected = sorted((value for value in stored if value.upper() in probes), key=str.lower)
+            self.assertEqual(list(ts.intersection(probes).iterator()), expected)
+            self.assertTrue(ts.retainAll(probes))
+            self.assertEqual(list(ts.iterator()), expected)
+        numbers = TreeSet()
+        numbers.addAll(range(1000))
+        self.assertEqual(list(numbers.intersection([5, 2000]).iterator()), [5])
+
+    def test_key_function(self):
+        """Test to verify ordering by a key function or comparator, with keys cached in the nodes."""
+        calls = []
+
+        def key(record):
+            calls.append(record)
+            return record["ts"], record["id"]
+
+        ts = TreeSet(key=key)
+        records = [{"ts": t, "id": i} for t, i in [(3, 1), (1, 2), (3, 0), (2, 5)]]
+        for record in records:
+            self.assertTrue(ts.add(record))
+        self.assertFalse(ts.add({"ts": 1, "id": 2}))
+        self.assertEqual([(r["ts"], r["id"]) for r in ts.iterator()], [(1, 2), (2, 5), (3, 0), (3, 1)])
+        self.assertIsInstance(ts.tree, RedBlackTree)
+        calls.clear()
+        self.assertEqual(ts.ceiling({"ts": 2, "id": 9}), {"ts": 3, "id": 0})
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(ts.rank({"ts": 3, "id": 0}), 2)
+        self.assertEqual(ts.containsMany([{"ts": 2, "id": 5}, {"ts": 2, "id": 6}]), [True, False])
+        self.assertTrue(ts.remove({"ts": 3, "id": 0}))
+        view = ts.headSet({"ts": 3, "id": 0})
+        self.assertEqual(view.size(), 2)
+        union = ts.union([{"ts": 0, "id": 0}, {"ts": 1, "id": 2}])
+        self.assertEqual([(r["ts"], r["id"]) for r in union.iterator()], [(0, 0), (1, 2), (2, 5), (3, 1)])
+        self.assertEqual(ts.difference(union).size(), 0)
+
+        folded = TreeSet(key=str.casefold)
+        folded.addAll(["b", "A", "a", "C"])
+        self.assertEqual(list(folded.iterator()), ["A", "b", "C"])
+        self.assertTrue(folded.contains("c"))
+        descending = TreeSet(comparator=lambda x, y: y - x)
+        descending.addAll([1, 5, 3])
+        self.assertEqual(list(descending.iterator()), [5, 3, 1])
+        self.assertEqual(descending.ceiling(4), 3)
+        with self.assertRaises(ValueError):
+            TreeSet(key=abs, comparator=lambda x, y: x - y)
+
+    def test_dump_and_load(self):
+        """Test to verify that dumped sets load back, in memory and memory-mapped, for every datatype."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "set.bin")
+            for values in ([5, -3, 2 ** 40, 0], [2.5, -1.0, 7.25], ["pear", "apple", "fig"], [2 ** 70, -2 ** 70, 1]):
+                ts = TreeSet()
+                ts.addAll(values)
+                ts.dump(path)
+                ordered = sorted(values)
+                loaded = TreeSet.load(path)
+                self.assertEqual(list(loaded.iterator()), ordered)
+                with self.assertRaises(TypeError):
+                    loaded.add(object())
+                with TreeSet.load(path, mapped=True) as mapped:
+                    self.assertEqual(mapped.size(), len(ordered))
+                    self.assertTrue(mapped.contains(ordered[1]))
+                    self.assertEqual(mapped.ceiling(ordered[1]), ordered[1])
+                    self.assertEqual(mapped.floor(ordered[1]), ordered[1])
+                    self.assertEqual(mapped.higher(ordered[1]), ordered[2])
+                    self.assertEqual(mapped.lower(ordered[1]), ordered[0])
+                    self.assertIsNone(mapped.ceiling(ordered[-1] + ordered[-1]))
+                    self.assertEqual(list(mapped.iterator()), ordered)
+            TreeSet().dump(path)
+            self.assertTrue(TreeSet.load(path).isEmpty())
+            with open(path, "wb") as file:
+                file.write(b"not a set")
+            with self.assertRaises(ValueError):
+                TreeSet.load(path)
+
+    def test_chunked_backend(self):
+        """Test to verify that the chunked backend answers like the red-black one, across chunk splits and merges."""
+        rng = random.Random(13)
+        for key in (None, lambda value: -value):
+            chunked = TreeSet(key=key, backend="chunked")
+            chunked.tree = SortedChunkList(chunked._key, load=4)
+            reference = TreeSet(key=key)
+            for _ in range(3000):
+                value = rng.randrange(200)
+                choice = rng.random()
+                if choice < 0.5:
+                    self.assertEqual(chunked.add(value), reference.add(value))
+                elif choice < 0.9:
+                    self.assertEqual(chunked.remove(value), reference.remove(value))
+                else:
+                    self.assertEqual(chunked.pollFirst(), reference.pollFirst())
+            self.assertEqual(list(chunked.iterator()), list(reference.iterator()))
+            self.assertEqual(list(chunked.descendingIterator()), list(reference.descendingIterator()))
+            for probe in range(-1, 202, 3):
+                for method in ("ceiling", "floor", "higher", "lower", "contains", "rank", "indexOf"):
+                    self.assertEqual(getattr(chunked, method)(probe), getattr(reference, method)(probe))
+            self.assertEqual([chunked.get(i) for i in range(chunked.size())], list(reference.iterator()))
+            self.assertEqual(chunked.floorMany([5, 50, 500]), reference.floorMany([5, 50, 500]))
+            bounds = sorted((20, 120), key=chunked._order_key)
+            self.assertEqual(list(chunked.subSet(*bounds).iterator()), list(reference.subSet(*bounds).iterator()))
+            self.assertEqual(list(chunked.subSet(*bounds).descendingIterator()),
+                             list(reference.subSet(*bounds).descendingIterator()))
+            self.assertEqual(list(chunked.union(range(300)).iterator()), list(reference.union(range(300)).iterator()))
+        with self.assertRaises(ValueError):
+            TreeSet(backend="btree")
+
+    def test_cursor(self):
+        """Test to verify cursor movement, removal at the cursor and invalidation by other changes."""
+        for values in ([3, 9, 1, 7, 5], ["c", "i", "a", "g", "e"]):
+            tree_set = TreeSet()
+            tree_set.addAll(values)
+            ordered = sorted(values)
+            cursor = tree_set.seek(ordered[1])
+            self.assertEqual(cursor.value, ordered[1])
+            self.assertEqual([cursor.next() for _ in range(5)], ordered[2:] + [None, None])
+            self.assertEqual(cursor.prev(), ordered[-1])
+            cursor = tree_set.seek(ordered[0])
+            self.assertEqual(cursor.prev(), None)
+            self.assertEqual(cursor.next(), ordered[0])
+            self.assertEqual(cursor.next(), ordered[1])
+            self.assertEqual(cursor.remove(), ordered[1])
+            self.assertEqual(cursor.value, ordered[2])
+            self.assertEqual(list(tree_set.iterator()), ordered[:1] + ordered[2:])
+            snapshot = tree_set.clone(copyOnWrite=True)
+            self.assertEqual(cursor.remove(), ordered[2])
+            self.assertEqual(cursor.value, ordered[3])
+            self.assertTrue(snapshot.contains(ordered[2]))
+            tree_set.remove(ordered[0])
+            with self.assertRaises(RuntimeError):
+                cursor.next()
+        self.assertIsNone(TreeSet().seek(1).value)
+        with self.assertRaises(ValueError):
+            TreeSet().seek(1).remove()
+
+    def test_count_and_sum_range(self):
+        """Test to verify countRange and sumRange, from subtree sums or by scanning, against a sorted list."""
+        rng = random.Random(9)
+        for track_sums in (False, True):
+            tree_set = TreeSet(trackSums=track_sums)
+            expected = []
+            for _ in range(2000):
+                value = rng.randrange(400)
+                if rng.random() < 0.6:
+                    if tree_set.add(value):
+                        bisect.insort(expected, value)
+                elif tree_set.remove(value):
+                    expected.remove(value)
+            for _ in range(100):
+                lo, hi = rng.choice((None, rng.randrange(-5, 405))), rng.choice((None, rng.randrange(-5, 405)))
+                lo_inclusive, hi_inclusive = rng.random() < 0.5, rng.random() < 0.5
+                inside = [v for v in expected
+                          if (lo is None or v > lo or (lo_inclusive and v == lo))
+                          and (hi is None or v < hi or (hi_inclusive and v == hi))]
+                self.assertEqual(tree_set.countRange(lo, hi, lo_inclusive, hi_inclusive), len(inside))
+                self.assertEqual(tree_set.sumRange(lo, hi, lo_inclusive, hi_inclusive), sum(inside))
+            copy = tree_set.clone()
+            copy.addAll([1000, 2000])
+            self.assertEqual(copy.sumRange(0, 5000), sum(expected) + 3000)
+            self.assertEqual(tree_set.sumRange(0, 5000), sum(expected))
+
+    def test_sums_reject_non_numbers(self):
+        """Test to verify that a set tracking sums rejects non-numeric elements and is left intact."""
+        for key in (None, str):
+            tree_set = TreeSet(key=key, trackSums=True)
+            tree_set.addAll([1, 2, 3])
+            rejected = ("a", ["abcd"], TreeSet.fromSorted(["ab", "abcd"]))
+            with self.assertRaises(TypeError):
+                tree_set.add(rejected[0])
+            with self.assertRaises(TypeError):
+                tree_set.addAll(rejected[1])
+            with self.assertRaises(TypeError):
+                tree_set.union(rejected[2])
+            with self.assertRaises(TypeError):
+                tree_set.symmetricDifferenceUpdate(rejected[1])
+            self.assertEqual(tree_set.size(), 3)
+            tree_set.tree.validate()
+        tree_set = TreeSet(trackSums=True)
+        with self.assertRaises(TypeError):
+            tree_set.add("a")
+        self.assertTrue(tree_set.isEmpty())
+        tree_set.addAll([1.5, 2.5])
+        self.assertEqual(tree_set.sumRange(2, None), 2.5)
+
+    def test_freeze_and_thaw(self):
+        """Test to verify that a frozen set answers like the set it was frozen from, and thaws back to a mutable one."""
+        rng = random.Random(21)
+        even = lambda: [rng.randrange(0, 1000, 2) for _ in range(300)]
+        any_int = lambda: rng.randrange(-50, 1050)
+        # Each case draws probes that are mostly absent, and adds probes beyond either end of the set.
+        for values, key, draw, ends in ((even(), None, any_int, (-1, 10 ** 6)),
+                                        ([rng.random() for _ in range(300)], None, rng.random, (-1.0, 2.0)),
+                                        (["%03d" % rng.randrange(1000) for _ in range(300)], None,
+                                         lambda: "%04d" % rng.randrange(10000), ("", "~")),
+                                        (even(), lambda value: -value, any_int, (-1, 10 ** 6))):
+            tree_set = TreeSet(key=key)
+            tree_set.addAll(values)
+            frozen = tree_set.freeze()
+            probes = values[:50] + [draw() for _ in range(50)] + list(ends)
+            self.assertIn(False, tree_set.containsMany(probes))
+            for probe in probes:
+                for method in ("ceiling", "floor", "higher", "lower", "contains", "rank", "indexOf"):
+                    self.assertEqual(getattr(frozen, method)(probe), getattr(tree_set, method)(probe))
+            self.assertEqual(frozen.containsMany(probes), tree_set.containsMany(probes))
+            self.assertEqual(frozen.floorMany(probes), tree_set.floorMany(probes))
+            self.assertEqual(frozen.ceilingMany(probes), tree_set.ceilingMany(probes))
+            self.assertEqual(list(frozen.iterator()), list(tree_set.iterator()))
+            self.assertEqual([frozen.get(i) for i in range(frozen.size())], list(tree_set.iterator()))
+            thawed = frozen.thaw()
+            self.assertEqual(list(thawed.iterator()), list(tree_set.iterator()))
+            thawed.pollFirst()
+            self.assertEqual(frozen.size(), tree_set.size())
+        self.assertIsNone(TreeSet().freeze().first())
+        self.assertTrue(TreeSet().freeze().thaw().isEmpty())
+
+
+class TestPersistentTreeSet(unittest.TestCase):
+    def test_matches_sorted_list(self):
+        """Test to verify the persistent set against a sorted list under random changes."""
+        rng = random.Random(3)
+        ps = PersistentTreeSet()
+        expected = set()
+        for _ in range(3000):
+            value = rng.randrange(400)
+            if rng.random() < 0.55:
+                self.assertEqual(ps.add(value), value not in expected)
+                expected.add(value)
+            else:
+                self.assertEqual(ps.remove(value), value in expected)
+                expected.discard(value)
+        ordered = sorted(expected)
+        self.assertEqual(list(ps.iterator()), ordered)
+        self.assertEqual(list(ps.descendingIterator()), ordered[::-1])
+        self.assertEqual(ps.size(), len(ordered))
+        self.assertEqual(ps.get(10), ordered[10])
+        self.assertEqual(ps.rank(ordered[10]), 10)
+        self.assertEqual(ps.ceiling(ordered[3] + 1), ordered[4])
+        self.assertEqual(ps.floor(ordered[4] - 1), ordered[3])
+        self.assertEqual(ps.pollFirst(), ordered[0])
+        self.assertEqual(ps.pollLast(), ordered[-1])
+
+    def test_snapshots_are_stable(self):
+        """Test to verify that a snapshot keeps its elements while the set changes, even mid-iteration."""
+        ps = PersistentTreeSet()
+        ps.addAll(range(10))
+        snapshot = ps.snapshot()
+        iterator = snapshot.iterator()
+        self.assertEqual(next(iterator), 0)
+        ps.remove(1)
+        ps.add(100)
+        ps.clear()
+        self.assertEqual(list(iterator), list(range(1, 10)))
+        self.assertEqual(snapshot.size(), 10)
+        self.assertTrue(snapshot.contains(5))
+        self.assertTrue(ps.isEmpty())
+        ps.add("a")
+        with self.assertRaises(TypeError):
+            ps.add(1)
+
+
+class TestConcurrentTreeSet(unittest.TestCase):
+    def test_operations(self):
+        """Test to verify the wrapper's results and that errors reach the calling thread."""
+        cs = ConcurrentTreeSet()
+        self.assertTrue(cs.add(5))
+        self.assertFalse(cs.add(5))
+        cs.addAll([1, 9, 3])
+        self.assertEqual(list(cs.iterator()), [1, 3, 5, 9])
+        self.assertEqual(list(cs.descendingIterator()), [9, 5, 3, 1])
+        self.assertEqual((cs.ceiling(4), cs.floor(4), cs.higher(5), cs.lower(5)), (5, 3, 9, 3))
+        self.assertEqual(cs.containsMany([1, 2]), [True, False])
+        snapshot = cs.snapshot()
+        self.assertEqual((cs.pollFirst(), cs.pollLast()), (1, 9))
+        self.assertTrue(cs.remove(3))
+        self.assertEqual(list(snapshot.iterator()), [1, 3, 5, 9])
+        with self.assertRaises(TypeError):
+            cs.add("a")
+        self.assertEqual(cs.size(), 1)
+
+    def test_concurrent_writers_and_readers(self):
+        """Test to verify that writes from many threads are all applied while readers run."""
+        cs = ConcurrentTreeSet()
+        errors = []
+
+        def writer(offset):
+            for value in range(offset, 2000, 4):
+                cs.add(value)
+            for value in range(offset, 2000, 8):
+                cs.remove(value)
+
+        def reader():
+            for _ in range(200):
+                values = list(cs.iterator())
+                if values != sorted(values):
+                    errors.append(values)
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(4)]
+        threads += [threading.Thread(target=reader) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(list(cs.iterator()), [v for v in range(2000) if v % 8 >= 4])
+
+    def test_snapshots_modified_by_other_threads(self):
+        """Test to verify that snapshots modified in their own threads stay apart from the set and from each other."""
+        cs = ConcurrentTreeSet()
+        cs.addAll(range(0, 4000, 2))
+        errors = []
+
+        def writer():
+            for value in range(1, 4000, 2):
+                cs.add(value)
+                cs.remove(value - 1)
+
+        def reader(marker):
+            for _ in range(50):
+                snapshot = cs.snapshot()
+                before = list(snapshot.iterator())
+                snapshot.add(marker)
+                snapshot.pollLast()
+                if list(snapshot.iterator()) != [marker] + before[:-1]:
+                    errors.append(marker)
+
+        threads = [threading.Thread(target=writer)]
+        threads += [threading.Thread(target=reader, args=(-1 - i,)) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(list(cs.iterator()), list(range(1, 4000, 2)))
+
+
+class TestShardedTreeSet(unittest.TestCase):
+    def test_two_shards_rebalance(self):
+        """Test to verify that two shards rebalance with the default skew instead of leaving every element in the first."""
+        with ShardedTreeSet(shards=2) as ss:
+            ss.addAll(range(21000))
+            self.assertEqual(len(ss._splits), 1)
+            self.assertLessEqual(max(ss._sizes), 3 * 21000 / 4)
+            self.assertEqual(list(ss.iterator()), list(range(21000)))
+
+    def test_matches_sorted_list(self):
+        """Test to verify routing, merged ordered queries and rebalancing against a sorted list."""
+        rng = random.Random(5)
+        expected = set()
+        with ShardedTreeSet(shards=3, rebalance_minimum=50) as ss:
+            for _ in range(1500):
+                value = rng.randrange(1000)
+                if rng.random() < 0.6:
+                    self.assertEqual(ss.add(value), value not in expected)
+                    expected.add(value)
+                else:
+                    self.assertEqual(ss.remove(value), value in expected)
+                    expected.discard(value)
+            batch = [rng.randrange(2000) for _ in range(300)]
+            ss.addAll(batch)
+            expected.update(batch)
+            ordered = sorted(expected)
+            self.assertEqual(len(ss._splits), 2)
+            self.assertLessEqual(max(ss._sizes), 2 * len(ordered) / 3)
+            self.assertEqual(list(ss.iterator()), ordered)
+            self.assertEqual(list(ss.descendingIterator()), ordered[::-1])
+            for value in range(-1, 2002, 7):
+                i = bisect.bisect_left(ordered, value)
+                j = bisect.bisect_right(ordered, value)
+                self.assertEqual(ss.ceiling(value), ordered[i] if i < len(ordered) else None)
+                self.assertEqual(ss.higher(value), ordered[j] if j < len(ordered) else None)
+                self.assertEqual(ss.floor(value), ordered[j - 1] if j else None)
+                self.assertEqual(ss.lower(value), ordered[i - 1] if i else None)
+                self.assertEqual(ss.rank(value), i)
+            self.assertEqual(ss.get(len(ordered) // 2), ordered[len(ordered) // 2])
+            self.assertEqual(ss.containsMany([ordered[0], -1]), [True, False])
+            self.assertEqual((ss.pollFirst(), ss.pollLast()), (ordered[0], ordered[-1]))
+            self.assertEqual(ss.size(), len(ordered) - 2)
+            with self.assertRaises(TypeError):
+                ss.add("a")
+
+
+class TestDurableTreeSet(unittest.TestCase):
+    def test_recovery(self):
+        """Test to verify that changes survive reopening, across checkpoints and a torn log tail."""
+        for batching in (True, False):
+            with tempfile.TemporaryDirectory() as directory:
+                with DurableTreeSet(directory, fsync_batching=batching) as ds:
+                    ds.addAll([5, 1, 9, 3])
+                    self.assertTrue(ds.remove(3))
+                    self.assertEqual(ds.pollFirst(), 1)
+                    ds.checkpoint()
+                    ds.add(7)
+                    self.assertEqual(ds.pollLast(), 9)
+                with DurableTreeSet(directory, fsync_batching=batching) as ds:
+                    self.assertEqual(list(ds.iterator()), [5, 7])
+                    ds.clear()
+                    ds.add(2)
+                segment = max(name for name in os.listdir(directory) if name.endswith(".log"))
+                with open(os.path.join(directory, segment), "ab") as file:
+                    file.write(b"a\x05\x00\x00")
+                with DurableTreeSet(directory) as ds:
+                    self.assertEqual(list(ds.iterator()), [2])
+                    with self.assertRaises(TypeError):
+                        ds.add("a")
+                self.assertEqual(sum(name.startswith("snapshot.") for name in os.listdir(directory)), 1)
+
+    def test_checkpoint_of_tuples_and_failures(self):
+        """Test to verify tuple snapshots, and that a failed checkpoint leaves one segment and is reported by close."""
+        records = [(timestamp, "id{}".format(timestamp % 7)) for timestamp in range(100)]
+        with tempfile.TemporaryDirectory() as directory:
+            with DurableTreeSet(directory) as ds:
+                ds.addAll(records)
+                ds.checkpoint()
+                with mock.patch.object(type(ds._set.tree), "clone", side_effect=AssertionError("tree copied")):
+                    ds.remove(records[0])
+                with mock.patch("DurableTreeSet._write_snapshot", side_effect=OSError("disk full")):
+                    with self.assertRaises(OSError):
+                        ds.checkpoint()
+                ds.add((1000, "last"))
+                ds.flush()
+                self.assertEqual([name for name in os.listdir(directory) if name.endswith(".log")], ["wal.00000002.log"])
+            with DurableTreeSet(directory) as ds:
+                self.assertEqual(list(ds.iterator()), records[1:] + [(1000, "last")])
+            ds = DurableTreeSet(directory, checkpoint_interval=0.05)
+            with mock.patch("DurableTreeSet._write_snapshot", side_effect=OSError("disk full")):
+                ds.add((2000, "more"))
+                time.sleep(0.5)
+                with self.assertRaises(RuntimeError):
+                    ds.close()
+            with DurableTreeSet(directory) as ds:
+                self.assertTrue(ds.contains((2000, "more")))
+
+
+class TestTreeMap(unittest.TestCase):
+    def test_put_get_remove(self):
+        """Test to verify that values live in the tree nodes and are replaced, read and removed by key."""
+        tm = TreeMap()
+        self.assertIsNone(tm.put("b", 2))
+        self.assertIsNone(tm.put("a", 1))
+        self.assertEqual(tm.put("b", 20), 2)
+        tm.put("d", 4)
+        self.assertEqual(tm.size(), 3)
+        self.assertEqual(tm.get("b"), 20)
+        self.assertEqual(tm.get("c", 0), 0)
+        self.assertEqual(tm.get(3, 0), 0)
+        self.assertTrue(tm.containsKey("d"))
+        self.assertEqual(tm.remove("a"), 1)
+        self.assertIsNone(tm.remove("a"))
+        self.assertEqual(list(tm.items()), [("b", 20), ("d", 4)])
+        self.assertEqual(list(tm.descendingItems()), [("d", 4), ("b", 20)])
+        with self.assertRaises(TypeError):
+            tm.put(1, 1)
+
+    def test_navigation_and_views(self):
+        """Test to verify the entry lookups, polls and range views against a dict."""
+        rng = random.Random(11)
+        tm = TreeMap()
+        expected = {}
+        for step in range(2000):
+            key = rng.randrange(300)
+            if rng.random() < 0.6:
+                self.assertEqual(tm.put(key, step), expected.get(key))
+                expected[key] = step
+            else:
+                self.assertEqual(tm.remove(key), expected.pop(key, None))
+        keys = sorted(expected)
+        self.assertEqual(list(tm.keys()), keys)
+        self.assertEqual(list(tm.values()), [expected[k] for k in keys])
+        for key in range(-1, 302, 5):
+            i = bisect.bisect_left(keys, key)
+            j = bisect.bisect_right(keys, key)
+            self.assertEqual(tm.ceilingEntry(key), (keys[i], expected[keys[i]]) if i < len(keys) else None)
+            self.assertEqual(tm.floorEntry(key), (keys[j - 1], expected[keys[j - 1]]) if j else None)
+            self.assertEqual(tm.higherKey(key), keys[j] if j < len(keys) else None)
+            self.assertEqual(tm.lowerKey(key), keys[i - 1] if i else None)
+        view = tm.subMap(50, 150)
+        inside = [k for k in keys if 50 <= k < 150]
+        self.assertEqual(list(view.keys()), inside)
+        self.assertEqual(view.size(), len(inside))
+        self.assertEqual(view.firstEntry()[0], inside[0])
+        self.assertEqual(view.lastEntry()[0], inside[-1])
+        self.assertEqual(view.get(keys[0]), None)
+        with self.assertRaises(ValueError):
+            view.put(200, 0)
+        self.assertEqual(list(tm.headMap(inside[0]).keys()), [k for k in keys if k < inside[0]])
+        self.assertEqual(list(tm.tailMap(inside[-1], False).keys()), [k for k in keys if k > inside[-1]])
+        self.assertEqual(tm.firstEntry(), (keys[0], expected[keys[0]]))
+        self.assertEqual(tm.pollFirstEntry(), (keys[0], expected[keys[0]]))
+        self.assertEqual(tm.pollLastEntry(), (keys[-1], expected[keys[-1]]))
+        self.assertEqual(tm.size(), len(keys) - 2)
+
+
+class TestTreeMultiset(unittest.TestCase):
+    def test_counts(self):
+        """Test to verify that duplicates are counted on one node and that sizes include multiplicities."""
+        ms = TreeMultiset()
+        self.assertEqual(ms.add("x", 0), 0)
+        self.assertEqual(ms.size(), 0)
+        self.assertEqual(ms.add(5, 3), 0)
+        self.assertEqual(ms.add(5), 3)
+        ms.add(2)
+        ms.add(9, 2)
+        self.assertEqual(ms.count(5), 4)
+        self.assertEqual(ms.count(7), 0)
+        self.assertEqual(ms.size(), 7)
+        self.assertEqual(ms.distinctSize(), 3)
+        self.assertEqual(list(ms.iterator()), [2, 5, 5, 5, 5, 9, 9])
+        self.assertEqual(list(ms.entries()), [(2, 1), (5, 4), (9, 2)])
+        self.assertEqual(ms.rank(9), 5)
+        self.assertEqual(ms.get(4), 5)
+        self.assertEqual(ms.get(5), 9)
+        self.assertEqual(ms.remove(5, 3), 4)
+        self.assertEqual(ms.remove(9, 10), 2)
+        self.assertFalse(ms.contains(9))
+        self.assertEqual(list(ms.iterator()), [2, 5])
+        with self.assertRaises(ValueError):
+            ms.add(5, -1)
+        with self.assertRaises(TypeError):
+            ms.add("5")
+
+    def test_against_sorted_list(self):
+        """Test to verify random additions, removals and polls against a sorted list with duplicates."""
+        rng = random.Random(5)
+        ms = TreeMultiset()
+        expected = []
+        for _ in range(3000):
+            value = rng.randrange(50)
+            choice = rng.random()
+            if choice < 0.5:
+                n = rng.randrange(4)
+                self.assertEqual(ms.add(value, n), expected.count(value))
+                for _ in range(n):
+                    bisect.insort(expected, value)
+            elif choice < 0.8:
+                n = rng.randrange(4)
+                self.assertEqual(ms.remove(value, n), expected.count(value))
+                for _ in range(min(n, expected.count(value))):
+                    expected.remove(value)
+            else:
+                self.assertEqual(ms.pollFirst(), expected.pop(0) if expected else None)
+        self.assertEqual(list(ms.iterator()), expected)
+        self.assertEqual(list(ms.descendingIterator()), expected[::-1])
+        self.assertEqual([ms.get(i) for i in range(ms.size())], expected)
+        for value in range(-1, 52):
+            self.assertEqual(ms.rank(value), bisect.bisect_left(expected, value))
+
+
+class TestInstrumentedRedBlackTree(unittest.TestCase):
+    def test_matches_plain_tree(self):
+        """Test to verify that an instrumented tree behaves like a plain one while its counters move."""
+        rng = random.Random(17)
+        tree = InstrumentedRedBlackTree()
+        plain = RedBlackTree()
+        for _ in range(3000):
+            value = rng.randrange(500)
+            if rng.random() < 0.6:
+                self.assertEqual(tree.add(value), plain.add(value))
+            else:
+                self.assertEqual(tree.remove(value), plain.remove(value))
+        self.assertEqual(list(tree), list(plain))
+        self.assertEqual([tree.ceiling(v) for v in range(0, 500, 7)], [plain.ceiling(v) for v in range(0, 500, 7)])
+        stats = tree.stats()
+        self.assertGreater(stats["comparisons"], 0)
+        self.assertGreater(stats["left_rotations"] + stats["right_rotations"], 0)
+        self.assertGreater(stats["recolorings"], 0)
+        self.assertGreater(stats["fix_double_black_calls"], 0)
+        self.assertGreaterEqual(stats["fix_double_black_steps"], stats["fix_double_black_max_depth"])
+        self.assertEqual(stats["size"], plain.length())
+        self.assertLessEqual(stats["average_depth"], stats["height"])
+        self.assertLessEqual(stats["height"], 2 * stats["black_height"])
+
+    def test_items_hold_plain_keys(self):
+        """Test to verify that items and node ranges of an instrumented tree hand out the keys a plain tree does."""
+        for key in (None, str.lower):
+            tree = InstrumentedRedBlackTree(key)
+            plain = RedBlackTree(key)
+            for value in ("b", "A", "d", "C", "e"):
+                tree.add(value)
+                plain.add(value)
+            self.assertEqual(list(tree.items()), list(plain.items()))
+            self.assertEqual(list(tree.clone().items()), list(plain.items()))
+            self.assertEqual([node.value for node in tree._range_nodes("b", "d", reverse=True)],
+                             [node.value for node in plain._range_nodes("b", "d", reverse=True)])
+        built = InstrumentedRedBlackTree.fromSorted([1, 2, 3])
+        self.assertEqual(list(built.items()), [(1, 1), (2, 2), (3, 3)])
+
+    def test_through_tree_set(self):
+        """Test to verify that a TreeSet with collectStats answers like a plain one, including the lookups by key."""
+        rng = random.Random(23)
+        for values, key in (([rng.randrange(1000) for _ in range(400)], None),
+                            (["Item{}".format(rng.randrange(1000)) for _ in range(400)], str.lower)):
+            counted = TreeSet(key=key, collectStats=True)
+            plain = TreeSet(key=key)
+            for value in values:
+                self.assertEqual(counted.add(value), plain.add(value))
+            self.assertIsInstance(counted.tree, InstrumentedRedBlackTree)
+            probes = values[:20] + [values[0] * 2, values[-1] * 3]
+            for probe in probes:
+                self.assertEqual(counted.seek(probe).next(), plain.seek(probe).next())
+            self.assertEqual(counted.containsMany(probes), plain.containsMany(probes))
+            self.assertEqual(counted.floorMany(probes), plain.floorMany(probes))
+            for others in (probes[:3], probes + values[::2]):
+                self.assertEqual(list(counted.intersection(others).iterator()), list(plain.intersection(others).iterator()))
+            self.assertGreater(counted.stats()["comparisons"], 0)
+            counted.resetStats()
+            self.assertEqual(counted.stats()["comparisons"], 0)
+            self.assertTrue(counted.retainAll(probes[:5]))
+            plain.retainAll(probes[:5])
+            self.assertEqual(list(counted.iterator()), list(plain.iterator()))
+            self.assertEqual(list(counted.clone().freeze().thaw().iterator()), list(plain.iterator()))
+        with self.assertRaises(ValueError):
+            TreeSet().stats()
+        with self.assertRaises(ValueError):
+            TreeSet(trackSums=True, collectStats=True)
+
+    def test_counts_and_reset(self):
+        """Test to verify exact counts on small cases and that reset_stats and clone keep counters apart."""
+        tree = InstrumentedRedBlackTree()
+        for value in (1, 2, 3):
+            tree.add(value)
+        stats = tree.stats()
+        self.assertEqual(stats["left_rotations"], 1)
+        self.assertEqual(stats["right_rotations"], 0)
+        self.assertEqual((stats["height"], stats["black_height"]), (2, 1))
+        tree.reset_stats()
+        tree.contains(2)
+        self.assertEqual(tree.stats()["comparisons"], 2)
+        copy = tree.clone()
+        copy.contains(3)
+        self.assertEqual(tree.stats()["comparisons"], 2)
+        self.assertEqual(copy.stats()["comparisons"], 6)
+        built = InstrumentedRedBlackTree.fromSorted(["a", "b", "c"])
+        self.assertEqual(built.stats()["comparisons"], 0)
+        self.assertTrue(built.contains("c"))
+        self.assertGreater(built.stats()["comparisons"], 0)
+
+
+
+class TestValidate(unittest.TestCase):
+    def test_detects_broken_invariants(self):
+        """Test to verify that validate accepts valid trees and reports each kind of broken invariant."""
+        corruptions = (
+            lambda tree: setattr(tree.root.left, "color", 1 - tree.root.left.color),
+            lambda tree: setattr(tree.root, "size", tree.root.size + 1),
+            lambda tree: setattr(tree.root, "key", -1),
+            lambda tree: setattr(tree.root.left, "parent", None),
+            lambda tree: setattr(tree, "size", tree.size - 1),
+            lambda tree: setattr(tree.root.left.left.left, "left", tree.root),
+        )
+        for corrupt in corruptions:
+            tree = RedBlackTree()
+            for value in range(50):
+                tree.add(value)
+            self.assertTrue(tree.validate())
+            corrupt(tree)
+            with self.assertRaises(AssertionError):
+                tree.validate()
+        array_tree = ArrayRedBlackTree()
+        for value in range(50):
+            array_tree.add(value)
+        self.assertTrue(array_tree.validate())
+        array_tree._colors[array_tree._left[array_tree.root]] ^= 1
+        with self.assertRaises(AssertionError):
+            array_tree.validate()
+        array_tree._colors[array_tree._left[array_tree.root]] ^= 1
+        leftmost = array_tree._left[array_tree._left[array_tree._left[array_tree.root]]]
+        array_tree._left[leftmost] = array_tree.root
+        with self.assertRaises(AssertionError):
+            array_tree.validate()
+        chunk_corruptions = (
+            lambda chunks: chunks._maxes.__setitem__(0, -1),
+            lambda chunks: chunks._lists[1].insert(0, -1),
+            lambda chunks: chunks._lists[0].extend(range(1000, 1020)),
+            lambda chunks: chunks._lists[1].__delitem__(slice(1, None)),
+            lambda chunks: chunks._index.__setitem__(1, chunks._index[1] + 1),
+            lambda chunks: setattr(chunks, "size", chunks.size + 1),
+        )
+        for corrupt in chunk_corruptions:
+            chunks = SortedChunkList.fromSorted(list(range(50)), load=8)
+            chunks.rank(20)
+            self.assertTrue(chunks.validate())
+            corrupt(chunks)
+            with self.assertRaises(AssertionError):
+                chunks.validate()
+
+    def test_stress_against_sorted_list(self):
+        """Test to verify every engine against a sorted list with the seeded stress harness."""
+        for engine in stress.ENGINES:
+            stress.run(engine, operations=20000, seed=3, key_range=300, validate_every=500)
+        multiset = TreeMultiset()
+        for value in range(200):
+            multiset.add(value % 37, value % 3)
+        self.assertTrue(multiset.tree.validate())
+
+
+def _linked_set():
+    """Returns an empty TreeSet for ints that is forced onto the linked Red-Black Tree."""
+    ts = TreeSet()
+    ts._datatype = int
+    return ts
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,289 @@
+import argparse
+import bisect
+import operator
+import random
+import time
+
+from ArrayRedBlack import ArrayRedBlackTree
+from RedBlack import AugmentedRedBlackTree, InstrumentedRedBlackTree, RedBlackTree
+from SortedChunks import SortedChunkList
+from TreeMultiset import _CountedTree
+
+# A chunk load small enough for a stress run over a thousand keys to split and join chunks all the time.
+SMALL_LOAD = 8
+
+
+class _SmallChunkList(SortedChunkList):
+    """
+    SortedChunkList with a small default load, so that its splits, joins and Fenwick tree are stressed.
+    """
+
+    def __init__(self, key=None, load=SMALL_LOAD):
+        SortedChunkList.__init__(self, key, load)
+
+    @classmethod
+    def fromSorted(cls, values, key=None, keys=None, load=SMALL_LOAD):
+        return super().fromSorted(values, key, keys, load)
+
+
+# The engine class of each name and the key function it is run with. The keyed variants order the values
+# by their negation, so that the cached keys, not the values, decide the order of the tree.
+ENGINES = {
+    'redblack': (RedBlackTree, None),
+    'array': (ArrayRedBlackTree, None),
+    'augmented': (AugmentedRedBlackTree, None),
+    'instrumented': (InstrumentedRedBlackTree, None),
+    'chunked': (_SmallChunkList, None),
+    'redblack-keyed': (RedBlackTree, operator.neg),
+    'augmented-keyed': (AugmentedRedBlackTree, operator.neg),
+    'instrumented-keyed': (InstrumentedRedBlackTree, operator.neg),
+    'chunked-keyed': (_SmallChunkList, operator.neg),
+    'multiset': (_CountedTree, None),
+}
+
+# Relative frequency of each operation. Additions and removals are balanced so that the tree settles
+# at a little under half of the key range, where removals hit leaves, inner nodes and nodes with two
+# children alike, and where most additions and removals change the tree. removeAndAdvance removes
+# the ceiling of a key the way a cursor does, through _remove_and_advance.
+OPERATIONS = (
+    ('add', 30), ('remove', 22), ('removeAndAdvance', 3), ('contains', 6), ('ceiling', 4), ('floor', 4),
+    ('higher', 4), ('lower', 4), ('rank', 4), ('indexOf', 4), ('atIndex', 4), ('pollFirst', 3),
+    ('pollLast', 3), ('searchMany', 2), ('first', 1), ('last', 1), ('irange', 1), ('clone', 0.05),
+    ('fromSorted', 0.05), ('clear', 0.01),
+)
+
+# Relative frequency of each operation of the multiset tree, which holds a count per distinct key.
+MULTISET_OPERATIONS = (
+    ('addCount', 45), ('removeCount', 40), ('atIndex', 8), ('rank', 7), ('clone', 0.05), ('clear', 0.01),
+)
+
+
+def _expected(operation, keys, values, key, lo, hi):
+    """
+    Returns what an operation should return, computed with bisect on the sorted list of the keys in the
+    tree. values maps each of those keys to its value; key, lo and hi are keys.
+    """
+    if operation == 'contains':
+        index = bisect.bisect_left(keys, key)
+        return index < len(keys) and keys[index] == key
+    if operation == 'ceiling':
+        index = bisect.bisect_left(keys, key)
+        return values[keys[index]] if index < len(keys) else None
+    if operation == 'floor':
+        index = bisect.bisect_right(keys, key)
+        return values[keys[index - 1]] if index else None
+    if operation == 'higher':
+        index = bisect.bisect_right(keys, key)
+        return values[keys[index]] if index < len(keys) else None
+    if operation == 'lower':
+        index = bisect.bisect_left(keys, key)
+        return values[keys[index - 1]] if index else None
+    if operation == 'rank':
+        return bisect.bisect_left(keys, key)
+    if operation == 'indexOf':
+        index = bisect.bisect_left(keys, key)
+        return index if index < len(keys) and keys[index] == key else -1
+    if operation == 'first':
+        return values[keys[0]] if keys else None
+    if operation == 'last':
+        return values[keys[-1]] if keys else None
+    return [values[k] for k in keys[bisect.bisect_left(keys, lo):bisect.bisect_left(keys, hi)]]
+
+
+def _check(tree, original, snapshot, context, contents=list):
+    """
+    Validates a tree, and the original of its last clone, whose contents must still be snapshot.
+    """
+    try:
+        tree.validate()
+        if original is not None:
+            original.validate()
+            if contents(original) != snapshot:
+                raise AssertionError("A clone shares changes with its original.")
+    except AssertionError as error:
+        raise AssertionError("{}: {}".format(context, error)) from error
+
+
+def run(engine='redblack', operations=10 ** 6, seed=0, key_range=1000, validate_every=1000):
+    """
+    Runs a seeded random sequence of mixed operations on a tree and on a sorted list, and checks after
+    every operation that the tree returned what the list says it should.
+
+    Every validate_every operations, and at the end, the whole tree is also checked with validate, so
+    a broken invariant is caught close to the operation that broke it even before it changes a result.
+    Clones and trees rebuilt with fromSorted replace the tree from time to time, and the original of a
+    clone is checked to be left unchanged by the operations made on the copy.
+
+    Args:
+        engine: The name of the tree class in ENGINES.
+        operations: The number of operations to run.
+        seed: The seed of the sequence. The same seed replays the same operations.
+        key_range: The values are drawn from range(key_range), which bounds the size of the tree.
+        validate_every: The number of operations between two checks of the invariants, 0 for only at the end.
+
+    Returns:
+        The final size of the tree.
+
+    Raises:
+        AssertionError: If a result differs from the list or an invariant is broken. The message holds
+        the seed and the number of the operation, to replay the sequence up to the failure.
+    """
+    cls, order = ENGINES[engine]
+    if cls is _CountedTree:
+        return run_multiset(operations, seed, key_range, validate_every)
+    key_of = order if order is not None else (lambda value: value)
+    rng = random.Random(seed)
+    names = [name for name, _ in OPERATIONS]
+    weights = [weight for _, weight in OPERATIONS]
+    tree = cls() if order is None else cls(order)
+    keys = []
+    values = {}
+    original = snapshot = None
+    for step in range(operations):
+        operation = rng.choices(names, weights)[0]
+        value = rng.randrange(key_range)
+        key = key_of(value)
+        context = "seed {} operation {}: {}({})".format(seed, step, operation, value)
+        if operation == 'add':
+            index = bisect.bisect_left(keys, key)
+            added = index == len(keys) or keys[index] != key
+            if added:
+                keys.insert(index, key)
+                values[key] = value
+            result, expected = tree.add(value), added
+        elif operation == 'remove':
+            index = bisect.bisect_left(keys, key)
+            removed = index < len(keys) and keys[index] == key
+            if removed:
+                del values[keys.pop(index)]
+            result, expected = tree.remove(value), removed
+        elif operation == 'removeAndAdvance':
+            node = tree._lower_bound_node(key)
+            index = bisect.bisect_left(keys, key)
+            if node == tree._nil:
+                result = None
+            else:
+                following = tree._remove_and_advance(node)
+                if index < len(keys):
+                    del values[keys.pop(index)]
+                result = None if following == tree._nil else tree._value_of(following)
+            expected = values[keys[index]] if index < len(keys) else None
+        elif operation == 'pollFirst':
+            result, expected = tree.pollFirst(), values.pop(keys.pop(0)) if keys else None
+        elif operation == 'pollLast':
+            result, expected = tree.pollLast(), values.pop(keys.pop()) if keys else None
+        elif operation == 'atIndex':
+            index = rng.randrange(-1, len(keys) + 1)
+            result, expected = tree.atIndex(index), values[keys[index]] if 0 <= index < len(keys) else None
+        elif operation == 'searchMany':
+            probes = sorted((rng.randrange(-1, key_range + 1) for _ in range(8)), key=key_of)
+            result = [tuple(pair) for pair in tree.searchMany(probes)]
+            expected = [(_expected('floor', keys, values, key_of(probe), None, None),
+                         _expected('ceiling', keys, values, key_of(probe), None, None)) for probe in probes]
+        elif operation == 'clone':
+            original, snapshot = tree, [values[k] for k in keys]
+            tree = tree.clone()
+            result = expected = None
+        elif operation == 'fromSorted':
+            ordered = [values[k] for k in keys]
+            tree = cls.fromSorted(ordered) if order is None else cls.fromSorted(ordered, order)
+            result = expected = None
+        elif operation == 'clear':
+            tree.clear()
+            keys = []
+            values = {}
+            result = expected = None
+        elif operation == 'irange':
+            lo, hi = sorted((value, rng.randrange(key_range)), key=key_of)
+            result, expected = list(tree.irange(lo, hi)), _expected(operation, keys, values, None, key_of(lo), key_of(hi))
+        elif operation in ('first', 'last'):
+            result, expected = getattr(tree, operation)(), _expected(operation, keys, values, None, None, None)
+        else:
+            result, expected = getattr(tree, operation)(value), _expected(operation, keys, values, key, None, None)
+        if result != expected:
+            raise AssertionError("{} returned {!r} instead of {!r}.".format(context, result, expected))
+        if tree.length() != len(keys):
+            raise AssertionError("{} left the size at {} instead of {}.".format(context, tree.length(), len(keys)))
+        if validate_every and (step + 1) % validate_every == 0:
+            _check(tree, original, snapshot, context)
+            original = None
+    tree.validate()
+    return tree.length()
+
+
+def run_multiset(operations=10 ** 6, seed=0, key_range=1000, validate_every=1000):
+    """
+    Runs a seeded random sequence of operations on the tree of a TreeMultiset, which keeps one node per
+    distinct key with its count, and checks every result against a dictionary of counts. The arguments,
+    result and errors are those of run.
+    """
+    rng = random.Random(seed)
+    names = [name for name, _ in MULTISET_OPERATIONS]
+    weights = [weight for _, weight in MULTISET_OPERATIONS]
+    tree = _CountedTree()
+    counts = {}
+    original = snapshot = None
+    for step in range(operations):
+        operation = rng.choices(names, weights)[0]
+        key = rng.randrange(key_range)
+        context = "seed {} operation {}: {}({})".format(seed, step, operation, key)
+        if operation == 'addCount':
+            n = rng.randrange(1, 4)
+            result, expected = tree.addCount(key, n), counts.get(key, 0)
+            counts[key] = expected + n
+        elif operation == 'removeCount':
+            n = rng.randrange(1, 4)
+            node = tree._find_node(key)
+            result = 0 if node is None else tree.removeCount(node, n)
+            expected = counts.get(key, 0)
+            if expected > n:
+                counts[key] = expected - n
+            else:
+                counts.pop(key, None)
+        elif operation == 'atIndex':
+            expanded = [k for k in sorted(counts) for _ in range(counts[k])]
+            index = rng.randrange(-1, len(expanded) + 1)
+            result, expected = tree.atIndex(index), expanded[index] if 0 <= index < len(expanded) else None
+        elif operation == 'rank':
+            inclusive = rng.random() < 0.5
+            result = tree.rank(key, inclusive)
+            expected = sum(count for k, count in counts.items() if k < key or (inclusive and k == key))
+        elif operation == 'clone':
+            original, snapshot = tree, sorted(counts.items())
+            tree = tree.clone()
+            result = expected = None
+        else:
+            tree.clear()
+            counts = {}
+            result = expected = None
+        if result != expected:
+            raise AssertionError("{} returned {!r} instead of {!r}.".format(context, result, expected))
+        if tree.length() != len(counts):
+            raise AssertionError("{} left {} nodes instead of {}.".format(context, tree.length(), len(counts)))
+        if validate_every and (step + 1) % validate_every == 0:
+            if list(tree.items()) != sorted(counts.items()):
+                raise AssertionError("{} left the counts at {!r}.".format(context, list(tree.items())))
+            _check(tree, original, snapshot, context, lambda multiset_tree: list(multiset_tree.items()))
+            original = None
+    tree.validate()
+    return tree.length()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Randomized differential stress test of the tree engines")
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), default=list(ENGINES))
+    parser.add_argument("--operations", type=int, default=10 ** 6)
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("--key-range", type=int, default=1000)
+    parser.add_argument("--validate-every", type=int, default=1000)
+    args = parser.parse_args()
+    for engine in args.engines:
+        for seed in args.seeds:
+            start = time.perf_counter()
+            size = run(engine, args.operations, seed, args.key_range, args.validate_every)
+            print("stress {:<18} seed {:>4}  {} operations ok in {:.1f} s, final size {}".format(
+                engine, seed, args.operations, time.perf_counter() - start, size))
+
+
+if __name__ == '__main__':
+    main()